@@ -1,18 +1,59 @@
 import os
+import hmac
+import json
+import time
+import asyncio
 import logging
-from typing import Optional
-from fastapi import FastAPI, HTTPException, status
+import tempfile
+from typing import Optional, Tuple
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse, JSONResponse, Response, FileResponse, PlainTextResponse, RedirectResponse
+from starlette.background import BackgroundTask
+from starlette.requests import HTTPConnection
+from pydantic import ValidationError
 
-from schemas import ChatRequest, ChatResponse
-from chat_engine import ask_bot
+from schemas import ChatRequest, ChatResponse, BatchChatRequest, BatchChatResponse, MAX_SESSION_ID_LENGTH
+from batch import run_batch
+from scheduler import Scheduler, SchedulerRejected
+from rate_limit import RateLimiter, RateLimited
+from upstream import UpstreamError
+from metrics import register_sources, record_error, render as render_metrics
+from profiling import RequestProfiler
+from logging_setup import configure_logging
+from request_context import ServerTimingMiddleware, bind_context, current_tokens
+from websocket_channel import WebSocketChannel
+from static_assets import StaticBundle, asset_response
+from chat_engine import (
+    ask_bot_async,
+    ask_bot_stream,
+    get_active_sessions_count,
+    get_cache_stats,
+    get_session_stats,
+    get_or_create_session,
+    get_upstream_stats,
+    personas,
+    response_cache,
+    run_store_call,
+    session_snapshots,
+    session_store,
+    summarizer,
+    warm_up_upstream,
+    SESSION_SWEEP_INTERVAL_SECONDS
+)
 
-load_dotenv()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_ASYNC = os.getenv("LOG_ASYNC", "false").lower() == "true"
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+configure_logging(
+    level=LOG_LEVEL,
+    log_format=LOG_FORMAT,
+    background=LOG_ASYNC,
+    sample_rate=LOG_SAMPLE_RATE,
+    queue_size=LOG_QUEUE_SIZE
 )
 logger = logging.getLogger(__name__)
 
@@ -23,6 +64,68 @@ app = FastAPI(
 )
 
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://localhost:8080").split(",")
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "64"))
+MAX_QUEUE = int(os.getenv("MAX_QUEUE", "256"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "10"))
+MAX_PENDING_PER_SESSION = int(os.getenv("MAX_PENDING_PER_SESSION", "4"))
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "chatbot-profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+RATE_LIMIT_REQUESTS_PER_MINUTE = float(os.getenv("RATE_LIMIT_REQUESTS_PER_MINUTE", "30"))
+RATE_LIMIT_REQUEST_BURST = float(os.getenv("RATE_LIMIT_REQUEST_BURST", "10"))
+RATE_LIMIT_TOKENS_PER_MINUTE = float(os.getenv("RATE_LIMIT_TOKENS_PER_MINUTE", "20000"))
+RATE_LIMIT_TOKEN_BURST = float(os.getenv("RATE_LIMIT_TOKEN_BURST", "0")) or None
+RATE_LIMIT_IDLE_SECONDS = float(os.getenv("RATE_LIMIT_IDLE_SECONDS", "600"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", "20"))
+WS_IDLE_TIMEOUT_SECONDS = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "60"))
+WS_MAX_PENDING_MESSAGES = int(os.getenv("WS_MAX_PENDING_MESSAGES", "64"))
+STATIC_ENABLED = os.getenv("STATIC_ENABLED", "false").lower() == "true"
+STATIC_DIR = os.getenv("STATIC_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend"))
+UPSTREAM_WARMUP_ENABLED = os.getenv("UPSTREAM_WARMUP_ENABLED", "true").lower() == "true"
+UPSTREAM_WARMUP_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_WARMUP_TIMEOUT_SECONDS", "5"))
+RELOAD = os.getenv("RELOAD", "false").lower() == "true"
+
+# "starting" até o aquecimento terminar, "ready" e "stopping" a partir do shutdown
+readiness = {"status": "starting", "upstream": {}}
+warmup_task: Optional[asyncio.Task] = None
+
+scheduler = Scheduler(
+    max_in_flight=MAX_IN_FLIGHT,
+    max_queue=MAX_QUEUE,
+    queue_timeout_seconds=QUEUE_TIMEOUT_SECONDS,
+    max_pending_per_session=MAX_PENDING_PER_SESSION
+)
+
+rate_limiter = RateLimiter(
+    requests_per_minute=RATE_LIMIT_REQUESTS_PER_MINUTE,
+    request_burst=RATE_LIMIT_REQUEST_BURST,
+    tokens_per_minute=RATE_LIMIT_TOKENS_PER_MINUTE,
+    token_burst=RATE_LIMIT_TOKEN_BURST,
+    idle_seconds=RATE_LIMIT_IDLE_SECONDS,
+    max_keys=RATE_LIMIT_MAX_KEYS
+) if RATE_LIMIT_ENABLED else None
+
+register_sources(
+    sessions=get_active_sessions_count,
+    in_flight=lambda: scheduler.stats()["in_flight"],
+    cache_stats=get_cache_stats,
+    session_stats=get_session_stats
+)
+
+static_bundle = StaticBundle(STATIC_DIR) if STATIC_ENABLED else None
+
+profiler = RequestProfiler(
+    directory=PROFILE_DIR,
+    sample_rate=PROFILE_SAMPLE_RATE,
+    token=ADMIN_TOKEN or None,
+    keep=PROFILE_KEEP
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,15 +133,110 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id", "X-Request-ID"],
 )
+app.add_middleware(ServerTimingMiddleware, enabled=SERVER_TIMING_ENABLED, profiler=profiler)
+
+@app.exception_handler(SchedulerRejected)
+async def scheduler_rejected_handler(request: Request, exc: SchedulerRejected):
+    record_error("rejected")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+def require_admin(http_request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Endpoints de administração desabilitados (configure ADMIN_TOKEN)"
+        )
+    if not hmac.compare_digest(http_request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token de administração inválido"
+        )
+
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request: Request, exc: RateLimited):
+    record_error("rate_limited")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+def check_rate_limit(http_request: HTTPConnection, session_id: Optional[str], cost: int = 1) -> Tuple[str, ...]:
+    if rate_limiter is None:
+        return ()
+    
+    keys = RateLimiter.keys(session_id, http_request.client.host if http_request.client else None)
+    rate_limiter.acquire(keys, cost)
+    return keys
+
+def charge_rate_limit(keys: Tuple[str, ...]):
+    if rate_limiter is not None and keys:
+        rate_limiter.charge(keys, current_tokens())
+
+def batch_max_items() -> int:
+    # um lote conta um por item no balde de requisições; acima da rajada ele nunca passaria, então o limite acompanha a rajada
+    if rate_limiter is None:
+        return BATCH_MAX_ITEMS
+    return min(BATCH_MAX_ITEMS, rate_limiter.max_cost)
+
+def get_fairness_key(http_request: HTTPConnection, session_id: Optional[str]) -> str:
+    if session_id:
+        return session_id
+    return http_request.client.host if http_request.client else "anonymous"
+
+async def warm_up():
+    started = time.perf_counter()
+    
+    if UPSTREAM_WARMUP_ENABLED:
+        readiness["upstream"] = await warm_up_upstream(UPSTREAM_WARMUP_TIMEOUT_SECONDS)
+    
+    # uma falha no aquecimento não segura a instância: o circuit breaker já trata o upstream fora do ar
+    readiness["status"] = "ready"
+    logger.info("✓ Pronto para receber tráfego em %.2fs (upstream aquecido: %s)", time.perf_counter() - started, readiness["upstream"])
 
 @app.on_event("startup")
 async def startup_event():
+    global warmup_task
+    
     if not os.getenv("OPENAI_API_KEY"):
         logger.error("OPENAI_API_KEY não configurada!")
         raise ValueError("OPENAI_API_KEY é obrigatória. Configure no arquivo .env")
+    if session_snapshots is not None:
+        started = time.perf_counter()
+        restored = session_snapshots.load()
+        logger.info("✓ %d sessões restauradas do snapshot em %.2fs", restored, time.perf_counter() - started)
+        session_snapshots.start()
+    session_store.start_sweeper(SESSION_SWEEP_INTERVAL_SECONDS)
+    response_cache.load()
+    if static_bundle is not None:
+        static_bundle.build()
+        stats = static_bundle.stats()
+        logger.info("✓ Frontend servido em /app/: %d arquivos, %d bytes (%d com gzip)", stats["files"], stats["bytes"], stats["gzip_bytes"])
     logger.info("✓ Servidor iniciado com sucesso")
-    logger.info(f"✓ CORS configurado para: {ALLOWED_ORIGINS}")
+    logger.info("✓ CORS configurado para: %s", ALLOWED_ORIGINS)
+    
+    # o aquecimento roda em segundo plano: /health/live já responde enquanto /health/ready espera
+    readiness["status"] = "starting"
+    warmup_task = asyncio.create_task(warm_up())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    readiness["status"] = "stopping"
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+    summarizer.close()
+    if session_snapshots is not None:
+        session_snapshots.stop()
+        session_snapshots.save()
+    session_store.close()
+    response_cache.save()
 
 @app.get("/")
 async def root():
@@ -52,8 +250,20 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/live")
+async def liveness_check():
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    if readiness["status"] != "ready":
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=readiness)
+    return readiness
+
 @app.post("/api/chat", response_model=ChatResponse, status_code=status.HTTP_200_OK)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
+    keys = check_rate_limit(http_request, request.session_id)
+    
     try:
         if not request.message or not request.message.strip():
             raise HTTPException(
@@ -61,44 +271,352 @@ async def chat_endpoint(request: ChatRequest):
                 detail="Mensagem não pode estar vazia"
             )
         
-        logger.info(f"Recebida mensagem da sessão: {request.session_id or 'nova'}")
+        logger.info("Recebida mensagem da sessão: %s", request.session_id or "nova")
         
-        reply, session_id = ask_bot(
-            message=request.message,
-            session_id=request.session_id
-        )
+        async with scheduler.slot(request.session_id, get_fairness_key(http_request, request.session_id)):
+            reply, session_id = await ask_bot_async(
+                message=request.message,
+                session_id=request.session_id,
+                use_refinement=request.use_refinement,
+                use_cache=request.use_cache,
+                backend=request.backend,
+                persona_id=request.persona_id
+            )
         
-        logger.info(f"Resposta gerada para sessão: {session_id}")
+        logger.info("Resposta gerada para sessão: %s", session_id)
         
         return ChatResponse(reply=reply, session_id=session_id)
     
+    except SchedulerRejected:
+        raise
+    
+    except UpstreamError as ue:
+        logger.warning("Erro no serviço de IA: %s", ue.detail)
+        record_error("upstream")
+        raise HTTPException(
+            status_code=ue.status_code,
+            detail=ue.detail,
+            headers={"Retry-After": str(ue.retry_after)} if ue.retry_after else None
+        )
+    
     except ValueError as ve:
-        logger.warning(f"Erro de validação: {str(ve)}")
+        logger.warning("Erro de validação: %s", ve)
+        record_error("validation")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(ve)
         )
     
     except Exception as e:
-        logger.error(f"Erro interno: {str(e)}", exc_info=True)
+        logger.error("Erro interno: %s", e, exc_info=True)
+        record_error("internal")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erro interno do servidor. Por favor, tente novamente."
         )
+    
+    finally:
+        charge_rate_limit(keys)
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, http_request: Request):
+    if not request.message or not request.message.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Mensagem não pode estar vazia"
+        )
+    
+    keys = check_rate_limit(http_request, request.session_id)
+    
+    logger.info("Recebida mensagem (streaming) da sessão: %s", request.session_id or "nova")
+    
+    slot = await scheduler.acquire(request.session_id, get_fairness_key(http_request, request.session_id))
+    
+    try:
+        session_id, events = await ask_bot_stream(
+            message=request.message,
+            session_id=request.session_id,
+            use_cache=request.use_cache,
+            use_refinement=request.use_refinement,
+            backend=request.backend,
+            persona_id=request.persona_id
+        )
+    except ValueError as ve:
+        scheduler.release(request.session_id, slot)
+        logger.warning("Erro de validação: %s", ve)
+        record_error("validation")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ve)
+        )
+    except BaseException:
+        # até o StreamingResponse assumir o slot, qualquer falha (ou cancelamento) precisa devolvê-lo
+        scheduler.release(request.session_id, slot)
+        raise
+    
+    async def event_stream():
+        yield format_sse("session", {"session_id": session_id})
+        try:
+            async for event, content in events:
+                if event == "delta":
+                    yield format_sse("delta", {"content": content})
+                elif event == "replace":
+                    yield format_sse("replace", {"content": content})
+                else:
+                    yield format_sse("done", {"reply": content, "session_id": session_id})
+            logger.info("Resposta (streaming) gerada para sessão: %s", session_id)
+        except UpstreamError as ue:
+            logger.warning("Erro no serviço de IA: %s", ue.detail)
+            record_error("upstream")
+            yield format_sse("error", {"detail": ue.detail, "status": ue.status_code})
+        except Exception as e:
+            logger.error("Erro interno no streaming: %s", e, exc_info=True)
+            record_error("internal")
+            yield format_sse("error", {"detail": "Erro interno do servidor. Por favor, tente novamente."})
+        finally:
+            charge_rate_limit(keys)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(scheduler.release, request.session_id, slot)
+    )
+
+@app.post("/api/chat/batch", response_model=BatchChatResponse)
+async def chat_batch_endpoint(request: BatchChatRequest, http_request: Request):
+    concurrency = request.concurrency or BATCH_CONCURRENCY
+    max_items = batch_max_items()
+    if len(request.items) > max_items:
+        # 413 e sem Retry-After: repetir o mesmo lote nunca vai passar
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lote com {len(request.items)} itens excede o limite de {max_items}. Divida em lotes menores."
+        )
+    keys = check_rate_limit(http_request, None, cost=len(request.items))
+    
+    logger.info("Recebido lote com %d mensagens (concorrência: %d)", len(request.items), concurrency)
+    
+    async def ask_batch_item(item: ChatRequest):
+        async with scheduler.slot(item.session_id, get_fairness_key(http_request, item.session_id)):
+            return await ask_bot_async(
+                message=item.message,
+                session_id=item.session_id,
+                use_refinement=item.use_refinement,
+                use_cache=item.use_cache,
+                backend=item.backend,
+                persona_id=item.persona_id
+            )
+    
+    results = run_batch(request.items, ask_batch_item, concurrency)
+    
+    if request.stream:
+        async def ndjson_stream():
+            try:
+                async for result in results:
+                    yield json.dumps(result, ensure_ascii=False) + "\n"
+            finally:
+                charge_rate_limit(keys)
+        
+        return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+    
+    collected = [result async for result in results]
+    charge_rate_limit(keys)
+    collected.sort(key=lambda result: result["index"])
+    
+    return BatchChatResponse(results=collected)
+
+def websocket_origin_allowed(websocket: WebSocket) -> bool:
+    origin = websocket.headers.get("origin")
+    if origin is None or "*" in ALLOWED_ORIGINS or origin in ALLOWED_ORIGINS:
+        return True
+    # mesma origem: o frontend servido em /app/ pelo próprio backend
+    return origin.split("://", 1)[-1] == websocket.headers.get("host")
+
+@app.websocket("/ws/chat")
+async def chat_websocket(
+    websocket: WebSocket,
+    session_id: Optional[str] = Query(None, max_length=MAX_SESSION_ID_LENGTH),
+    persona_id: Optional[str] = None
+):
+    # o CORS não cobre WebSockets; a origem é conferida aqui
+    if not websocket_origin_allowed(websocket):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    session_id = await run_store_call(get_or_create_session, session_id)
+    channel = WebSocketChannel(
+        websocket,
+        heartbeat_seconds=WS_HEARTBEAT_SECONDS,
+        idle_timeout_seconds=WS_IDLE_TIMEOUT_SECONDS,
+        max_pending=WS_MAX_PENDING_MESSAGES
+    )
+    
+    async def handle_turn(data: dict):
+        bind_context()
+        
+        try:
+            request = ChatRequest(
+                message=data.get("message") or "",
+                session_id=session_id,
+                use_cache=data.get("use_cache", True),
+                use_refinement=data.get("use_refinement", False),
+                backend=data.get("backend"),
+                persona_id=data.get("persona_id") or persona_id
+            )
+        except ValidationError as ve:
+            record_error("validation")
+            await channel.send({"type": "error", "detail": ve.errors()[0]["msg"], "status": 422})
+            return
+        
+        logger.info("Recebida mensagem (WebSocket) da sessão: %s", session_id)
+        
+        keys: Tuple[str, ...] = ()
+        slot = None
+        acquired = False
+        
+        try:
+            keys = check_rate_limit(websocket, session_id)
+            slot = await scheduler.acquire(session_id, get_fairness_key(websocket, session_id))
+            acquired = True
+            
+            _, events = await ask_bot_stream(
+                message=request.message,
+                session_id=session_id,
+                use_cache=request.use_cache,
+                use_refinement=request.use_refinement,
+                backend=request.backend,
+                persona_id=request.persona_id
+            )
+            try:
+                async for event, content in events:
+                    if event == "done":
+                        await channel.send({"type": "done", "reply": content, "session_id": session_id})
+                    else:
+                        await channel.send({"type": event, "content": content})
+            finally:
+                await events.aclose()
+            
+            logger.info("Resposta (WebSocket) gerada para sessão: %s", session_id)
+        
+        except WebSocketDisconnect:
+            raise
+        
+        except (RateLimited, SchedulerRejected) as e:
+            record_error("rate_limited" if isinstance(e, RateLimited) else "rejected")
+            await channel.send({"type": "error", "detail": e.detail, "status": e.status_code, "retry_after": e.retry_after})
+        
+        except UpstreamError as ue:
+            logger.warning("Erro no serviço de IA: %s", ue.detail)
+            record_error("upstream")
+            await channel.send({"type": "error", "detail": ue.detail, "status": ue.status_code})
+        
+        except ValueError as ve:
+            logger.warning("Erro de validação: %s", ve)
+            record_error("validation")
+            await channel.send({"type": "error", "detail": str(ve), "status": 400})
+        
+        except Exception as e:
+            logger.error("Erro interno no WebSocket: %s", e, exc_info=True)
+            record_error("internal")
+            await channel.send({"type": "error", "detail": "Erro interno do servidor. Por favor, tente novamente.", "status": 500})
+        
+        finally:
+            if acquired:
+                scheduler.release(session_id, slot)
+            charge_rate_limit(keys)
+    
+    logger.info("Conexão WebSocket aberta para sessão: %s", session_id)
+    await channel.serve(handle_turn, greeting={"type": "session", "session_id": session_id})
+    logger.info("Conexão WebSocket encerrada para sessão: %s", session_id)
+
+@app.get("/api/personas")
+async def list_personas():
+    return {"personas": personas.list()}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return get_cache_stats()
+
+@app.get("/api/sessions/stats")
+async def session_stats():
+    return await run_store_call(get_session_stats)
+
+@app.get("/api/upstream/stats")
+async def upstream_stats():
+    return get_upstream_stats()
+
+@app.get("/api/rate-limit/stats")
+async def rate_limit_stats():
+    if rate_limiter is None:
+        return {"enabled": False}
+    return {"enabled": True, **rate_limiter.stats()}
+
+@app.get("/api/scheduler/stats")
+async def scheduler_stats():
+    return scheduler.stats()
+
+@app.get("/admin/profiles")
+async def list_profiles(http_request: Request):
+    require_admin(http_request)
+    return {"stats": profiler.stats(), "profiles": profiler.list()}
+
+@app.get("/admin/profiles/{name}")
+async def get_profile(name: str, http_request: Request, format: str = "prof", limit: int = 40):
+    require_admin(http_request)
+    
+    if format == "text":
+        report = profiler.report(name, limit=limit)
+        if report is not None:
+            return PlainTextResponse(report)
+    else:
+        path = profiler.path(name)
+        if path is not None:
+            return FileResponse(path, media_type="application/octet-stream", filename=name)
+    
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Perfil {name} não encontrado"
+    )
+
+@app.get("/app", include_in_schema=False)
+async def frontend_redirect():
+    return RedirectResponse("/app/", status_code=status.HTTP_308_PERMANENT_REDIRECT)
+
+@app.api_route("/app/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def frontend_asset(path: str, http_request: Request):
+    found = static_bundle.find(path) if static_bundle is not None else None
+    if found is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Arquivo não encontrado"
+        )
+    
+    asset, immutable = found
+    return asset_response(http_request, asset, immutable)
 
 @app.delete("/api/session/{session_id}")
 async def clear_session(session_id: str):
     from chat_engine import clear_session_history
     
     try:
-        cleared = clear_session_history(session_id)
+        cleared = await run_store_call(clear_session_history, session_id)
         if cleared:
-            logger.info(f"Sessão {session_id} limpa com sucesso")
+            logger.info("Sessão %s limpa com sucesso", session_id)
             return {"message": f"Sessão {session_id} limpa com sucesso"}
         else:
             return {"message": f"Sessão {session_id} não encontrada"}
     except Exception as e:
-        logger.error(f"Erro ao limpar sessão: {str(e)}")
+        logger.error("Erro ao limpar sessão: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erro ao limpar sessão"
@@ -107,10 +625,11 @@ async def clear_session(session_id: str):
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
+    # sem reload, o objeto app é passado direto e o módulo não é importado uma segunda vez pelo uvicorn
     uvicorn.run(
-        "app:app",
+        "app:app" if RELOAD else app,
         host="0.0.0.0",
         port=port,
-        reload=True,
+        reload=RELOAD,
         log_level="info"
     )
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+from scheduler import SchedulerRejected
+from upstream import UpstreamError
+from metrics import record_error
+
+logger = logging.getLogger(__name__)
+
+def group_by_session(items: Sequence[Any]) -> List[List[Tuple[int, Any]]]:
+    groups: Dict[str, List[Tuple[int, Any]]] = {}
+    independent: List[List[Tuple[int, Any]]] = []
+
+    for index, item in enumerate(items):
+        if item.session_id:
+            groups.setdefault(item.session_id, []).append((index, item))
+        else:
+            independent.append([(index, item)])
+
+    return list(groups.values()) + independent
+
+async def run_item(index: int, item: Any, ask: Callable[[Any], Awaitable[Tuple[str, str]]]) -> Dict[str, Any]:
+    try:
+        reply, session_id = await ask(item)
+        return {"index": index, "reply": reply, "session_id": session_id, "error": None}
+
+    except ValueError as ve:
+        record_error("validation")
+        return {"index": index, "reply": None, "session_id": item.session_id, "error": str(ve)}
+
+    except (SchedulerRejected, UpstreamError) as e:
+        record_error("rejected" if isinstance(e, SchedulerRejected) else "upstream")
+        return {"index": index, "reply": None, "session_id": item.session_id, "error": e.detail}
+
+    except Exception as e:
+        logger.error("Erro no item %d do lote: %s", index, e)
+        record_error("internal")
+        return {"index": index, "reply": None, "session_id": item.session_id, "error": "Erro interno do servidor"}
+
+async def run_batch(
+    items: Sequence[Any],
+    ask: Callable[[Any], Awaitable[Tuple[str, str]]],
+    concurrency: int
+) -> AsyncIterator[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    results: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+
+    async def run_group(group: List[Tuple[int, Any]]):
+        for index, item in group:
+            async with semaphore:
+                result = await run_item(index, item, ask)
+            await results.put(result)
+
+    tasks = [asyncio.ensure_future(run_group(group)) for group in group_by_session(items)]
+
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        for task in tasks:
+            task.cancel()
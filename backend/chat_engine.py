@@ -1,9 +1,9 @@
 import os
-import re
+import time
 import uuid
+import asyncio
 import logging
-from typing import Optional, Tuple, List, Dict
-from openai import OpenAI
+from typing import Optional, Tuple, List, Dict, AsyncIterator, Callable, TypeVar
 from dotenv import load_dotenv
 
 from persona import (
@@ -11,90 +11,387 @@ from persona import (
     format_message_for_history,
     get_moderation_prompt,
     get_truncation_message,
-    PERSONA_CONFIG
+    PERSONA_CONFIG,
+    Persona,
+    PersonaRegistry
 )
+from tokenizer import count_tokens
+from response_cache import ResponseCache, make_cache_key
+from single_flight import SingleFlight
+from moderation import BannedTermsFilter
+from summary import RollingSummarizer
+from metrics import record_stage, record_usage, record_tokens
+from request_context import bind_session
+from hedging import LatencyTracker, HedgePolicy, hedged_call
+from upstream import UpstreamClient, CircuitBreaker, RetryPolicy, create_openai_clients, map_error, warm_up_client
+from router import Backend, Router, parse_backends_config
+from session_store import SessionStore, InMemorySessionStore, SQLiteSessionStore
+from snapshot import SessionSnapshotter
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+T = TypeVar("T")
 
-conversation_history: Dict[str, List[Dict[str, str]]] = {}
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+UPSTREAM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+UPSTREAM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY_SECONDS", "30"))
+UPSTREAM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT_SECONDS", "3"))
+UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "15"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_DEADLINE_SECONDS = float(os.getenv("UPSTREAM_DEADLINE_SECONDS", "30"))
+UPSTREAM_BACKOFF_BASE_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", "0.25"))
+UPSTREAM_BACKOFF_MAX_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_MAX_SECONDS", "4"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+ROUTER_BACKENDS = os.getenv("ROUTER_BACKENDS") or None
+ROUTER_EWMA_ALPHA = float(os.getenv("ROUTER_EWMA_ALPHA", "0.3"))
+ROUTER_ERROR_PENALTY = float(os.getenv("ROUTER_ERROR_PENALTY", "10"))
+
+def create_clients(api_key: Optional[str], base_url: Optional[str]):
+    return create_openai_clients(
+        api_key=api_key,
+        base_url=base_url,
+        max_connections=UPSTREAM_MAX_CONNECTIONS,
+        max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry_seconds=UPSTREAM_KEEPALIVE_EXPIRY_SECONDS,
+        connect_timeout_seconds=UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+        timeout_seconds=UPSTREAM_TIMEOUT_SECONDS
+    )
+
+def create_upstream_client() -> UpstreamClient:
+    return UpstreamClient(
+        breaker=CircuitBreaker(
+            failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout_seconds=CIRCUIT_RESET_SECONDS
+        ),
+        retry_policy=RetryPolicy(
+            max_retries=UPSTREAM_MAX_RETRIES,
+            base_delay_seconds=UPSTREAM_BACKOFF_BASE_SECONDS,
+            max_delay_seconds=UPSTREAM_BACKOFF_MAX_SECONDS,
+            deadline_seconds=UPSTREAM_DEADLINE_SECONDS
+        )
+    )
+
+# criados no startup ou no primeiro uso: montar o contexto TLS de cada cliente custa ~50ms, que não precisam pesar no import
+client = None
+async_client = None
+backend_credentials: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+upstream = create_upstream_client()
 
 MODEL = os.getenv("MODEL", "gpt-4o-mini")
 TEMPERATURE = float(os.getenv("TEMPERATURE", "0.8"))
 MAX_TOKENS = int(os.getenv("MAX_TOKENS", "500"))
 MAX_HISTORY_MESSAGES = int(os.getenv("MAX_HISTORY_MESSAGES", "20"))
+HISTORY_WINDOW_MODE = os.getenv("HISTORY_WINDOW_MODE", "messages")
+MAX_PROMPT_TOKENS = int(os.getenv("MAX_PROMPT_TOKENS", "3000"))
+MAX_STORED_MESSAGES = int(os.getenv("MAX_STORED_MESSAGES", "200"))
+SUMMARY_ENABLED = os.getenv("SUMMARY_ENABLED", "false").lower() == "true"
+SUMMARY_BATCH_TURNS = int(os.getenv("SUMMARY_BATCH_TURNS", "4"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "60"))
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_DB_FLUSH_INTERVAL_SECONDS = float(os.getenv("SESSION_DB_FLUSH_INTERVAL_SECONDS", "0.05"))
+SESSION_SNAPSHOT_PATH = os.getenv("SESSION_SNAPSHOT_PATH", "")
+SESSION_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("SESSION_SNAPSHOT_INTERVAL_SECONDS", "300"))
+
+def create_router(config: Optional[str]) -> Router:
+    if not config:
+        return Router(
+            [Backend("default", MODEL, upstream)],
+            alpha=ROUTER_EWMA_ALPHA,
+            error_penalty=ROUTER_ERROR_PENALTY,
+            deadline_seconds=UPSTREAM_DEADLINE_SECONDS
+        )
+    
+    backends = []
+    for entry in parse_backends_config(config):
+        backend_credentials[entry["name"]] = (
+            os.getenv(entry.get("api_key_env", "OPENAI_API_KEY")),
+            entry.get("base_url") or None
+        )
+        backends.append(Backend(entry["name"], entry["model"], create_upstream_client()))
+    
+    return Router(backends, alpha=ROUTER_EWMA_ALPHA, error_penalty=ROUTER_ERROR_PENALTY, deadline_seconds=UPSTREAM_DEADLINE_SECONDS)
+
+router = create_router(ROUTER_BACKENDS)
+
+def init_clients():
+    global client, async_client
+    
+    if client is None or async_client is None:
+        default_client, default_async_client = create_clients(os.getenv("OPENAI_API_KEY"), os.getenv("OPENAI_BASE_URL") or None)
+        client = client or default_client
+        async_client = async_client or default_async_client
+    
+    for backend in router.backends.values():
+        if backend.name in backend_credentials and (backend.client is None or backend.async_client is None):
+            backend.client, backend.async_client = create_clients(*backend_credentials[backend.name])
+
+def client_for(target: Backend):
+    if target.client is None and (client is None or target.name in backend_credentials):
+        init_clients()
+    return target.client or client
 
-BANNED_WORDS_PATTERN = re.compile(
-    r'\b(palavra_banida_exemplo)\b',
-    re.IGNORECASE
+def async_client_for(target: Backend):
+    if target.async_client is None and (async_client is None or target.name in backend_credentials):
+        init_clients()
+    return target.async_client or async_client
+
+async def warm_up_upstream(timeout_seconds: float) -> Dict[str, bool]:
+    init_clients()
+    names = list(router.backends)
+    results = await asyncio.gather(*(
+        warm_up_client(async_client_for(router.backends[name]), timeout_seconds) for name in names
+    ))
+    return dict(zip(names, results))
+
+PERSONAS_DIR = os.getenv("PERSONAS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "personas"))
+DEFAULT_PERSONA = os.getenv("DEFAULT_PERSONA") or None
+
+def create_persona_registry(directory: str) -> PersonaRegistry:
+    registry = PersonaRegistry(Persona(
+        PERSONA_CONFIG["id"],
+        PERSONA_CONFIG["name"],
+        SYSTEM_PROMPT,
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS,
+        backend=PERSONA_CONFIG["backend"],
+        token_model=MODEL
+    ))
+    
+    loaded = registry.load_directory(directory, {"model": MODEL, "temperature": TEMPERATURE, "max_tokens": MAX_TOKENS})
+    if loaded:
+        logger.info("%d personas carregadas de %s", loaded, directory)
+    
+    if DEFAULT_PERSONA:
+        registry.default_id = registry.get(DEFAULT_PERSONA).id
+    
+    return registry
+
+personas = create_persona_registry(PERSONAS_DIR)
+
+def stored_messages_limit() -> int:
+    # no modo tokens quem corta é o orçamento; o store guarda mais mensagens para a janela ter de onde escolher
+    if HISTORY_WINDOW_MODE == "tokens":
+        return MAX_STORED_MESSAGES
+    # com resumo, os turnos que saem da janela esperam no store até completar um lote
+    return MAX_HISTORY_MESSAGES + (2 * SUMMARY_BATCH_TURNS if SUMMARY_ENABLED else 0)
+
+def create_session_store(backend: str) -> SessionStore:
+    if backend == "sqlite":
+        return SQLiteSessionStore(
+            path=SESSION_DB_PATH,
+            max_sessions=MAX_SESSIONS,
+            ttl_seconds=SESSION_TTL_SECONDS,
+            max_messages=stored_messages_limit(),
+            flush_interval_seconds=SESSION_DB_FLUSH_INTERVAL_SECONDS
+        )
+    
+    if backend == "memory":
+        return InMemorySessionStore(
+            max_sessions=MAX_SESSIONS,
+            ttl_seconds=SESSION_TTL_SECONDS,
+            max_messages=stored_messages_limit()
+        )
+    
+    raise ValueError(f"SESSION_BACKEND inválido: {backend}")
+
+session_store = create_session_store(SESSION_BACKEND)
+
+# o SQLite já é persistente; o snapshot só faz sentido para o armazenamento em memória
+session_snapshots = SessionSnapshotter(
+    session_store, SESSION_SNAPSHOT_PATH, SESSION_SNAPSHOT_INTERVAL_SECONDS
+) if SESSION_SNAPSHOT_PATH and isinstance(session_store, InMemorySessionStore) else None
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH") or None
+
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+    path=RESPONSE_CACHE_PATH
 )
 
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_CAPACITY = int(os.getenv("SEMANTIC_CACHE_CAPACITY", "10000"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+
+# a matriz de vetores é alocada inteira na criação (e o numpy pesa no import); só existe com o cache ligado
+semantic_cache = None
+if SEMANTIC_CACHE_ENABLED:
+    from semantic_cache import SemanticCache
+    
+    semantic_cache = SemanticCache(
+        capacity=SEMANTIC_CACHE_CAPACITY,
+        threshold=SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds=RESPONSE_CACHE_TTL_SECONDS
+    )
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+single_flight = SingleFlight()
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("HEDGE_DEFAULT_DELAY_SECONDS", "2.0"))
+REFINEMENT_BUDGET_SECONDS = float(os.getenv("REFINEMENT_BUDGET_SECONDS", "3.0"))
+
+upstream_latency = LatencyTracker()
+hedge_policy = HedgePolicy(
+    tracker=upstream_latency,
+    quantile=HEDGE_QUANTILE,
+    min_samples=HEDGE_MIN_SAMPLES,
+    default_delay_seconds=HEDGE_DEFAULT_DELAY_SECONDS
+)
+refinement_stats: Dict[str, int] = {"refined": 0, "draft": 0}
+
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "200"))
+SUMMARY_INSTRUCTION = "Você mantém o resumo de uma conversa. Atualize o resumo anterior incorporando as novas mensagens, preservando fatos, nomes, preferências e perguntas em aberto do usuário. Responda apenas com o resumo, em um parágrafo curto."
+SUMMARY_PREFIX = "Resumo da conversa até aqui: "
+
+REFINEMENT_INSTRUCTION = "Refine a resposta acima mantendo o tom de {name} mas sendo mais direto e conciso."
+
+BANNED_TERMS_PATH = os.getenv("BANNED_TERMS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "banned_terms.txt"))
+BANNED_TERMS_RELOAD_SECONDS = float(os.getenv("BANNED_TERMS_RELOAD_SECONDS", "5"))
+
+banned_terms = BannedTermsFilter(BANNED_TERMS_PATH, BANNED_TERMS_RELOAD_SECONDS)
+
+CONTROL_CHARS = dict.fromkeys([*range(0x00, 0x09), *range(0x0E, 0x1C), 0x7F])
+
 def generate_session_id() -> str:
     return str(uuid.uuid4())
 
 def preprocess_message(message: str) -> str:
-    processed = " ".join(message.split())
+    processed = " ".join(message.translate(CONTROL_CHARS).split())
     
     if len(processed) > 2000:
         logger.warning("Mensagem truncada por exceder limite")
-        processed = processed[:2000]
-    
-    processed = re.sub(r'[\x00-\x08\x0B-\x0C\x0E-\x1F\x7F]', '', processed)
+        processed = processed[:2000].rstrip()
     
-    if not processed.strip():
+    if not processed:
         raise ValueError("Mensagem vazia após pré-processamento")
     
     return processed
 
 def moderate_message(message: str) -> Tuple[bool, Optional[str]]:
-    if BANNED_WORDS_PATTERN.search(message):
+    if banned_terms.find(message) is not None:
         return False, "Mensagem contém conteúdo inapropriado"
     
     return True, None
 
+async def run_store_call(func: Callable[..., T], *args) -> T:
+    # com SQLite, BEGIN IMMEDIATE espera até o timeout pelo lock de outro worker; numa thread, só esta requisição espera
+    if session_store.blocking:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
 def get_or_create_session(session_id: Optional[str]) -> str:
-    if session_id and session_id in conversation_history:
-        return session_id
-    
     new_session_id = session_id or generate_session_id()
-    conversation_history[new_session_id] = []
-    logger.info(f"Nova sessão criada: {new_session_id}")
+    bind_session(new_session_id)
+    
+    if session_store.get_or_create(new_session_id):
+        logger.info("Nova sessão criada: %s", new_session_id)
     
     return new_session_id
 
 def get_conversation_history(session_id: str) -> List[Dict[str, str]]:
-    return conversation_history.get(session_id, [])
+    return session_store.get_history(session_id)
 
 def truncate_history(history: List[Dict[str, str]], max_messages: int) -> List[Dict[str, str]]:
     if len(history) <= max_messages:
         return history
     
     truncated = history[-max_messages:]
-    logger.info(f"Histórico truncado de {len(history)} para {len(truncated)} mensagens")
+    logger.info("Histórico truncado de %d para %d mensagens", len(history), len(truncated))
     
     return truncated
 
-def add_to_history(session_id: str, user_msg: str, bot_msg: str):
-    if session_id not in conversation_history:
-        conversation_history[session_id] = []
+def token_window_start(entries: List[Tuple[Dict[str, str], int]], max_tokens: int) -> int:
+    start = len(entries)
+    used = 0
     
-    user_formatted, bot_formatted = format_message_for_history(user_msg, bot_msg)
+    for index in range(len(entries) - 1, -1, -1):
+        used += entries[index][1]
+        if used > max_tokens:
+            break
+        start = index
     
-    conversation_history[session_id].append({"role": "user", "content": user_formatted})
-    conversation_history[session_id].append({"role": "assistant", "content": bot_formatted})
+    while start < len(entries) and entries[start][0]["role"] != "user":
+        start += 1
     
-    conversation_history[session_id] = truncate_history(
-        conversation_history[session_id],
-        MAX_HISTORY_MESSAGES
+    return start
+
+def window_history_by_tokens(entries: List[Tuple[Dict[str, str], int]], max_tokens: int) -> List[Dict[str, str]]:
+    start = token_window_start(entries, max_tokens)
+    
+    if start > 0:
+        logger.info("Histórico truncado de %d para %d mensagens (orçamento de tokens)", len(entries), len(entries) - start)
+    
+    return [message for message, _ in entries[start:]]
+
+def history_token_budget(persona: Persona, current_message: str, summary: Optional[str]) -> int:
+    model = persona.model or MODEL
+    budget = MAX_PROMPT_TOKENS - persona.prefix_tokens - count_tokens(current_message, model)
+    if summary:
+        budget -= count_tokens(SUMMARY_PREFIX + summary, model)
+    return max(budget, 0)
+
+def get_prompt_history(session_id: str, current_message: str, summary: Optional[str] = None, persona: Optional[Persona] = None) -> List[Dict[str, str]]:
+    if HISTORY_WINDOW_MODE != "tokens":
+        return truncate_history(get_conversation_history(session_id), MAX_HISTORY_MESSAGES)
+    
+    persona = persona or personas.get()
+    budget = history_token_budget(persona, current_message, summary)
+    
+    return window_history_by_tokens(session_store.get_history_with_tokens(session_id), budget)
+
+def summarize_dropped_turns(session_id: str, persona: Persona):
+    # um resumo por vez por sessão; os turnos descartados nesse meio tempo entram no próximo lote
+    if summarizer.is_pending(session_id):
+        return
+    
+    entries = session_store.get_history_with_tokens(session_id)
+    if HISTORY_WINDOW_MODE == "tokens":
+        budget = history_token_budget(persona, "", session_store.get_summary(session_id))
+        dropped = token_window_start(entries, budget)
+    else:
+        dropped = len(entries) - MAX_HISTORY_MESSAGES
+    
+    # resumir a cada turno dobraria as chamadas ao upstream; espera juntar SUMMARY_BATCH_TURNS turnos fora da janela
+    if dropped >= 2 * max(SUMMARY_BATCH_TURNS, 1):
+        summarizer.schedule(session_id, [message for message, _ in entries[:dropped]], persona.name)
+
+def add_to_history(session_id: str, user_msg: str, bot_msg: str, persona: Optional[Persona] = None):
+    persona = persona or personas.get()
+    model = persona.model or MODEL
+    user_formatted, bot_formatted = format_message_for_history(user_msg, bot_msg)
+    
+    session_store.append(
+        session_id,
+        [
+            {"role": "user", "content": user_formatted},
+            {"role": "assistant", "content": bot_formatted}
+        ],
+        [count_tokens(user_formatted, model), count_tokens(bot_formatted, model)]
     )
+    
+    if SUMMARY_ENABLED:
+        summarize_dropped_turns(session_id, persona)
 
-def build_messages(history: List[Dict[str, str]], current_message: str) -> List[Dict[str, str]]:
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT}
-    ]
+def build_messages(history: List[Dict[str, str]], current_message: str, summary: Optional[str] = None, persona: Optional[Persona] = None) -> List[Dict[str, str]]:
+    messages = list((persona or personas.get()).prefix)
+    
+    if summary:
+        messages.append({"role": "system", "content": SUMMARY_PREFIX + summary})
     
     messages.extend(history)
     
@@ -102,26 +399,126 @@ def build_messages(history: List[Dict[str, str]], current_message: str) -> List[
     
     return messages
 
-def call_openai_api(messages: List[Dict[str, str]], temperature: float = TEMPERATURE) -> str:
+def resolve_backend(backend: Optional[str], persona: Optional[Persona] = None) -> Optional[str]:
+    preferred = backend or (persona or personas.get()).backend
+    if preferred:
+        router.get(preferred)
+    return preferred
+
+def model_for(target: Backend, model: Optional[str], preferred: Optional[str]) -> str:
+    # o modelo da persona vale só para o backend dela (ou o primeiro configurado); as reservas usam o próprio modelo
+    owner = preferred or next(iter(router.backends))
+    return model if model and target.name == owner else target.model
+
+def call_openai_api(messages: List[Dict[str, str]], temperature: float = TEMPERATURE, backend: Optional[str] = None, max_tokens: int = MAX_TOKENS, model: Optional[str] = None) -> str:
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
+        used, response = router.call(lambda target: client_for(target).chat.completions.create(
+            model=model_for(target, model, backend),
             messages=messages,
             temperature=temperature,
-            max_tokens=MAX_TOKENS,
-            timeout=30
-        )
+            max_tokens=max_tokens
+        ), preferred=backend)
+        
+        reply = response.choices[0].message.content
+        
+        record_usage(model_for(used, model, backend), response.usage)
+        logger.info("Resposta recebida de %s (tokens: %s)", used.name, response.usage.total_tokens)
+        
+        return reply
+    
+    except Exception as e:
+        logger.error("Erro na chamada à OpenAI API: %s", e)
+        raise
+
+async def call_openai_api_async(messages: List[Dict[str, str]], temperature: float = TEMPERATURE, backend: Optional[str] = None, max_tokens: int = MAX_TOKENS, model: Optional[str] = None) -> str:
+    if not SINGLE_FLIGHT_ENABLED:
+        return await request_openai_api_async(messages, temperature, backend, max_tokens, model)
+    
+    key = make_cache_key(f"{backend or ''}:{model or MODEL}:{max_tokens}", temperature, messages, normalize=False)
+    
+    return await single_flight.do(key, lambda: request_openai_api_async(messages, temperature, backend, max_tokens, model))
+
+async def request_openai_api_async(messages: List[Dict[str, str]], temperature: float = TEMPERATURE, backend: Optional[str] = None, max_tokens: int = MAX_TOKENS, model: Optional[str] = None) -> str:
+    async def attempt():
+        started = time.perf_counter()
+        result = await router.call_async(lambda target: async_client_for(target).chat.completions.create(
+            model=model_for(target, model, backend),
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        ), preferred=backend)
+        upstream_latency.record(time.perf_counter() - started)
+        return result
+    
+    try:
+        if HEDGE_ENABLED:
+            (used, response), _ = await hedged_call(attempt, hedge_policy)
+        else:
+            used, response = await attempt()
         
         reply = response.choices[0].message.content
         
-        logger.info(f"Resposta recebida da OpenAI (tokens: {response.usage.total_tokens})")
+        record_usage(model_for(used, model, backend), response.usage)
+        logger.info("Resposta recebida de %s (tokens: %s)", used.name, response.usage.total_tokens)
         
         return reply
     
     except Exception as e:
-        logger.error(f"Erro na chamada à OpenAI API: {str(e)}")
+        logger.error("Erro na chamada à OpenAI API: %s", e)
         raise
 
+async def stream_openai_api_async(messages: List[Dict[str, str]], temperature: float = TEMPERATURE, backend: Optional[str] = None, max_tokens: int = MAX_TOKENS, model: Optional[str] = None) -> AsyncIterator[str]:
+    try:
+        used, stream = await router.call_async(lambda target: async_client_for(target).chat.completions.create(
+            model=model_for(target, model, backend),
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        ), preferred=backend)
+        
+        parts = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+        
+        used_model = model_for(used, model, backend)
+        record_tokens(
+            used_model,
+            sum(count_tokens(message["content"], used_model) for message in messages),
+            count_tokens("".join(parts), used_model)
+        )
+        logger.info("Streaming da OpenAI concluído")
+    
+    except Exception as e:
+        logger.error("Erro no streaming da OpenAI API: %s", e)
+        mapped = map_error(e)
+        if mapped is e:
+            raise
+        raise mapped from e
+
+def build_summary_messages(previous: Optional[str], dropped: List[Dict[str, str]], assistant_name: str) -> List[Dict[str, str]]:
+    transcript = "\n".join(
+        f"{'Usuário' if message['role'] == 'user' else assistant_name}: {message['content']}" for message in dropped
+    )
+    
+    return [
+        {"role": "system", "content": SUMMARY_INSTRUCTION},
+        {"role": "user", "content": f"Resumo anterior: {previous or '(vazio)'}\n\nNovas mensagens:\n{transcript}"}
+    ]
+
+def summarize_turns(previous: Optional[str], dropped: List[Dict[str, str]], assistant_name: str) -> str:
+    return call_openai_api(build_summary_messages(previous, dropped, assistant_name), temperature=0.3, max_tokens=SUMMARY_MAX_TOKENS)
+
+async def summarize_turns_async(previous: Optional[str], dropped: List[Dict[str, str]], assistant_name: str) -> str:
+    return await request_openai_api_async(build_summary_messages(previous, dropped, assistant_name), temperature=0.3, max_tokens=SUMMARY_MAX_TOKENS)
+
+summarizer = RollingSummarizer(session_store, summarize_turns_async, summarize_turns)
+
 def postprocess_response(response: str) -> str:
     processed = " ".join(response.split())
     
@@ -129,42 +526,201 @@ def postprocess_response(response: str) -> str:
     
     return processed
 
-def ask_bot(message: str, session_id: Optional[str] = None, use_refinement: bool = False) -> Tuple[str, str]:
+def prepare_turn(message: str, session_id: Optional[str], persona: Persona) -> Tuple[str, str, List[Dict[str, str]]]:
+    started = time.perf_counter()
     processed_message = preprocess_message(message)
+    started = record_stage("preprocess", started)
     
     is_safe, reason = moderate_message(processed_message)
+    started = record_stage("moderate", started)
     if not is_safe:
         raise ValueError(f"Mensagem rejeitada: {reason}")
     
     session_id = get_or_create_session(session_id)
     
-    history = get_conversation_history(session_id)
+    summary = session_store.get_summary(session_id) if SUMMARY_ENABLED else None
+    
+    history = get_prompt_history(session_id, processed_message, summary, persona)
     
-    messages = build_messages(history, processed_message)
+    messages = build_messages(history, processed_message, summary, persona)
+    record_stage("history", started)
     
-    if use_refinement:
-        draft = call_openai_api(messages, temperature=0.9)
+    return processed_message, session_id, messages
+
+def build_refinement_messages(messages: List[Dict[str, str]], draft: str, persona: Optional[Persona] = None) -> List[Dict[str, str]]:
+    persona = persona or personas.get()
+    return messages + [
+        {"role": "assistant", "content": draft},
+        {"role": "user", "content": REFINEMENT_INSTRUCTION.format(name=persona.name)}
+    ]
+
+def is_cacheable(messages: List[Dict[str, str]], use_cache: bool) -> bool:
+    return use_cache and (RESPONSE_CACHE_ENABLED or semantic_cache is not None) and len(messages) == 2
+
+def response_cache_key(messages: List[Dict[str, str]], persona: Persona, backend: Optional[str]) -> str:
+    # o backend entra na chave: uma resposta do modelo de reserva não pode ser servida a quem pediu o padrão
+    return make_cache_key(f"{backend or ''}:{persona.model or MODEL}", persona.temperature, messages)
+
+def get_cached_response(messages: List[Dict[str, str]], persona: Persona, backend: Optional[str] = None) -> Optional[str]:
+    if RESPONSE_CACHE_ENABLED:
+        cached = response_cache.get(response_cache_key(messages, persona, backend))
+        if cached is not None:
+            return cached
+    
+    # o cache semântico compara só a pergunta, então vale apenas para a persona padrão no backend padrão
+    if semantic_cache is not None and persona.id == personas.default_id and not backend:
+        return semantic_cache.lookup(messages[-1]["content"])
+    
+    return None
+
+def store_cached_response(messages: List[Dict[str, str]], response: str, persona: Persona, backend: Optional[str] = None):
+    if RESPONSE_CACHE_ENABLED:
+        response_cache.set(response_cache_key(messages, persona, backend), response)
+    
+    if semantic_cache is not None and persona.id == personas.default_id and not backend:
+        semantic_cache.add(messages[-1]["content"], response)
+
+def ask_bot(message: str, session_id: Optional[str] = None, use_refinement: bool = False, use_cache: bool = True, backend: Optional[str] = None, persona_id: Optional[str] = None) -> Tuple[str, str]:
+    persona = personas.get(persona_id)
+    backend = resolve_backend(backend, persona)
+    processed_message, session_id, messages = prepare_turn(message, session_id, persona)
+    
+    cacheable = is_cacheable(messages, use_cache and not use_refinement)
+    final_response = get_cached_response(messages, persona, backend) if cacheable else None
+    
+    if final_response is None:
+        started = time.perf_counter()
+        if use_refinement:
+            draft = call_openai_api(messages, temperature=0.9, backend=backend, max_tokens=persona.max_tokens, model=persona.model)
+            response = call_openai_api(build_refinement_messages(messages, draft, persona), temperature=0.7, backend=backend, max_tokens=persona.max_tokens, model=persona.model)
+        else:
+            response = call_openai_api(messages, persona.temperature, backend, persona.max_tokens, persona.model)
+        started = record_stage("upstream", started)
         
-        refinement_messages = messages + [
-            {"role": "assistant", "content": draft},
-            {"role": "user", "content": "Refine a resposta acima mantendo o tom de Rick Sanchez mas sendo mais direto e conciso."}
-        ]
-        response = call_openai_api(refinement_messages, temperature=0.7)
-    else:
-        response = call_openai_api(messages)
+        final_response = postprocess_response(response)
+        record_stage("postprocess", started)
+        
+        if cacheable:
+            store_cached_response(messages, final_response, persona, backend)
     
-    final_response = postprocess_response(response)
+    add_to_history(session_id, processed_message, final_response, persona)
     
-    add_to_history(session_id, processed_message, final_response)
+    return final_response, session_id
+
+async def refine_within_budget(messages: List[Dict[str, str]], draft: str, backend: Optional[str] = None, persona: Optional[Persona] = None) -> Tuple[str, str]:
+    persona = persona or personas.get()
+    try:
+        refined = await asyncio.wait_for(
+            call_openai_api_async(
+                build_refinement_messages(messages, draft, persona),
+                temperature=0.7,
+                backend=backend,
+                max_tokens=persona.max_tokens,
+                model=persona.model
+            ),
+            REFINEMENT_BUDGET_SECONDS
+        )
+    except asyncio.TimeoutError:
+        refinement_stats["draft"] += 1
+        logger.info("Refinamento excedeu o orçamento de %ss, usando o rascunho", REFINEMENT_BUDGET_SECONDS)
+        return draft, "draft"
+    
+    refinement_stats["refined"] += 1
+    return refined, "refined"
+
+async def ask_bot_async(message: str, session_id: Optional[str] = None, use_refinement: bool = False, use_cache: bool = True, backend: Optional[str] = None, persona_id: Optional[str] = None) -> Tuple[str, str]:
+    persona = personas.get(persona_id)
+    backend = resolve_backend(backend, persona)
+    processed_message, session_id, messages = await run_store_call(prepare_turn, message, session_id, persona)
+    
+    cacheable = is_cacheable(messages, use_cache and not use_refinement)
+    final_response = get_cached_response(messages, persona, backend) if cacheable else None
+    
+    if final_response is None:
+        started = time.perf_counter()
+        if use_refinement:
+            draft = await call_openai_api_async(messages, temperature=0.9, backend=backend, max_tokens=persona.max_tokens, model=persona.model)
+            response, _ = await refine_within_budget(messages, draft, backend, persona)
+        else:
+            response = await call_openai_api_async(messages, persona.temperature, backend, persona.max_tokens, persona.model)
+        started = record_stage("upstream", started)
+        
+        final_response = postprocess_response(response)
+        record_stage("postprocess", started)
+        
+        if cacheable:
+            store_cached_response(messages, final_response, persona, backend)
+    
+    await run_store_call(add_to_history, session_id, processed_message, final_response, persona)
     
     return final_response, session_id
 
+async def ask_bot_stream(message: str, session_id: Optional[str] = None, use_cache: bool = True, use_refinement: bool = False, backend: Optional[str] = None, persona_id: Optional[str] = None) -> Tuple[str, AsyncIterator[Tuple[str, str]]]:
+    persona = personas.get(persona_id)
+    backend = resolve_backend(backend, persona)
+    processed_message, session_id, messages = await run_store_call(prepare_turn, message, session_id, persona)
+    
+    cacheable = is_cacheable(messages, use_cache and not use_refinement)
+    
+    async def events() -> AsyncIterator[Tuple[str, str]]:
+        final_response = get_cached_response(messages, persona, backend) if cacheable else None
+        
+        if final_response is None:
+            started = time.perf_counter()
+            chunks = []
+            temperature = 0.9 if use_refinement else persona.temperature
+            async for delta in stream_openai_api_async(messages, temperature, backend, persona.max_tokens, persona.model):
+                chunks.append(delta)
+                yield "delta", delta
+            started = record_stage("upstream", started)
+            
+            final_response = postprocess_response("".join(chunks))
+            record_stage("postprocess", started)
+            
+            if use_refinement:
+                refined, path = await refine_within_budget(messages, final_response, backend, persona)
+                if path == "refined":
+                    final_response = postprocess_response(refined)
+                    yield "replace", final_response
+            
+            if cacheable:
+                store_cached_response(messages, final_response, persona, backend)
+        else:
+            yield "delta", final_response
+        
+        await run_store_call(add_to_history, session_id, processed_message, final_response, persona)
+        
+        yield "done", final_response
+    
+    return session_id, events()
+
 def clear_session_history(session_id: str) -> bool:
-    if session_id in conversation_history:
-        del conversation_history[session_id]
-        logger.info(f"Histórico da sessão {session_id} limpo")
+    if session_store.delete(session_id):
+        logger.info("Histórico da sessão %s limpo", session_id)
         return True
     return False
 
 def get_active_sessions_count() -> int:
-    return len(conversation_history)
+    return len(session_store)
+
+def get_session_stats() -> Dict[str, object]:
+    stats = session_store.stats()
+    if SUMMARY_ENABLED:
+        stats["summaries"] = summarizer.stats()
+    return stats
+
+def get_cache_stats() -> Dict[str, Dict[str, float]]:
+    return {
+        "exact": response_cache.stats(),
+        "semantic": semantic_cache.stats() if semantic_cache is not None else {"size": 0, "capacity": 0, "hits": 0, "misses": 0, "hit_rate": 0.0},
+        "single_flight": single_flight.stats(),
+    }
+
+def get_upstream_stats() -> Dict[str, object]:
+    return {
+        "latency_p50_seconds": upstream_latency.percentile(0.5),
+        "latency_p95_seconds": upstream_latency.percentile(0.95),
+        "hedge": hedge_policy.stats(),
+        "refinement": dict(refinement_stats),
+        "router": router.stats(),
+    }
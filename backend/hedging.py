@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class HedgePolicy:
+    def __init__(self, tracker: LatencyTracker, quantile: float, min_samples: int, default_delay_seconds: float):
+        self.tracker = tracker
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.default_delay_seconds = default_delay_seconds
+        self.wins: Dict[str, int] = {"primary": 0, "hedge": 0}
+        self.hedged = 0
+
+    def delay(self) -> float:
+        if len(self.tracker) < self.min_samples:
+            return self.default_delay_seconds
+        return self.tracker.percentile(self.quantile)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "delay_seconds": self.delay(),
+            "hedged": self.hedged,
+            "wins": dict(self.wins),
+        }
+
+async def hedged_call(fn: Callable[[], Awaitable[Any]], policy: HedgePolicy) -> Tuple[Any, str]:
+    primary = asyncio.ensure_future(fn())
+    tasks = {primary: "primary"}
+
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=policy.delay())
+        if not done:
+            policy.hedged += 1
+            logger.info("Resposta lenta do serviço de IA, enviando requisição duplicada (hedge)")
+            tasks[asyncio.ensure_future(fn())] = "hedge"
+
+        pending = set(tasks)
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            succeeded = [task for task in done if task.exception() is None]
+            if succeeded:
+                winner = tasks[succeeded[0]]
+                policy.wins[winner] += 1
+                return succeeded[0].result(), winner
+            if not pending:
+                return next(iter(done)).result(), tasks[next(iter(done))]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
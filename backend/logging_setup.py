@@ -0,0 +1,160 @@
+import sys
+import json
+import zlib
+import queue
+import atexit
+import logging
+import datetime
+import logging.handlers
+from typing import Dict, Optional
+
+from request_context import current_context
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+class RequestContextFilter(logging.Filter):
+    # roda na thread de quem loga: o ContextVar não existe na thread que escreve
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = current_context()
+        if context is not None:
+            record.request_id = context.request_id
+            record.session_id = context.session_id
+            record.timings = dict(context.timings)
+            record.tokens = context.tokens
+        return True
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.threshold = int(max(0.0, min(sample_rate, 1.0)) * 10000)
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.threshold >= 10000:
+            return True
+
+        request_id = getattr(record, "request_id", None)
+        if request_id is None:
+            return True
+
+        # a decisão depende só do request_id: uma requisição amostrada aparece inteira
+        if zlib.crc32(request_id.encode("ascii", "replace")) % 10000 < self.threshold:
+            return True
+
+        self.dropped += 1
+        return False
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+            if record.session_id:
+                entry["session_id"] = record.session_id
+            if record.timings:
+                entry["timings_ms"] = {stage: round(seconds * 1000, 2) for stage, seconds in record.timings.items()}
+            if record.tokens:
+                entry["tokens"] = record.tokens
+
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue, full_timeout_seconds: float = 0.01):
+        super().__init__(log_queue)
+        # quanto um aviso ou erro pode esperar vaga na fila; quem loga costuma ser o event loop
+        self.full_timeout_seconds = full_timeout_seconds
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # sem formatar aqui: a mensagem é montada na thread de escrita, fora do event loop
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING:
+                try:
+                    self.queue.put(record, timeout=self.full_timeout_seconds)
+                    return
+                except queue.Full:
+                    pass
+            self.dropped += 1
+
+class LoggingState:
+    def __init__(self):
+        self.handler: Optional[logging.Handler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self.queue_handler: Optional[BackgroundQueueHandler] = None
+        self.sampling: Optional[SamplingFilter] = None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "async": self.listener is not None,
+            "queued": self.queue_handler.queue.qsize() if self.queue_handler is not None else 0,
+            "dropped_queue_full": self.queue_handler.dropped if self.queue_handler is not None else 0,
+            "dropped_sampling": self.sampling.dropped if self.sampling is not None else 0,
+        }
+
+state = LoggingState()
+
+def configure_logging(
+    level: str = "INFO",
+    log_format: str = "text",
+    background: bool = False,
+    sample_rate: float = 1.0,
+    queue_size: int = 10000
+) -> LoggingState:
+    stop_logging()
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    state.sampling = SamplingFilter(sample_rate)
+    if background:
+        state.queue_handler = BackgroundQueueHandler(queue.Queue(maxsize=queue_size))
+        state.listener = logging.handlers.QueueListener(state.queue_handler.queue, output, respect_handler_level=True)
+        state.handler = state.queue_handler
+    else:
+        state.handler = output
+
+    state.handler.addFilter(RequestContextFilter())
+    state.handler.addFilter(state.sampling)
+
+    root = logging.getLogger()
+    root.addHandler(state.handler)
+    root.setLevel(level.upper())
+
+    if background or log_format == "json":
+        # o access log do uvicorn escreve direto no terminal; passa a usar a mesma fila e formato
+        for name in UVICORN_LOGGERS:
+            uvicorn_logger = logging.getLogger(name)
+            uvicorn_logger.handlers = []
+            uvicorn_logger.propagate = True
+
+    if state.listener is not None:
+        state.listener.start()
+    return state
+
+def stop_logging():
+    if state.handler is not None:
+        logging.getLogger().removeHandler(state.handler)
+        state.handler = None
+
+    if state.listener is not None:
+        state.listener.stop()
+        state.listener = None
+        state.queue_handler = None
+
+atexit.register(stop_logging)
@@ -0,0 +1,143 @@
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    ProcessCollector,
+    GCCollector,
+    generate_latest,
+    CONTENT_TYPE_LATEST
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from request_context import add_timing, add_tokens
+
+STAGES = ("queue", "preprocess", "moderate", "history", "upstream", "postprocess")
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+registry = CollectorRegistry()
+ProcessCollector(registry=registry)
+GCCollector(registry=registry)
+
+stage_seconds = Histogram(
+    "chatbot_stage_seconds",
+    "Duração de cada etapa do processamento de uma mensagem",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+    registry=registry
+)
+tokens_total = Counter(
+    "chatbot_tokens",
+    "Tokens consumidos no serviço de IA",
+    ["model", "kind"],
+    registry=registry
+)
+errors_total = Counter(
+    "chatbot_errors",
+    "Erros nas requisições de chat por tipo",
+    ["type"],
+    registry=registry
+)
+in_flight_requests = Gauge(
+    "chatbot_in_flight_requests",
+    "Requisições de chat em processamento",
+    registry=registry
+)
+active_sessions = Gauge(
+    "chatbot_active_sessions",
+    "Sessões ativas no armazenamento",
+    registry=registry
+)
+websocket_connections = Gauge(
+    "chatbot_websocket_connections",
+    "Conexões WebSocket de chat abertas",
+    registry=registry
+)
+
+_stage_observers = {stage: stage_seconds.labels(stage).observe for stage in STAGES}
+
+def record_stage(stage: str, started: float) -> float:
+    now = time.perf_counter()
+    _stage_observers[stage](now - started)
+    add_timing(stage, now - started)
+    return now
+
+def record_tokens(model: str, prompt_tokens: int, completion_tokens: int):
+    tokens_total.labels(model, "prompt").inc(prompt_tokens)
+    tokens_total.labels(model, "completion").inc(completion_tokens)
+    add_tokens(prompt_tokens + completion_tokens)
+
+def record_usage(model: str, usage: Any):
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if isinstance(prompt_tokens, int) and isinstance(completion_tokens, int):
+        record_tokens(model, prompt_tokens, completion_tokens)
+
+def record_error(error_type: str):
+    errors_total.labels(error_type).inc()
+
+class StatsCollector:
+    def __init__(
+        self,
+        cache_stats: Callable[[], Dict[str, Dict[str, float]]],
+        session_stats: Optional[Callable[[], Dict[str, Any]]] = None
+    ):
+        self.cache_stats = cache_stats
+        self.session_stats = session_stats
+
+    def collect(self):
+        stats = self.cache_stats()
+
+        hits = CounterMetricFamily("chatbot_cache_hits", "Respostas atendidas pelo cache", labels=["cache"])
+        misses = CounterMetricFamily("chatbot_cache_misses", "Consultas ao cache sem resposta", labels=["cache"])
+        size = GaugeMetricFamily("chatbot_cache_entries", "Entradas armazenadas no cache", labels=["cache"])
+        for cache in ("exact", "semantic"):
+            hits.add_metric([cache], stats[cache]["hits"])
+            misses.add_metric([cache], stats[cache]["misses"])
+            size.add_metric([cache], stats[cache]["size"])
+
+        coalesced = CounterMetricFamily(
+            "chatbot_single_flight_coalesced",
+            "Requisições atendidas por uma chamada idêntica em andamento"
+        )
+        coalesced.add_metric([], stats["single_flight"]["coalesced"])
+
+        metrics = [hits, misses, size, coalesced]
+        if self.session_stats is not None:
+            sessions = self.session_stats()
+            evicted = CounterMetricFamily(
+                "chatbot_sessions_evicted",
+                "Sessões removidas do armazenamento por motivo",
+                labels=["reason"]
+            )
+            evicted.add_metric(["lru"], sessions["evicted_lru"])
+            evicted.add_metric(["ttl"], sessions["evicted_ttl"])
+            capacity = GaugeMetricFamily("chatbot_sessions_max", "Capacidade máxima de sessões do armazenamento")
+            capacity.add_metric([], sessions["max_sessions"])
+            metrics.extend([evicted, capacity])
+
+        return metrics
+
+_stats_collector: Optional[StatsCollector] = None
+
+def register_sources(
+    sessions: Callable[[], int],
+    in_flight: Callable[[], int],
+    cache_stats: Callable[[], Dict[str, Dict[str, float]]],
+    session_stats: Optional[Callable[[], Dict[str, Any]]] = None
+):
+    global _stats_collector
+
+    active_sessions.set_function(sessions)
+    in_flight_requests.set_function(in_flight)
+
+    if _stats_collector is not None:
+        registry.unregister(_stats_collector)
+    _stats_collector = StatsCollector(cache_stats, session_stats)
+    registry.register(_stats_collector)
+
+def render() -> Tuple[bytes, str]:
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,169 @@
+import os
+import time
+import logging
+import threading
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMBINING_MARK_RANGES = ((0x0300, 0x0370), (0x1AB0, 0x1B00), (0x1DC0, 0x1E00), (0x20D0, 0x2100), (0xFE20, 0xFE30))
+STRIP_COMBINING_MARKS = {code: None for start, end in COMBINING_MARK_RANGES for code in range(start, end)}
+
+def fold(text: str) -> str:
+    if text.isascii():
+        return text.lower()
+    return unicodedata.normalize("NFKD", text).translate(STRIP_COMBINING_MARKS).casefold()
+
+def is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+class TermAutomaton:
+    def __init__(self, terms: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        self._size = 0
+
+        for term in terms:
+            self._insert(" ".join(fold(term).split()))
+        self._link()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _insert(self, term: str):
+        if not term:
+            return
+
+        state = 0
+        for char in term:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = following
+
+        if term not in self._out[state]:
+            self._out[state] += (term,)
+            self._size += 1
+
+    def _link(self):
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, following in goto[state].items():
+                queue.append(following)
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                target = goto[link].get(char, 0)
+                if target == following:
+                    target = 0
+                fail[following] = target
+                if out[target]:
+                    out[following] += out[target]
+
+    def find(self, text: str) -> Optional[str]:
+        goto, fail, out = self._goto, self._fail, self._out
+        length = len(text)
+        state = 0
+
+        for index, char in enumerate(text):
+            following = goto[state].get(char)
+            while following is None and state:
+                state = fail[state]
+                following = goto[state].get(char)
+            state = following or 0
+
+            if not out[state]:
+                continue
+
+            end = index + 1
+            for term in out[state]:
+                if end < length and is_word_char(term[-1]) and is_word_char(text[end]):
+                    continue
+                start = end - len(term)
+                if start > 0 and is_word_char(term[0]) and is_word_char(text[start - 1]):
+                    continue
+                return term
+
+        return None
+
+class BannedTermsFilter:
+    def __init__(self, path: Optional[str], reload_interval_seconds: float = 5.0):
+        self.path = path
+        self.reload_interval_seconds = reload_interval_seconds
+        self.reloads = 0
+        self._automaton = TermAutomaton(())
+        self._version: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reloader: Optional[threading.Thread] = None
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self._automaton)
+
+    def reload(self) -> bool:
+        if not self.path:
+            return False
+
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            if self._version is not None or self.reloads == 0:
+                logger.warning("Lista de termos banidos indisponível: %s", e)
+            self._version = None
+            return False
+
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self._version:
+            return False
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            terms = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+        self._automaton = TermAutomaton(terms)
+        self._version = version
+        self.reloads += 1
+        logger.info("Lista de termos banidos carregada: %d termos", len(self._automaton))
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval_seconds or not self._lock.acquire(blocking=False):
+            return
+
+        # montar o autômato de uma lista grande leva segundos: roda fora do event loop e as
+        # requisições seguem usando o autômato antigo até a troca da referência em reload()
+        self._checked_at = now
+        try:
+            self._reloader = threading.Thread(target=self._reload_in_background, name="banned-terms-reload", daemon=True)
+            self._reloader.start()
+        except RuntimeError:
+            self._lock.release()
+            raise
+
+    def _reload_in_background(self):
+        try:
+            self.reload()
+        except (OSError, ValueError) as e:
+            logger.error("Erro ao recarregar a lista de termos banidos: %s", e)
+        finally:
+            self._lock.release()
+
+    def join(self, timeout: Optional[float] = None):
+        reloader = self._reloader
+        if reloader is not None:
+            reloader.join(timeout)
+
+    def find(self, text: str) -> Optional[str]:
+        self._maybe_reload()
+        return self._automaton.find(fold(text))
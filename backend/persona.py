@@ -1,3 +1,10 @@
+import os
+import json
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from tokenizer import count_tokens
+
 SYSTEM_PROMPT = """Você é Rick Sanchez, o cientista mais brilhante do multiverso. Você é conhecido por:
 
 PERSONALIDADE CORE:
@@ -77,9 +84,129 @@ def get_truncation_message() -> str:
     return "[Histórico anterior truncado por limite de contexto]"
 
 PERSONA_CONFIG = {
+    "id": "rick",
     "name": "Rick Sanchez",
     "version": "Acadêmica Controlada",
     "max_history_messages": 20,
     "temperature": 0.8,
     "max_tokens": 500,
+    "backend": None,
 }
+
+class SystemMessage(dict):
+    __slots__ = ()
+    
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Mensagens de sistema das personas são imutáveis")
+    
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _immutable
+    
+    def __reduce__(self):
+        return SystemMessage, (dict(self),)
+
+class Persona:
+    __slots__ = (
+        "id", "name", "system_prompt", "model", "temperature", "max_tokens", "backend",
+        "prefix", "prefix_tokens", "fingerprint"
+    )
+    
+    def __init__(
+        self,
+        persona_id: str,
+        name: str,
+        system_prompt: str,
+        model: Optional[str] = None,
+        temperature: float = 0.8,
+        max_tokens: int = 500,
+        backend: Optional[str] = None,
+        token_model: str = "gpt-4o-mini"
+    ):
+        self.id = persona_id
+        self.name = name
+        self.system_prompt = system_prompt
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.backend = backend
+        
+        # Prefixo montado uma vez e compartilhado por todas as requisições, idêntico byte a byte
+        self.prefix: Tuple[SystemMessage, ...] = (SystemMessage(role="system", content=system_prompt),)
+        self.prefix_tokens = count_tokens(system_prompt, model or token_model)
+        self.fingerprint = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+    
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "backend": self.backend,
+            "prefix_tokens": self.prefix_tokens,
+            "fingerprint": self.fingerprint,
+        }
+
+def load_persona_file(path: str, defaults: Dict[str, Any]) -> Persona:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except ValueError as e:
+        raise ValueError(f"Persona inválida em {path}: {str(e)}")
+    
+    if not isinstance(entry, dict) or not entry.get("id"):
+        raise ValueError(f"Persona em {path} precisa de 'id'")
+    
+    prompt = entry.get("system_prompt")
+    if entry.get("system_prompt_file"):
+        with open(os.path.join(os.path.dirname(path), entry["system_prompt_file"]), "r", encoding="utf-8") as f:
+            prompt = f.read().strip()
+    if not prompt:
+        raise ValueError(f"Persona {entry['id']} precisa de 'system_prompt' ou 'system_prompt_file'")
+    
+    return Persona(
+        entry["id"],
+        entry.get("name", entry["id"]),
+        prompt,
+        model=entry.get("model"),
+        temperature=float(entry.get("temperature", defaults["temperature"])),
+        max_tokens=int(entry.get("max_tokens", defaults["max_tokens"])),
+        backend=entry.get("backend"),
+        token_model=defaults["model"]
+    )
+
+class PersonaRegistry:
+    def __init__(self, default: Persona):
+        self.default_id = default.id
+        self._personas: Dict[str, Persona] = {default.id: default}
+    
+    def __len__(self) -> int:
+        return len(self._personas)
+    
+    def add(self, persona: Persona):
+        if persona.id in self._personas:
+            raise ValueError(f"Persona duplicada: {persona.id}")
+        self._personas[persona.id] = persona
+    
+    def load_directory(self, directory: str, defaults: Dict[str, Any]) -> int:
+        if not os.path.isdir(directory):
+            return 0
+        
+        loaded = 0
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".json"):
+                self.add(load_persona_file(os.path.join(directory, name), defaults))
+                loaded += 1
+        
+        return loaded
+    
+    def get(self, persona_id: Optional[str] = None) -> Persona:
+        persona = self._personas.get(persona_id or self.default_id)
+        if persona is None:
+            raise ValueError(f"Persona desconhecida: {persona_id}")
+        return persona
+    
+    def list(self) -> List[Dict[str, Any]]:
+        return [
+            {**persona.describe(), "default": persona.id == self.default_id}
+            for persona in self._personas.values()
+        ]
@@ -0,0 +1,132 @@
+import asyncio
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import time
+from typing import Dict, List, Optional
+
+from starlette.types import Scope
+
+logger = logging.getLogger(__name__)
+
+PROFILE_NAME = re.compile(r"^[\w.-]+\.prof$")
+
+class ProfileRun:
+    __slots__ = ("name", "profile")
+
+    def __init__(self, name: str, profile: cProfile.Profile):
+        self.name = name
+        self.profile = profile
+
+class RequestProfiler:
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 0.0,
+        token: Optional[str] = None,
+        header: str = "x-profile-token",
+        keep: int = 50
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token
+        self.header = header.lower().encode("latin-1")
+        self.keep = keep
+        self.captured = 0
+        self.skipped = 0
+        self._active = False
+        self._sequence = 0
+
+    def requested(self, scope: Scope) -> bool:
+        if self.token:
+            for key, value in scope.get("headers", []):
+                if key == self.header:
+                    return hmac.compare_digest(value, self.token.encode("latin-1"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, scope: Scope) -> Optional[ProfileRun]:
+        if not self.requested(scope):
+            return None
+
+        # cProfile mede a thread inteira: só um perfil por vez
+        if self._active:
+            self.skipped += 1
+            return None
+
+        self._active = True
+        self._sequence += 1
+        path = re.sub(r"[^\w]+", "-", scope.get("path", "")).strip("-") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self._sequence:04d}-{scope.get('method', 'GET')}-{path}.prof"
+
+        profile = cProfile.Profile()
+        profile.enable()
+        return ProfileRun(name, profile)
+
+    async def finish(self, run: ProfileRun):
+        run.profile.disable()
+        self._active = False
+
+        try:
+            await asyncio.to_thread(self._save, run)
+        except OSError as e:
+            logger.warning("Falha ao salvar o perfil %s: %s", run.name, e)
+            return
+
+        self.captured += 1
+
+    def _save(self, run: ProfileRun):
+        os.makedirs(self.directory, exist_ok=True)
+        run.profile.dump_stats(os.path.join(self.directory, run.name))
+        self._prune()
+
+    def _prune(self):
+        profiles = sorted(
+            (entry for entry in os.scandir(self.directory) if PROFILE_NAME.match(entry.name)),
+            key=lambda entry: entry.stat().st_mtime_ns,
+            reverse=True
+        )
+        for entry in profiles[self.keep:]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def list(self) -> List[Dict[str, object]]:
+        if not os.path.isdir(self.directory):
+            return []
+
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if PROFILE_NAME.match(entry.name):
+                info = entry.stat()
+                profiles.append({"name": entry.name, "size": info.st_size, "created": info.st_mtime})
+        profiles.sort(key=lambda profile: profile["created"], reverse=True)
+        return profiles
+
+    def path(self, name: str) -> Optional[str]:
+        if not PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def report(self, name: str, limit: int = 40, sort: str = "cumulative") -> Optional[str]:
+        path = self.path(name)
+        if path is None:
+            return None
+
+        output = io.StringIO()
+        pstats.Stats(path, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "sample_rate": self.sample_rate,
+            "captured": self.captured,
+            "skipped": self.skipped,
+            "active": self._active,
+        }
@@ -0,0 +1,136 @@
+import sys
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+class RateLimited(Exception):
+    def __init__(self, detail: str, retry_after: int = 1):
+        super().__init__(detail)
+        self.status_code = 429
+        self.detail = detail
+        self.retry_after = retry_after
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+class BucketTable:
+    def __init__(self, rate_per_second: float, burst: float, idle_seconds: float, max_keys: int):
+        self.rate = rate_per_second
+        self.burst = burst
+        # um balde parado por burst / rate já está cheio; removê-lo antes disso liberaria crédito
+        self.idle_seconds = max(idle_seconds, burst / rate_per_second)
+        self.max_keys = max_keys
+        self.evicted = 0
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def refill(self, key: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.burst, now)
+            self._buckets[key] = bucket
+            self._evict(now)
+            return bucket
+
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+        bucket.updated = now
+        self._buckets.move_to_end(key)
+        return bucket
+
+    def wait(self, bucket: TokenBucket, cost: float) -> float:
+        if bucket.tokens >= cost:
+            return 0.0
+        return (cost - bucket.tokens) / self.rate
+
+    def _evict(self, now: float):
+        # os baldes ficam em ordem de uso, então os ociosos estão sempre no início
+        buckets = self._buckets
+        while buckets:
+            bucket = next(iter(buckets.values()))
+            if len(buckets) <= self.max_keys and now - bucket.updated <= self.idle_seconds:
+                break
+            buckets.popitem(last=False)
+            self.evicted += 1
+
+class RateLimiter:
+    def __init__(
+        self,
+        requests_per_minute: float,
+        request_burst: float,
+        tokens_per_minute: float = 0,
+        token_burst: Optional[float] = None,
+        idle_seconds: float = 600,
+        max_keys: int = 100000
+    ):
+        self.requests = BucketTable(
+            requests_per_minute / 60, request_burst, idle_seconds, max_keys
+        ) if requests_per_minute > 0 else None
+        self.tokens = BucketTable(
+            tokens_per_minute / 60, token_burst or tokens_per_minute, idle_seconds, max_keys
+        ) if tokens_per_minute > 0 else None
+        self.allowed = 0
+        self.rejected = 0
+
+    @property
+    def max_cost(self) -> int:
+        return int(self.requests.burst) if self.requests is not None else sys.maxsize
+
+    @staticmethod
+    def keys(session_id: Optional[str], client_ip: Optional[str]) -> Tuple[str, ...]:
+        ip_key = f"ip:{client_ip or 'anonymous'}"
+        return (f"session:{session_id}", ip_key) if session_id else (ip_key,)
+
+    def acquire(self, keys: Sequence[str], cost: float = 1):
+        now = time.monotonic()
+        wait = 0.0
+
+        request_buckets: List[TokenBucket] = []
+        if self.requests is not None:
+            if cost > self.max_cost:
+                # nunca caberia no balde, nem esperando; quem chama recusa antes (ver max_cost), sem 429 e Retry-After
+                raise ValueError(f"Custo {cost} maior que a rajada de requisições ({self.max_cost})")
+            for key in keys:
+                bucket = self.requests.refill(key, now)
+                request_buckets.append(bucket)
+                wait = max(wait, self.requests.wait(bucket, cost))
+
+        # o custo em tokens só é conhecido no fim; aqui basta não haver dívida
+        if self.tokens is not None:
+            for key in keys:
+                wait = max(wait, self.tokens.wait(self.tokens.refill(key, now), 0))
+
+        if wait > 0:
+            self.rejected += 1
+            raise RateLimited(
+                "Limite de requisições excedido. Tente novamente em instantes.",
+                retry_after=max(1, math.ceil(wait))
+            )
+
+        for bucket in request_buckets:
+            bucket.tokens -= cost
+        self.allowed += 1
+
+    def charge(self, keys: Sequence[str], tokens: int):
+        if self.tokens is None or tokens <= 0:
+            return
+
+        now = time.monotonic()
+        for key in keys:
+            bucket = self.tokens.refill(key, now)
+            bucket.tokens = max(bucket.tokens - tokens, -self.tokens.burst)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "request_buckets": len(self.requests) if self.requests is not None else 0,
+            "token_buckets": len(self.tokens) if self.tokens is not None else 0,
+            "evicted": sum(table.evicted for table in (self.requests, self.tokens) if table is not None),
+        }
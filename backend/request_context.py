@@ -0,0 +1,100 @@
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from profiling import RequestProfiler
+
+REQUEST_ID_HEADER = b"x-request-id"
+# IDs vindos de proxies são aceitos só se forem curtos e sem caracteres estranhos
+VALID_REQUEST_ID = re.compile(rb"^[\w.:-]{1,128}$")
+
+class RequestContext:
+    __slots__ = ("timings", "tokens", "request_id", "session_id")
+
+    def __init__(self, request_id: Optional[str] = None):
+        self.timings: Dict[str, float] = {}
+        self.tokens = 0
+        self.request_id = request_id or uuid.uuid4().hex
+        self.session_id: Optional[str] = None
+
+_context: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+def bind_context(request_id: Optional[str] = None) -> RequestContext:
+    context = RequestContext(request_id)
+    _context.set(context)
+    return context
+
+def current_context() -> Optional[RequestContext]:
+    return _context.get()
+
+def bind_session(session_id: str):
+    context = _context.get()
+    if context is not None:
+        context.session_id = session_id
+
+def add_timing(stage: str, seconds: float):
+    context = _context.get()
+    if context is not None:
+        context.timings[stage] = context.timings.get(stage, 0.0) + seconds
+
+def add_tokens(count: int):
+    context = _context.get()
+    if context is not None:
+        context.tokens += count
+
+def current_timings() -> Dict[str, float]:
+    context = _context.get()
+    return dict(context.timings) if context is not None else {}
+
+def current_tokens() -> int:
+    context = _context.get()
+    return context.tokens if context is not None else 0
+
+def request_id_from_scope(scope: Scope) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == REQUEST_ID_HEADER:
+            return value.decode("latin-1") if VALID_REQUEST_ID.match(value) else None
+    return None
+
+def format_server_timing(timings: Dict[str, float], total: float) -> str:
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+class ServerTimingMiddleware:
+    def __init__(self, app: ASGIApp, enabled: bool = True, profiler: Optional[RequestProfiler] = None):
+        self.app = app
+        self.enabled = enabled
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        context = RequestContext(request_id_from_scope(scope))
+        token = _context.set(context)
+        run = self.profiler.start(scope) if self.profiler is not None else None
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", context.request_id)
+                if self.enabled:
+                    headers.append("Server-Timing", format_server_timing(context.timings, time.perf_counter() - started))
+                if run is not None:
+                    headers.append("X-Profile-Id", run.name)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _context.reset(token)
+            if run is not None:
+                await self.profiler.finish(run)
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[Tuple[str, str]]:
+    return [(message["role"], " ".join(message["content"].split()).casefold()) for message in messages]
+
+def make_cache_key(model: str, temperature: float, messages: List[Dict[str, str]], normalize: bool = True) -> str:
+    contents = normalize_messages(messages) if normalize else [(m["role"], m["content"]) for m in messages]
+    payload = json.dumps(
+        [model, temperature, contents],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl_seconds > 0 and now - entry[1] > self.ttl_seconds):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: str, created_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (value, created_at or time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def load(self) -> int:
+        if not self.path or not os.path.exists(self.path):
+            return 0
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Não foi possível carregar o cache de respostas: %s", e)
+            return 0
+
+        now = time.time()
+        loaded = 0
+        for key, value, created_at in entries:
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                continue
+            self.set(key, value, created_at)
+            loaded += 1
+
+        logger.info("Cache de respostas carregado: %d entradas", loaded)
+        return loaded
+
+    def save(self):
+        if not self.path:
+            return
+
+        with self._lock:
+            entries = [[key, value, created_at] for key, (value, created_at) in self._entries.items()]
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+        logger.info("Cache de respostas salvo: %d entradas", len(entries))
@@ -0,0 +1,193 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from upstream import UpstreamClient, UpstreamError
+
+logger = logging.getLogger(__name__)
+
+class Backend:
+    def __init__(self, name: str, model: str, upstream: UpstreamClient, client: Any = None, async_client: Any = None):
+        self.name = name
+        self.model = model
+        self.upstream = upstream
+        self.client = client
+        self.async_client = async_client
+        self.latency_ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+
+def parse_backends_config(raw: str) -> List[Dict[str, Any]]:
+    try:
+        entries = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"ROUTER_BACKENDS inválido: {str(e)}")
+
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("ROUTER_BACKENDS deve ser uma lista JSON não vazia")
+
+    names = set()
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("name") or not entry.get("model"):
+            raise ValueError("Cada backend do ROUTER_BACKENDS precisa de 'name' e 'model'")
+        if entry["name"] in names:
+            raise ValueError(f"Backend duplicado no ROUTER_BACKENDS: {entry['name']}")
+        names.add(entry["name"])
+
+    return entries
+
+class Router:
+    def __init__(
+        self,
+        backends: List[Backend],
+        alpha: float = 0.3,
+        error_penalty: float = 10.0,
+        initial_latency_seconds: float = 1.0,
+        deadline_seconds: float = 0
+    ):
+        if not backends:
+            raise ValueError("O roteador precisa de pelo menos um backend")
+
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self.initial_latency_seconds = initial_latency_seconds
+        # um prazo só para a requisição inteira: as reservas usam o que sobrou, não ganham um prazo novo cada
+        self.deadline_seconds = deadline_seconds
+        self.fallbacks = 0
+        self.backends: "OrderedDict[str, Backend]" = OrderedDict((backend.name, backend) for backend in backends)
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Backend:
+        backend = self.backends.get(name)
+        if backend is None:
+            raise ValueError(f"Backend desconhecido: {name}")
+        return backend
+
+    def score(self, backend: Backend) -> float:
+        latency = backend.latency_ewma if backend.latency_ewma is not None else self.initial_latency_seconds
+        return latency * (1 + self.error_penalty * backend.error_rate) * (1 + backend.in_flight)
+
+    def order(self, preferred: Optional[str] = None) -> List[Backend]:
+        first = self.get(preferred) if preferred else None
+
+        with self._lock:
+            candidates = [backend for backend in self.backends.values() if backend is not first]
+            available = sorted(
+                (backend for backend in candidates if backend.upstream.breaker.available()),
+                key=self.score
+            )
+            unavailable = [backend for backend in candidates if backend not in available]
+
+        ranked = available + unavailable
+        return [first] + ranked if first else ranked
+
+    def _deadline(self) -> Optional[float]:
+        return time.monotonic() + self.deadline_seconds if self.deadline_seconds > 0 else None
+
+    @staticmethod
+    def _expired(deadline: Optional[float]) -> bool:
+        return deadline is not None and time.monotonic() >= deadline
+
+    def _start(self, backend: Backend, position: int):
+        with self._lock:
+            backend.in_flight += 1
+            backend.requests += 1
+            if position:
+                self.fallbacks += 1
+
+        if position:
+            logger.warning("Usando backend de reserva %s (%s)", backend.name, backend.model)
+
+    def _abandon(self, backend: Backend):
+        with self._lock:
+            backend.in_flight -= 1
+
+    def _finish(self, backend: Backend, elapsed: Optional[float]):
+        with self._lock:
+            backend.in_flight -= 1
+            failed = elapsed is None
+            backend.error_rate += self.alpha * (float(failed) - backend.error_rate)
+
+            if failed:
+                backend.failures += 1
+            elif backend.latency_ewma is None:
+                backend.latency_ewma = elapsed
+            else:
+                backend.latency_ewma += self.alpha * (elapsed - backend.latency_ewma)
+
+    def call(self, fn: Callable[[Backend], Any], preferred: Optional[str] = None) -> Tuple[Backend, Any]:
+        last_error: Optional[UpstreamError] = None
+        deadline = self._deadline()
+
+        for position, backend in enumerate(self.order(preferred)):
+            if last_error is not None and self._expired(deadline):
+                break
+            self._start(backend, position)
+            started = time.perf_counter()
+            try:
+                result = backend.upstream.call(lambda: fn(backend), deadline)
+            except UpstreamError as e:
+                self._finish(backend, None)
+                logger.warning("Falha no backend %s: %s", backend.name, e.detail)
+                last_error = e
+                continue
+            except Exception:
+                self._finish(backend, None)
+                raise
+
+            self._finish(backend, time.perf_counter() - started)
+            return backend, result
+
+        raise last_error
+
+    async def call_async(self, fn: Callable[[Backend], Awaitable[Any]], preferred: Optional[str] = None) -> Tuple[Backend, Any]:
+        last_error: Optional[UpstreamError] = None
+        deadline = self._deadline()
+
+        for position, backend in enumerate(self.order(preferred)):
+            if last_error is not None and self._expired(deadline):
+                break
+            self._start(backend, position)
+            started = time.perf_counter()
+            try:
+                result = await backend.upstream.call_async(lambda: fn(backend), deadline)
+            except UpstreamError as e:
+                self._finish(backend, None)
+                logger.warning("Falha no backend %s: %s", backend.name, e.detail)
+                last_error = e
+                continue
+            except asyncio.CancelledError:
+                self._abandon(backend)
+                raise
+            except Exception:
+                self._finish(backend, None)
+                raise
+
+            self._finish(backend, time.perf_counter() - started)
+            return backend, result
+
+        raise last_error
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "fallbacks": self.fallbacks,
+                "backends": {
+                    name: {
+                        "model": backend.model,
+                        "latency_ewma_seconds": backend.latency_ewma,
+                        "error_rate": backend.error_rate,
+                        "in_flight": backend.in_flight,
+                        "requests": backend.requests,
+                        "failures": backend.failures,
+                        "circuit_state": backend.upstream.breaker.state,
+                    }
+                    for name, backend in self.backends.items()
+                },
+            }
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+class SchedulerRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int = 1):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class _SessionLock:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+class Scheduler:
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue: int,
+        queue_timeout_seconds: float,
+        max_pending_per_session: int
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.max_pending_per_session = max_pending_per_session
+        self.rejected = 0
+        self.timed_out = 0
+        self._in_flight = 0
+        self._waiting = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {}
+        self._round_robin: Deque[str] = deque()
+        self._sessions: Dict[str, _SessionLock] = {}
+
+    def _reject(self, status_code: int, detail: str) -> SchedulerRejected:
+        self.rejected += 1
+        logger.warning("Requisição rejeitada pelo agendador: %s", detail)
+        return SchedulerRejected(status_code, detail)
+
+    def _dequeue(self, key: str, waiter: asyncio.Future) -> bool:
+        queue = self._queues.get(key)
+        if queue is None or waiter not in queue:
+            return False
+
+        queue.remove(waiter)
+        self._waiting -= 1
+        if not queue:
+            del self._queues[key]
+            self._round_robin.remove(key)
+        return True
+
+    async def _acquire_slot(self, fairness_key: str):
+        if self._in_flight < self.max_in_flight and not self._waiting:
+            self._in_flight += 1
+            return
+
+        if self._waiting >= self.max_queue:
+            raise self._reject(503, "Servidor sobrecarregado, tente novamente em instantes")
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(fairness_key)
+        if queue is None:
+            queue = self._queues[fairness_key] = deque()
+            self._round_robin.append(fairness_key)
+        queue.append(waiter)
+        self._waiting += 1
+
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if not self._dequeue(fairness_key, waiter) and waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise self._reject(503, "Tempo de espera na fila excedido")
+            raise
+
+    def _release_slot(self):
+        self._in_flight -= 1
+
+        while self._in_flight < self.max_in_flight and self._round_robin:
+            key = self._round_robin.popleft()
+            queue = self._queues[key]
+            waiter = queue.popleft()
+            self._waiting -= 1
+            if queue:
+                self._round_robin.append(key)
+            else:
+                del self._queues[key]
+
+            if not waiter.done():
+                waiter.set_result(None)
+                self._in_flight += 1
+
+    async def _acquire_session(self, session_id: str) -> _SessionLock:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = self._sessions[session_id] = _SessionLock()
+
+        if entry.pending >= self.max_pending_per_session:
+            raise self._reject(429, "Muitas requisições simultâneas para esta sessão")
+
+        entry.pending += 1
+        try:
+            await asyncio.wait_for(entry.lock.acquire(), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._forget_session(session_id, entry)
+            self.timed_out += 1
+            raise self._reject(503, "Tempo de espera na fila excedido")
+        except asyncio.CancelledError:
+            self._forget_session(session_id, entry)
+            raise
+        return entry
+
+    def _forget_session(self, session_id: str, entry: _SessionLock):
+        entry.pending -= 1
+        if entry.pending == 0 and self._sessions.get(session_id) is entry:
+            del self._sessions[session_id]
+
+    def _release_session(self, session_id: str, entry: _SessionLock):
+        entry.lock.release()
+        self._forget_session(session_id, entry)
+
+    async def acquire(self, session_id: Optional[str], fairness_key: str) -> Optional[_SessionLock]:
+        started = time.perf_counter()
+        entry = await self._acquire_session(session_id) if session_id else None
+
+        try:
+            await self._acquire_slot(fairness_key)
+        except BaseException:
+            if entry is not None:
+                self._release_session(session_id, entry)
+            raise
+
+        record_stage("queue", started)
+        return entry
+
+    def release(self, session_id: Optional[str], entry: Optional[_SessionLock]):
+        self._release_slot()
+        if entry is not None:
+            self._release_session(session_id, entry)
+
+    @asynccontextmanager
+    async def slot(self, session_id: Optional[str], fairness_key: str):
+        entry = await self.acquire(session_id, fairness_key)
+        try:
+            yield
+        finally:
+            self.release(session_id, entry)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
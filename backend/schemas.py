@@ -1,6 +1,9 @@
-from typing import Optional
+from typing import Optional, List
 from pydantic import BaseModel, Field, validator
 
+# o snapshot de sessões grava o tamanho do id em 16 bits; 128 cobre UUIDs e ids de clientes com folga
+MAX_SESSION_ID_LENGTH = 128
+
 class ChatRequest(BaseModel):
     message: str = Field(
         ...,
@@ -12,8 +15,26 @@ class ChatRequest(BaseModel):
     session_id: Optional[str] = Field(
         None,
         description="ID da sessão (opcional, será gerado se ausente)",
+        max_length=MAX_SESSION_ID_LENGTH,
         example="550e8400-e29b-41d4-a716-446655440000"
     )
+    use_cache: bool = Field(
+        True,
+        description="Permite responder a partir do cache de respostas (false força nova chamada ao modelo)"
+    )
+    use_refinement: bool = Field(
+        False,
+        description="Gera um rascunho e tenta refiná-lo dentro do orçamento de latência"
+    )
+    backend: Optional[str] = Field(
+        None,
+        description="Nome do backend do roteador a tentar primeiro (os demais seguem como reserva)"
+    )
+    persona_id: Optional[str] = Field(
+        None,
+        description="ID da persona que responde (padrão: Rick Sanchez)",
+        example="rick"
+    )
     
     @validator('message')
     def message_not_empty(cls, v):
@@ -49,6 +70,33 @@ class ChatResponse(BaseModel):
             }
         }
 
+class BatchChatRequest(BaseModel):
+    items: List[ChatRequest] = Field(
+        ...,
+        description="Mensagens a processar; itens com o mesmo session_id são executados em ordem",
+        min_length=1,
+        max_length=1000
+    )
+    concurrency: Optional[int] = Field(
+        None,
+        description="Número máximo de itens processados em paralelo",
+        ge=1,
+        le=100
+    )
+    stream: bool = Field(
+        False,
+        description="Retorna os resultados como NDJSON à medida que ficam prontos"
+    )
+
+class BatchItemResult(BaseModel):
+    index: int = Field(..., description="Posição do item na requisição")
+    reply: Optional[str] = Field(None, description="Resposta do Rick Sanchez")
+    session_id: Optional[str] = Field(None, description="ID da sessão")
+    error: Optional[str] = Field(None, description="Erro do item, se houver")
+
+class BatchChatResponse(BaseModel):
+    results: List[BatchItemResult] = Field(..., description="Resultados na mesma ordem dos itens")
+
 class ErrorResponse(BaseModel):
     detail: str = Field(
         ...,
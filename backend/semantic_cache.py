@@ -0,0 +1,197 @@
+import re
+import time
+import unicodedata
+import logging
+import threading
+from typing import Optional, List, Dict, Tuple, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HASH_MULTIPLIER = np.uint64(1099511628211)
+HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+# n-gramas de caracteres quase não enxergam um "não"; perguntas com negações diferentes nunca casam
+# (comparadas sem acento e sem apóstrofo: "não" e "nao", "don't" e "dont" são a mesma negação)
+NEGATIONS = frozenset((
+    "nao", "nunca", "jamais", "nem", "nenhum", "nenhuma", "ninguem", "nada", "sem",
+    "not", "no", "never", "dont", "doesnt", "isnt", "cant", "cannot", "wont"
+))
+WORD_PATTERN = re.compile(r"[\w']+")
+
+def negation_key(text: str) -> Tuple[str, ...]:
+    folded = unicodedata.normalize("NFKD", text.casefold()).encode("ascii", "ignore").decode()
+    words = (word.replace("'", "") for word in WORD_PATTERN.findall(folded))
+    return tuple(word for word in words if word in NEGATIONS)
+
+class HashingVectorizer:
+    def __init__(self, dim: int = 256, ngram_sizes: Sequence[int] = (3, 4, 5)):
+        self.dim = dim
+        self.ngram_sizes = tuple(ngram_sizes)
+
+    def transform(self, text: str) -> np.ndarray:
+        padded = " " + " ".join(text.split()).casefold() + " "
+        codes = np.frombuffer(padded.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        vector = np.zeros(self.dim, dtype=np.float32)
+
+        for n in self.ngram_sizes:
+            count = len(codes) - n + 1
+            if count <= 0:
+                continue
+
+            hashes = np.full(count, np.uint64(n), dtype=np.uint64)
+            for offset in range(n):
+                hashes = hashes * HASH_MULTIPLIER + codes[offset:offset + count]
+            hashes = hashes * HASH_MIX
+            buckets = ((hashes >> np.uint64(40)) % np.uint64(self.dim)).astype(np.intp)
+            signs = 1.0 - 2.0 * ((hashes >> np.uint64(32)) & np.uint64(1)).astype(np.float32)
+
+            vector += np.bincount(buckets, weights=signs, minlength=self.dim).astype(np.float32)
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+class SemanticCache:
+    def __init__(
+        self,
+        capacity: int,
+        threshold: float,
+        ttl_seconds: float = 0,
+        dim: int = 256,
+        exact_search_limit: int = 4096,
+        lsh_tables: int = 32,
+        lsh_bits: int = 13,
+        seed: int = 42
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.exact_search_limit = exact_search_limit
+        self.vectorizer = HashingVectorizer(dim)
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._created = np.zeros(capacity, dtype=np.float64)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._replies: List[Optional[str]] = [None] * capacity
+        self._negations = np.zeros(capacity, dtype=np.int32)
+        self._negation_ids: Dict[Tuple[str, ...], int] = {(): 0}
+        self._projections = np.random.default_rng(seed).standard_normal((dim, lsh_tables * lsh_bits)).astype(np.float32)
+        self._lsh_tables = lsh_tables
+        self._lsh_bits = lsh_bits
+        self._bit_weights = np.left_shift(np.int64(1), np.arange(lsh_bits, dtype=np.int64))
+        self._slot_keys = np.zeros((capacity, lsh_tables), dtype=np.int64)
+        self._buckets: List[Dict[int, set]] = [{} for _ in range(lsh_tables)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _signature(self, vector: np.ndarray) -> np.ndarray:
+        bits = (vector @ self._projections > 0).reshape(self._lsh_tables, self._lsh_bits)
+        return bits.astype(np.int64) @ self._bit_weights
+
+    def _candidates(self, vector: np.ndarray) -> np.ndarray:
+        if self._size <= self.exact_search_limit:
+            return np.arange(self._size)
+
+        slots = set()
+        for table, key in enumerate(self._signature(vector).tolist()):
+            slots.update(self._buckets[table].get(key, ()))
+        return np.fromiter(slots, dtype=np.intp, count=len(slots))
+
+    def _negation_id(self, text: str) -> int:
+        return self._negation_ids.setdefault(negation_key(text), len(self._negation_ids))
+
+    def _score(self, vector: np.ndarray, now: float, negation: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        candidates = self._candidates(vector)
+        if self.ttl_seconds > 0 and len(candidates):
+            candidates = candidates[now - self._created[candidates] <= self.ttl_seconds]
+        if negation is not None and len(candidates):
+            candidates = candidates[self._negations[candidates] == negation]
+        return candidates, self._vectors[candidates] @ vector
+
+    def search(self, text: str, k: int = 1) -> List[Tuple[float, str]]:
+        vector = self.vectorizer.transform(text)
+
+        with self._lock:
+            candidates, scores = self._score(vector, time.time())
+            if not len(candidates):
+                return []
+
+            k = min(k, len(candidates))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self._replies[candidates[i]]) for i in top]
+
+    def lookup(self, text: str) -> Optional[str]:
+        vector = self.vectorizer.transform(text)
+        now = time.time()
+
+        with self._lock:
+            candidates, scores = self._score(vector, now, self._negation_id(text))
+
+            if len(candidates):
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    slot = candidates[best]
+                    self._last_used[slot] = now
+                    self.hits += 1
+                    return self._replies[slot]
+
+            self.misses += 1
+            return None
+
+    def add(self, text: str, reply: str):
+        vector = self.vectorizer.transform(text)
+        keys = self._signature(vector)
+        now = time.time()
+
+        with self._lock:
+            if self._size < self.capacity:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(np.argmin(self._last_used))
+                for table, key in enumerate(self._slot_keys[slot].tolist()):
+                    bucket = self._buckets[table].get(key)
+                    if bucket is not None:
+                        bucket.discard(slot)
+                        if not bucket:
+                            del self._buckets[table][key]
+
+            self._vectors[slot] = vector
+            self._created[slot] = now
+            self._last_used[slot] = now
+            self._replies[slot] = reply
+            self._negations[slot] = self._negation_id(text)
+            self._slot_keys[slot] = keys
+            for table, key in enumerate(keys.tolist()):
+                self._buckets[table].setdefault(key, set()).add(slot)
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._vectors[:] = 0
+            self._created[:] = 0
+            self._last_used[:] = 0
+            self._replies = [None] * self.capacity
+            self._negations[:] = 0
+            self._negation_ids = {(): 0}
+            self._buckets = [{} for _ in range(self._lsh_tables)]
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "size": self._size,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,543 @@
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from itertools import islice
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from typing import Optional, List, Dict, Iterable, Iterator, Tuple, Sequence
+
+logger = logging.getLogger(__name__)
+
+class Session:
+    __slots__ = ("messages", "created_at", "last_seen", "summary")
+
+    def __init__(self, max_messages: int, now: float):
+        self.messages = deque(maxlen=max_messages)
+        self.created_at = now
+        self.last_seen = now
+        self.summary: Optional[str] = None
+
+def summarized_prefix(stored: List[Dict[str, str]], summarized: List[Dict[str, str]]) -> int:
+    # quantas mensagens do início do histórico estão no resumo; o início pode já ter sido descartado pelo limite
+    if not stored or not summarized:
+        return 0
+    try:
+        offset = summarized.index(stored[0])
+    except ValueError:
+        return 0
+
+    count = 0
+    while count < len(stored) and offset + count < len(summarized) and stored[count] == summarized[offset + count]:
+        count += 1
+    return count
+
+class SessionStore(ABC):
+    # True quando as chamadas podem esperar por I/O ou lock (SQLite); o chat engine as roda fora do event loop
+    blocking = False
+
+    def __init__(self):
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_sweeper = threading.Event()
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def get_or_create(self, session_id: str) -> bool:
+        ...
+
+    def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        return [message for message, _ in self.get_history_with_tokens(session_id)]
+
+    @abstractmethod
+    def get_history_with_tokens(self, session_id: str) -> List[Tuple[Dict[str, str], int]]:
+        ...
+
+    @abstractmethod
+    def append(self, session_id: str, messages: List[Dict[str, str]], token_counts: Optional[Sequence[int]] = None):
+        ...
+
+    @abstractmethod
+    def get_summary(self, session_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set_summary(self, session_id: str, summary: str):
+        ...
+
+    @abstractmethod
+    def drop_summarized(self, session_id: str, messages: List[Dict[str, str]]) -> int:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def sweep(self) -> int:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        ...
+
+    def close(self):
+        self.stop_sweeper()
+
+    def start_sweeper(self, interval_seconds: float):
+        if self._sweeper is not None or interval_seconds <= 0:
+            return
+
+        self._stop_sweeper.clear()
+
+        def run():
+            while not self._stop_sweeper.wait(interval_seconds):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error("Erro na limpeza de sessões: %s", e)
+
+        self._sweeper = threading.Thread(target=run, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        if self._sweeper is None:
+            return
+
+        self._stop_sweeper.set()
+        self._sweeper.join(timeout=5)
+        self._sweeper = None
+
+class InMemorySessionStore(SessionStore):
+    def __init__(self, max_sessions: int, ttl_seconds: float, max_messages: int):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.evicted_lru = 0
+        self.evicted_ttl = 0
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _is_expired(self, session: Session, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - session.last_seen > self.ttl_seconds
+
+    def _get(self, session_id: str, now: float) -> Optional[Session]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+
+        if self._is_expired(session, now):
+            del self._sessions[session_id]
+            self.evicted_ttl += 1
+            return None
+
+        session.last_seen = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _create(self, session_id: str, now: float) -> Session:
+        session = Session(self.max_messages, now)
+        self._sessions[session_id] = session
+
+        while len(self._sessions) > self.max_sessions:
+            evicted_id, _ = self._sessions.popitem(last=False)
+            self.evicted_lru += 1
+            logger.info("Sessão %s removida por limite de capacidade (LRU)", evicted_id)
+
+        return session
+
+    def get_or_create(self, session_id: str) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._get(session_id, now) is not None:
+                return False
+            self._create(session_id, now)
+            return True
+
+    def get_history_with_tokens(self, session_id: str) -> List[Tuple[Dict[str, str], int]]:
+        with self._lock:
+            session = self._get(session_id, time.time())
+            return list(session.messages) if session else []
+
+    def append(self, session_id: str, messages: List[Dict[str, str]], token_counts: Optional[Sequence[int]] = None):
+        now = time.time()
+        token_counts = token_counts or [0] * len(messages)
+        with self._lock:
+            session = self._get(session_id, now) or self._create(session_id, now)
+            session.messages.extend(zip(messages, token_counts))
+
+    def get_summary(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.summary if session else None
+
+    def set_summary(self, session_id: str, summary: str):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.summary = summary
+
+    def drop_summarized(self, session_id: str, messages: List[Dict[str, str]]) -> int:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return 0
+            count = summarized_prefix([message for message, _ in session.messages], messages)
+            for _ in range(count):
+                session.messages.popleft()
+            return count
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def sweep(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [
+                session_id for session_id, session in self._sessions.items()
+                if self._is_expired(session, now)
+            ]
+            for session_id in expired:
+                del self._sessions[session_id]
+            self.evicted_ttl += len(expired)
+
+        if expired:
+            logger.info("%d sessões expiradas removidas", len(expired))
+
+        return len(expired)
+
+    def snapshot(self, chunk_size: int = 1000) -> Iterator[Tuple[str, float, float, Optional[str], List[Tuple[Dict[str, str], int]]]]:
+        with self._lock:
+            items = list(self._sessions.items())
+
+        # copia as mensagens em lotes para não segurar o lock durante toda a escrita
+        for start in range(0, len(items), chunk_size):
+            with self._lock:
+                chunk = [
+                    (session_id, session.created_at, session.last_seen, session.summary, list(session.messages))
+                    for session_id, session in items[start:start + chunk_size]
+                ]
+            yield from chunk
+
+    def restore(
+        self,
+        records: Iterable[Tuple[str, float, float, Optional[str], List[Tuple[Dict[str, str], int]]]],
+        chunk_size: int = 1000
+    ) -> int:
+        restored = 0
+        records = iter(records)
+        while True:
+            batch = list(islice(records, chunk_size))
+            if not batch:
+                return restored
+
+            now = time.time()
+            with self._lock:
+                for session_id, created_at, last_seen, summary, entries in batch:
+                    # uma sessão já ativa é mais recente que a do snapshot
+                    if session_id in self._sessions:
+                        continue
+
+                    session = Session(self.max_messages, created_at)
+                    session.last_seen = last_seen
+                    session.summary = summary
+                    session.messages.extend(entries)
+                    if self._is_expired(session, now):
+                        continue
+
+                    self._sessions[session_id] = session
+                    restored += 1
+
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "evicted_lru": self.evicted_lru,
+            "evicted_ttl": self.evicted_ttl,
+        }
+
+class SQLiteSessionStore(SessionStore):
+    blocking = True
+
+    def __init__(
+        self,
+        path: str,
+        max_sessions: int,
+        ttl_seconds: float,
+        max_messages: int,
+        flush_interval_seconds: float = 0.05
+    ):
+        super().__init__()
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.flush_interval_seconds = flush_interval_seconds
+        self.evicted_lru = 0
+        self.evicted_ttl = 0
+        # _lock protege a conexão; _pending_lock só o buffer, para um append entrar no commit em andamento do vizinho
+        self._pending_turns: List[tuple] = []
+        self._pending_touches: Dict[str, float] = {}
+        self._appended = 0
+        self._committed = 0
+        self._pending_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop_flusher = threading.Event()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                summary TEXT
+            );
+            CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_turns_session ON turns (session_id, id);
+            CREATE INDEX IF NOT EXISTS idx_sessions_last_seen ON sessions (last_seen);
+            """
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(turns)")]
+        if "tokens" not in columns:
+            self._conn.execute("ALTER TABLE turns ADD COLUMN tokens INTEGER NOT NULL DEFAULT 0")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")]
+        if "summary" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN summary TEXT")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _flush(self):
+        with self._pending_lock:
+            if not self._pending_turns and not self._pending_touches:
+                return
+            turns, touches, appended = self._pending_turns, self._pending_touches, self._appended
+            self._pending_turns = []
+            self._pending_touches = {}
+
+        try:
+            with self._transaction():
+                self._conn.executemany(
+                    "INSERT INTO sessions (session_id, created_at, last_seen) VALUES (?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET last_seen = excluded.last_seen",
+                    [(session_id, now, now) for session_id, now in touches.items()]
+                )
+                self._conn.executemany(
+                    "INSERT INTO turns (session_id, role, content, tokens, created_at) VALUES (?, ?, ?, ?, ?)",
+                    turns
+                )
+        except Exception:
+            with self._pending_lock:
+                self._pending_turns = turns + self._pending_turns
+                self._pending_touches = {**touches, **self._pending_touches}
+            raise
+
+        self._committed = max(self._committed, appended)
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _delete(self, session_ids: List[str]):
+        self._conn.executemany("DELETE FROM turns WHERE session_id = ?", [(s,) for s in session_ids])
+        self._conn.executemany("DELETE FROM sessions WHERE session_id = ?", [(s,) for s in session_ids])
+
+    def get_or_create(self, session_id: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._flush()
+            row = self._conn.execute(
+                "SELECT last_seen FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+
+            if row is not None and not (self.ttl_seconds > 0 and now - row[0] > self.ttl_seconds):
+                with self._pending_lock:
+                    self._pending_touches[session_id] = now
+                return False
+
+            with self._transaction():
+                if row is not None:
+                    self._delete([session_id])
+                self._conn.execute(
+                    "INSERT INTO sessions (session_id, created_at, last_seen) VALUES (?, ?, ?)",
+                    (session_id, now, now)
+                )
+            if row is not None:
+                self.evicted_ttl += 1
+            return True
+
+    def get_history_with_tokens(self, session_id: str) -> List[Tuple[Dict[str, str], int]]:
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT role, content, tokens FROM ("
+                "SELECT id, role, content, tokens FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?"
+                ") ORDER BY id",
+                (session_id, self.max_messages)
+            ).fetchall()
+        return [({"role": role, "content": content}, tokens) for role, content, tokens in rows]
+
+    def append(self, session_id: str, messages: List[Dict[str, str]], token_counts: Optional[Sequence[int]] = None):
+        now = time.time()
+        token_counts = token_counts or [0] * len(messages)
+        with self._pending_lock:
+            self._pending_touches[session_id] = now
+            self._pending_turns.extend(
+                (session_id, message["role"], message["content"], tokens, now)
+                for message, tokens in zip(messages, token_counts)
+            )
+            self._appended += 1
+            ticket = self._appended
+
+        # commit em grupo: o turno está gravado quando append retorna, então outro worker já o lê;
+        # quem chega enquanto um commit roda espera o lock e, em geral, já encontra o seu turno gravado
+        with self._lock:
+            if self._committed < ticket:
+                self._flush()
+
+    def get_summary(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_summary(self, session_id: str, summary: str):
+        with self._lock:
+            self._flush()
+            self._conn.execute(
+                "UPDATE sessions SET summary = ? WHERE session_id = ?", (summary, session_id)
+            )
+
+    def drop_summarized(self, session_id: str, messages: List[Dict[str, str]]) -> int:
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT id, role, content FROM ("
+                "SELECT id, role, content FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?"
+                ") ORDER BY id",
+                (session_id, self.max_messages)
+            ).fetchall()
+            count = summarized_prefix([{"role": role, "content": content} for _, role, content in rows], messages)
+            if count:
+                # as linhas mais antigas que a janela também já não são lidas
+                self._conn.execute(
+                    "DELETE FROM turns WHERE session_id = ? AND id <= ?", (session_id, rows[count - 1][0])
+                )
+            return count
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            self._flush()
+            with self._transaction():
+                existed = self._conn.execute(
+                    "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone() is not None
+                self._delete([session_id])
+            return existed
+
+    def sweep(self) -> int:
+        now = time.time()
+        with self._lock:
+            self._flush()
+            with self._transaction():
+                expired = []
+                if self.ttl_seconds > 0:
+                    expired = [row[0] for row in self._conn.execute(
+                        "SELECT session_id FROM sessions WHERE last_seen < ?", (now - self.ttl_seconds,)
+                    )]
+                    self._delete(expired)
+
+                excess = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - self.max_sessions
+                evicted = []
+                if excess > 0:
+                    evicted = [row[0] for row in self._conn.execute(
+                        "SELECT session_id FROM sessions ORDER BY last_seen LIMIT ?", (excess,)
+                    )]
+                    self._delete(evicted)
+
+            self.evicted_ttl += len(expired)
+            self.evicted_lru += len(evicted)
+
+        if expired or evicted:
+            logger.info("%d sessões expiradas e %d por capacidade removidas", len(expired), len(evicted))
+
+        return len(expired) + len(evicted)
+
+    def start_sweeper(self, interval_seconds: float):
+        super().start_sweeper(interval_seconds)
+
+        if self._flusher is not None or self.flush_interval_seconds <= 0:
+            return
+
+        self._stop_flusher.clear()
+
+        def run():
+            while not self._stop_flusher.wait(self.flush_interval_seconds):
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error("Erro ao gravar sessões no SQLite: %s", e)
+
+        self._flusher = threading.Thread(target=run, name="session-flusher", daemon=True)
+        self._flusher.start()
+
+    def stop_sweeper(self):
+        super().stop_sweeper()
+
+        if self._flusher is not None:
+            self._stop_flusher.set()
+            self._flusher.join(timeout=5)
+            self._flusher = None
+
+        self.flush()
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._pending_lock:
+            pending_writes = len(self._pending_touches)
+        with self._lock:
+            active_sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {
+            "active_sessions": active_sessions,
+            "max_sessions": self.max_sessions,
+            "evicted_lru": self.evicted_lru,
+            "evicted_ttl": self.evicted_ttl,
+            "pending_writes": pending_writes,
+        }
@@ -0,0 +1,231 @@
+import gc
+import os
+import mmap
+import time
+import zlib
+import struct
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from session_store import InMemorySessionStore
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RSSN"
+FOOTER_MAGIC = b"RSSE"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHd")
+SESSION = struct.Struct("<HddIH")
+MESSAGE = struct.Struct("<BII")
+FOOTER = struct.Struct("<4sII")
+
+NO_SUMMARY = 0xFFFFFFFF
+RELEASE_BYTES = 64 * 1024 * 1024
+HAS_MADVISE = hasattr(mmap.mmap, "madvise") and hasattr(mmap, "MADV_DONTNEED")
+ROLES = ("user", "assistant", "system")
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+SessionRecord = Tuple[str, float, float, Optional[str], List[Tuple[Dict[str, str], int]]]
+
+class SnapshotError(Exception):
+    pass
+
+def _pack_session(
+    session_id: str,
+    created_at: float,
+    last_seen: float,
+    summary: Optional[str],
+    entries: List[Tuple[Dict[str, str], int]]
+) -> bytes:
+    id_bytes = session_id.encode("utf-8")
+    summary_bytes = summary.encode("utf-8") if summary is not None else b""
+    contents = [message["content"].encode("utf-8") for message, _ in entries]
+    parts = [
+        SESSION.pack(
+            len(id_bytes),
+            created_at,
+            last_seen,
+            len(summary_bytes) if summary is not None else NO_SUMMARY,
+            len(entries)
+        ),
+        id_bytes,
+        summary_bytes
+    ]
+    # cabeçalhos das mensagens juntos permitem lê-los com um único unpack
+    parts.extend(
+        MESSAGE.pack(ROLE_CODES[message["role"]], tokens, len(content))
+        for (message, tokens), content in zip(entries, contents)
+    )
+    parts.extend(contents)
+    return b"".join(parts)
+
+def write_snapshot(path: str, records: Iterator[SessionRecord]) -> int:
+    tmp_path = f"{path}.tmp"
+    count = 0
+    crc = 0
+
+    try:
+        with open(tmp_path, "wb", buffering=1024 * 1024) as f:
+            f.write(HEADER.pack(MAGIC, VERSION, time.time()))
+
+            for session_id, created_at, last_seen, summary, entries in records:
+                # uma sessão que não cabe no formato é descartada sozinha, sem perder o snapshot inteiro
+                try:
+                    record = _pack_session(session_id, created_at, last_seen, summary, entries)
+                except (struct.error, KeyError, UnicodeEncodeError) as e:
+                    logger.warning("Sessão ignorada no snapshot (%.64s): %s", session_id, e)
+                    continue
+
+                crc = zlib.crc32(record, crc)
+                f.write(record)
+                count += 1
+
+            f.write(FOOTER.pack(FOOTER_MAGIC, count, crc))
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, path)
+    return count
+
+def _checksum(view: mmap.mmap, start: int, end: int, chunk_size: int = 1 << 20) -> int:
+    crc = 0
+    for offset in range(start, end, chunk_size):
+        crc = zlib.crc32(view[offset:min(offset + chunk_size, end)], crc)
+    return crc
+
+@lru_cache(maxsize=None)
+def _messages_struct(count: int) -> struct.Struct:
+    return struct.Struct("<" + "BII" * count)
+
+def read_snapshot(path: str) -> Iterator[SessionRecord]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size + FOOTER.size:
+            raise SnapshotError("Snapshot truncado")
+
+        # mmap: as páginas vêm do cache do sistema sob demanda, sem copiar o arquivo para o heap
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            magic, version, _ = HEADER.unpack_from(view, 0)
+            if magic != MAGIC or version != VERSION:
+                raise SnapshotError(f"Formato de snapshot desconhecido (versão {version})")
+
+            end = len(view) - FOOTER.size
+            footer_magic, count, crc = FOOTER.unpack_from(view, end)
+            if footer_magic != FOOTER_MAGIC or _checksum(view, HEADER.size, end) != crc:
+                raise SnapshotError("Snapshot corrompido ou incompleto")
+
+            data = memoryview(view)
+            try:
+                offset = HEADER.size
+                released = 0
+                for _ in range(count):
+                    id_length, created_at, last_seen, summary_length, message_count = SESSION.unpack_from(view, offset)
+                    offset += SESSION.size
+                    session_id = str(data[offset:offset + id_length], "utf-8")
+                    offset += id_length
+
+                    summary = None
+                    if summary_length != NO_SUMMARY:
+                        summary = str(data[offset:offset + summary_length], "utf-8")
+                        offset += summary_length
+
+                    headers = _messages_struct(message_count)
+                    fields = headers.unpack_from(view, offset)
+                    offset += headers.size
+
+                    entries = []
+                    for index in range(0, len(fields), 3):
+                        length = fields[index + 2]
+                        entries.append((
+                            {"role": ROLES[fields[index]], "content": str(data[offset:offset + length], "utf-8")},
+                            fields[index + 1]
+                        ))
+                        offset += length
+
+                    yield session_id, created_at, last_seen, summary, entries
+
+                    # devolve ao sistema as páginas já lidas para o pico de memória não somar o arquivo inteiro
+                    if HAS_MADVISE and offset - released >= RELEASE_BYTES:
+                        length = (offset - released) // mmap.PAGESIZE * mmap.PAGESIZE
+                        view.madvise(mmap.MADV_DONTNEED, released, length)
+                        released += length
+            finally:
+                data.release()
+
+class SessionSnapshotter:
+    def __init__(self, store: InMemorySessionStore, path: str, interval_seconds: float = 300):
+        self.store = store
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.saved = 0
+        self.failed = 0
+        self.last_saved_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._save_lock = threading.Lock()
+
+    def save(self) -> int:
+        with self._save_lock:
+            started = time.perf_counter()
+            try:
+                count = write_snapshot(self.path, self.store.snapshot())
+            except (OSError, KeyError, struct.error) as e:
+                self.failed += 1
+                logger.error("Falha ao salvar o snapshot de sessões: %s", e)
+                return 0
+
+            self.saved += 1
+            self.last_saved_at = time.time()
+            logger.info("Snapshot de sessões salvo: %d sessões em %.2fs", count, time.perf_counter() - started)
+            return count
+
+    def load(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+
+        # milhões de dicts novos disparariam coletas completas repetidas do gc
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self.store.restore(read_snapshot(self.path))
+        except (OSError, SnapshotError, struct.error, UnicodeDecodeError, IndexError) as e:
+            logger.warning("Não foi possível restaurar o snapshot de sessões: %s", e)
+            return 0
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def start(self):
+        if self._thread is not None or self.interval_seconds <= 0:
+            return
+
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(self.interval_seconds):
+                self.save()
+
+        self._thread = threading.Thread(target=run, name="session-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        self._thread.join(timeout=30)
+        self._thread = None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "path": self.path,
+            "saved": self.saved,
+            "failed": self.failed,
+            "last_saved_at": self.last_saved_at,
+        }
@@ -0,0 +1,204 @@
+import os
+import re
+import gzip
+import hashlib
+import logging
+import mimetypes
+from typing import Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+TEXT_TYPES = (".html", ".css", ".js")
+# formatos já comprimidos não ganham nada com gzip/brotli
+COMPRESSIBLE_TYPES = (".html", ".css", ".js", ".json", ".svg", ".txt", ".xml", ".map")
+ENTRY_POINTS = ("index.html",)
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+class StaticAsset:
+    __slots__ = ("name", "url_name", "content_type", "body", "variants", "digest")
+
+    def __init__(self, name: str, body: bytes, hashed: bool):
+        self.name = name
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        root, extension = os.path.splitext(name)
+        self.url_name = f"{root}.{self.digest}{extension}" if hashed else name
+        self.content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/") or self.content_type in ("application/javascript", "text/javascript"):
+            self.content_type += "; charset=utf-8"
+        self.variants: Dict[str, bytes] = {}
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding != "identity" else f'"{self.digest}"'
+
+    def compress(self, min_size: int):
+        if len(self.body) < min_size or not self.name.endswith(COMPRESSIBLE_TYPES):
+            return
+
+        candidates = {"gzip": gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            candidates["br"] = brotli.compress(self.body, quality=11)
+
+        for encoding, compressed in candidates.items():
+            if len(compressed) < len(self.body):
+                self.variants[encoding] = compressed
+
+def _rewrite_references(text: str, renames: Dict[str, str]) -> str:
+    # só troca nomes entre aspas, parênteses ou barras, como em href="styles.css" e url(rick-avatar.jpg)
+    for name, url_name in renames.items():
+        text = re.sub(rf"(?<=[\"'(/]){re.escape(name)}(?=[\"')?#])", url_name, text)
+    return text
+
+class StaticBundle:
+    def __init__(self, directory: str, min_compress_size: int = 256):
+        self.directory = directory
+        self.min_compress_size = min_compress_size
+        self._assets: Dict[str, StaticAsset] = {}
+        self._by_url: Dict[str, StaticAsset] = {}
+
+    def build(self) -> int:
+        files: List[Tuple[str, bytes]] = []
+        for root, _, filenames in os.walk(self.directory):
+            for filename in sorted(filenames):
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                if filename.startswith("."):
+                    continue
+                with open(path, "rb") as f:
+                    files.append((name, f.read()))
+
+        # binários primeiro, depois CSS/JS e por fim o HTML, para cada um já ver os nomes com hash dos que referencia
+        def order(item: Tuple[str, bytes]) -> int:
+            name = item[0]
+            if name.endswith(".html"):
+                return 2
+            return 1 if name.endswith(TEXT_TYPES) else 0
+
+        renames: Dict[str, str] = {}
+        assets: Dict[str, StaticAsset] = {}
+        for name, body in sorted(files, key=order):
+            if name.endswith(TEXT_TYPES) and renames:
+                body = _rewrite_references(body.decode("utf-8"), renames).encode("utf-8")
+
+            asset = StaticAsset(name, body, hashed=name not in ENTRY_POINTS)
+            asset.compress(self.min_compress_size)
+            assets[name] = asset
+            renames[name] = asset.url_name
+
+        self._assets = assets
+        self._by_url = {asset.url_name: asset for asset in assets.values()}
+        return len(assets)
+
+    def find(self, path: str) -> Optional[Tuple[StaticAsset, bool]]:
+        path = path or ENTRY_POINTS[0]
+        asset = self._by_url.get(path)
+        if asset is not None:
+            # só o nome com hash pode ser guardado para sempre; o nome original muda de conteúdo
+            return asset, asset.url_name != asset.name
+        asset = self._assets.get(path)
+        return (asset, False) if asset is not None else None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "files": len(self._assets),
+            "bytes": sum(len(asset.body) for asset in self._assets.values()),
+            "gzip_bytes": sum(len(asset.variants.get("gzip", asset.body)) for asset in self._assets.values()),
+            "brotli": int(brotli is not None),
+        }
+
+    def manifest(self) -> Dict[str, str]:
+        return {name: asset.url_name for name, asset in self._assets.items()}
+
+def choose_encoding(asset: StaticAsset, accept_encoding: str) -> str:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.partition(";")
+        params = params.strip().lower()
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            accepted.add(token.strip().lower())
+
+    for encoding in ("br", "gzip"):
+        if encoding in asset.variants and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    match = RANGE.match(header.strip())
+    if match is None:
+        raise ValueError("Range não suportado")
+
+    start, end = match.groups()
+    if not start and not end:
+        raise ValueError("Range vazio")
+    if not start:
+        # sufixo: os últimos N bytes
+        length = min(int(end), size)
+        return (size - length, size - 1) if length else None
+
+    first = int(start)
+    last = min(int(end), size - 1) if end else size - 1
+    if first >= size or first > last:
+        return None
+    return first, last
+
+def asset_response(request: Request, asset: StaticAsset, immutable: bool = False) -> Response:
+    # Range só vale para a representação sem compressão, como fazem os servidores estáticos em geral
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and if_range != asset.etag("identity"):
+        range_header = None
+
+    encoding = "identity" if range_header else choose_encoding(asset, request.headers.get("accept-encoding", ""))
+    body = asset.body if encoding == "identity" else asset.variants[encoding]
+    headers = {
+        "ETag": asset.etag(encoding),
+        "Cache-Control": IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE,
+        "Vary": "Accept-Encoding",
+        "Accept-Ranges": "bytes",
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # proxies que recomprimem marcam o ETag como fraco (W/); a comparação aqui é fraca de propósito
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in tags or headers["ETag"] in tags:
+            return Response(status_code=304, headers=headers)
+
+    status_code = 200
+    if range_header:
+        # um Range malformado ou com vários intervalos é ignorado e o arquivo vai inteiro
+        try:
+            selected = parse_range(range_header, len(body))
+        except ValueError:
+            pass
+        else:
+            if selected is None:
+                headers["Content-Range"] = f"bytes */{len(body)}"
+                return Response(status_code=416, headers=headers)
+
+            first, last = selected
+            headers["Content-Range"] = f"bytes {first}-{last}/{len(body)}"
+            body = body[first:last + 1]
+            status_code = 206
+
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        return Response(status_code=status_code, headers=headers, media_type=asset.content_type)
+
+    return Response(body, status_code=status_code, headers=headers, media_type=asset.content_type)
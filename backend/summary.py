@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+# (resumo anterior, mensagens descartadas, nome de quem responde na conversa)
+SummarizeAsync = Callable[[Optional[str], List[Dict[str, str]], str], Awaitable[str]]
+SummarizeSync = Callable[[Optional[str], List[Dict[str, str]], str], str]
+
+class RollingSummarizer:
+    def __init__(self, store: SessionStore, summarize_async: SummarizeAsync, summarize_sync: SummarizeSync):
+        self.store = store
+        self.summarize_async = summarize_async
+        self.summarize_sync = summarize_sync
+        self.completed = 0
+        self.failed = 0
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._pending_sync: Set[str] = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def schedule(self, session_id: str, dropped: List[Dict[str, str]], assistant_name: str = "Assistente"):
+        if not dropped:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarizer")
+            self._pending_sync.add(session_id)
+            self._executor.submit(self._run_sync, session_id, dropped, assistant_name)
+            return
+
+        previous = self._tasks.get(session_id)
+        task = loop.create_task(self._run(session_id, dropped, assistant_name, previous))
+        self._tasks[session_id] = task
+        task.add_done_callback(lambda done: self._forget(session_id, done))
+
+    def is_pending(self, session_id: str) -> bool:
+        return session_id in self._tasks or session_id in self._pending_sync
+
+    def _forget(self, session_id: str, task: asyncio.Task):
+        if self._tasks.get(session_id) is task:
+            del self._tasks[session_id]
+
+    def _store(self, session_id: str, summary: str, dropped: List[Dict[str, str]]):
+        self.store.set_summary(session_id, summary.strip())
+        # o que já está no resumo sai do histórico; assim os mesmos turnos não são resumidos de novo
+        self.store.drop_summarized(session_id, dropped)
+        self.completed += 1
+
+    async def _run(self, session_id: str, dropped: List[Dict[str, str]], assistant_name: str, previous: Optional[asyncio.Task]):
+        if previous is not None:
+            await asyncio.wait([previous])
+
+        try:
+            if self.store.blocking:
+                previous_summary = await asyncio.to_thread(self.store.get_summary, session_id)
+            else:
+                previous_summary = self.store.get_summary(session_id)
+            summary = await self.summarize_async(previous_summary, dropped, assistant_name)
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Falha ao resumir o histórico da sessão %s: %s", session_id, e)
+            return
+
+        if self.store.blocking:
+            await asyncio.to_thread(self._store, session_id, summary, dropped)
+        else:
+            self._store(session_id, summary, dropped)
+
+    def _run_sync(self, session_id: str, dropped: List[Dict[str, str]], assistant_name: str):
+        try:
+            summary = self.summarize_sync(self.store.get_summary(session_id), dropped, assistant_name)
+            self._store(session_id, summary, dropped)
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Falha ao resumir o histórico da sessão %s: %s", session_id, e)
+        finally:
+            self._pending_sync.discard(session_id)
+
+    async def drain(self):
+        while self._tasks:
+            await asyncio.wait(list(self._tasks.values()))
+
+        if self._executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.wait_sync)
+
+    def wait_sync(self):
+        if self._executor is not None:
+            self._executor.submit(lambda: None).result()
+
+    def close(self):
+        for task in self._tasks.values():
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
@@ -0,0 +1,33 @@
+import math
+import logging
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_OVERHEAD_TOKENS = 4
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=16)
+def get_encoding(model: str) -> Optional[object]:
+    if tiktoken is None:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        logger.warning("Tokenizador indisponível para %s, usando estimativa: %s", model, e)
+        return None
+
+def count_tokens(text: str, model: str) -> int:
+    encoding = get_encoding(model)
+
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+    return len(encoding.encode(text)) + MESSAGE_OVERHEAD_TOKENS
@@ -0,0 +1,261 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+import httpx
+import openai
+from openai import OpenAI, AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+class UpstreamError(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[int] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class CircuitOpenError(UpstreamError):
+    def __init__(self, retry_after: int):
+        super().__init__(503, "Serviço de IA temporariamente indisponível", retry_after)
+
+class DeadlineExceeded(UpstreamError):
+    def __init__(self):
+        super().__init__(504, "O serviço de IA demorou demais para responder")
+
+def _check_deadline(deadline: Optional[float]):
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded()
+
+async def _with_deadline(awaitable: Awaitable[Any], deadline: Optional[float]) -> Any:
+    if deadline is None:
+        return await awaitable
+
+    # cancela a própria task no prazo em vez de usar wait_for, que criaria outra task só para a chamada
+    task = asyncio.current_task()
+    loop = asyncio.get_running_loop()
+    expired = False
+
+    def expire():
+        nonlocal expired
+        expired = True
+        task.cancel()
+
+    handle = loop.call_at(loop.time() + deadline - time.monotonic(), expire)
+    try:
+        return await awaitable
+    except asyncio.CancelledError:
+        if expired:
+            # a partir do 3.11 a task conta os cancelamentos pedidos; este foi consumido aqui
+            if hasattr(task, "uncancel"):
+                task.uncancel()
+            raise DeadlineExceeded() from None
+        raise
+    finally:
+        handle.cancel()
+
+def create_openai_clients(
+    api_key: Optional[str],
+    base_url: Optional[str],
+    max_connections: int,
+    max_keepalive_connections: int,
+    keepalive_expiry_seconds: float,
+    connect_timeout_seconds: float,
+    timeout_seconds: float
+) -> Tuple[OpenAI, AsyncOpenAI]:
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry_seconds
+    )
+    timeout = httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds)
+
+    sync_client = OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        max_retries=0,
+        timeout=timeout,
+        http_client=httpx.Client(limits=limits, timeout=timeout)
+    )
+    async_client = AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        max_retries=0,
+        timeout=timeout,
+        http_client=httpx.AsyncClient(limits=limits, timeout=timeout)
+    )
+    return sync_client, async_client
+
+async def warm_up_client(async_client: AsyncOpenAI, timeout_seconds: float) -> bool:
+    # qualquer resposta HTTP serve: o objetivo é deixar a conexão TCP/TLS aberta no pool antes do primeiro usuário
+    try:
+        await asyncio.wait_for(async_client.models.list(), timeout_seconds)
+    except openai.APIStatusError:
+        return True
+    except (openai.APIError, asyncio.TimeoutError) as e:
+        logger.warning("Falha ao aquecer conexão com o serviço de IA: %s", str(e) or "timeout")
+        return False
+    return True
+
+def is_retryable(error: Exception) -> bool:
+    # um timeout de leitura já gastou o orçamento inteiro da tentativa; repetir só prenderia a requisição por mais tempo
+    if isinstance(error, openai.APITimeoutError):
+        return False
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+def map_error(error: Exception) -> Exception:
+    if isinstance(error, UpstreamError):
+        return error
+    if isinstance(error, openai.APITimeoutError):
+        return UpstreamError(504, "O serviço de IA demorou demais para responder")
+    if isinstance(error, openai.APIConnectionError):
+        return UpstreamError(502, "Falha ao conectar com o serviço de IA")
+    if isinstance(error, openai.RateLimitError):
+        return UpstreamError(503, "Serviço de IA sobrecarregado, tente novamente em instantes", retry_after=5)
+    if isinstance(error, openai.APIStatusError) and error.status_code >= 500:
+        return UpstreamError(502, "O serviço de IA retornou um erro")
+    if isinstance(error, openai.APIError):
+        return UpstreamError(502, "Requisição recusada pelo serviço de IA")
+    return error
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout_seconds:
+                    return False
+                self.state = "half_open"
+                self._trial_in_flight = False
+
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def available(self) -> bool:
+        with self._lock:
+            if self.state == "open":
+                return time.monotonic() - self.opened_at >= self.reset_timeout_seconds
+            return not (self.state == "half_open" and self._trial_in_flight)
+
+    def retry_after(self) -> int:
+        remaining = self.reset_timeout_seconds - (time.monotonic() - self.opened_at)
+        return max(1, int(remaining + 0.999))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("Circuito do serviço de IA fechado novamente")
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("Circuito do serviço de IA aberto após %d falhas", self.failures)
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+class RetryPolicy:
+    def __init__(self, max_retries: int, base_delay_seconds: float, max_delay_seconds: float, deadline_seconds: float = 0):
+        self.max_retries = max_retries
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        # prazo total somando tentativas e esperas; 0 desliga
+        self.deadline_seconds = deadline_seconds
+
+    def deadline(self) -> Optional[float]:
+        return time.monotonic() + self.deadline_seconds if self.deadline_seconds > 0 else None
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * (2 ** attempt)))
+
+class UpstreamClient:
+    def __init__(self, breaker: CircuitBreaker, retry_policy: RetryPolicy):
+        self.breaker = breaker
+        self.retry_policy = retry_policy
+
+    def _before_attempt(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.retry_after())
+
+    def _after_failure(self, error: Exception, attempt: int, deadline: Optional[float]) -> float:
+        if isinstance(error, (openai.APITimeoutError, DeadlineExceeded)):
+            self.breaker.record_failure()
+            raise map_error(error) from error
+
+        if not is_retryable(error):
+            if isinstance(error, openai.APIStatusError):
+                self.breaker.record_success()
+            else:
+                self.breaker.release()
+            raise map_error(error) from error
+
+        self.breaker.record_failure()
+
+        delay = self.retry_policy.delay(attempt)
+        if attempt >= self.retry_policy.max_retries or (deadline is not None and time.monotonic() + delay >= deadline):
+            raise map_error(error) from error
+
+        logger.warning("Falha no serviço de IA (%s), nova tentativa em %.2fs", type(error).__name__, delay)
+        return delay
+
+    def call(self, fn: Callable[[], Any], deadline: Optional[float] = None) -> Any:
+        deadline = deadline if deadline is not None else self.retry_policy.deadline()
+        attempt = 0
+        while True:
+            _check_deadline(deadline)
+            self._before_attempt()
+            try:
+                result = fn()
+            except Exception as e:
+                time.sleep(self._after_failure(e, attempt, deadline))
+                attempt += 1
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]], deadline: Optional[float] = None) -> Any:
+        deadline = deadline if deadline is not None else self.retry_policy.deadline()
+        attempt = 0
+        while True:
+            _check_deadline(deadline)
+            self._before_attempt()
+            try:
+                result = await _with_deadline(fn(), deadline)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                await asyncio.sleep(self._after_failure(e, attempt, deadline))
+                attempt += 1
+                continue
+
+            self.breaker.record_success()
+            return result
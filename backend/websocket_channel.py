@@ -0,0 +1,122 @@
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from metrics import websocket_connections
+
+logger = logging.getLogger(__name__)
+
+class WebSocketChannel:
+    def __init__(
+        self,
+        websocket: WebSocket,
+        heartbeat_seconds: float = 20,
+        idle_timeout_seconds: float = 60,
+        max_pending: int = 64
+    ):
+        self.websocket = websocket
+        self.heartbeat_seconds = heartbeat_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.last_received = time.monotonic()
+        self.busy = False
+        # fila limitada: quem produz mais rápido do que o cliente lê espera em send()
+        self._outgoing: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._closed = asyncio.Event()
+
+    async def send(self, payload: Dict[str, Any]):
+        if self._closed.is_set():
+            raise WebSocketDisconnect(1006)
+        await self._outgoing.put(payload)
+
+    def _send_control(self, payload: Dict[str, Any]):
+        # ping/pong nunca esperam pela fila: com o cliente atrasado eles são descartados
+        try:
+            self._outgoing.put_nowait(payload)
+        except asyncio.QueueFull:
+            pass
+
+    async def _writer(self):
+        while True:
+            payload = await self._outgoing.get()
+            await self.websocket.send_text(json.dumps(payload, ensure_ascii=False))
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            # a vida da conexão é medida pelo que o cliente manda (pong ou qualquer frame), não pelo que conseguimos enviar
+            if time.monotonic() - self.last_received > self.idle_timeout_seconds:
+                logger.info("Conexão WebSocket encerrada por inatividade")
+                await self.websocket.close(code=1001)
+                return
+            self._send_control({"type": "ping", "ts": time.time()})
+
+    async def _reader(self, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
+        turn: Optional[asyncio.Task] = None
+        try:
+            while True:
+                raw = await self.websocket.receive_text()
+                self.last_received = time.monotonic()
+
+                try:
+                    data = json.loads(raw)
+                except ValueError:
+                    await self.send({"type": "error", "detail": "Mensagem inválida: JSON esperado"})
+                    continue
+
+                if not isinstance(data, dict):
+                    await self.send({"type": "error", "detail": "Mensagem inválida: objeto JSON esperado"})
+                    continue
+
+                kind = data.get("type")
+                if kind == "ping":
+                    self._send_control({"type": "pong", "ts": data.get("ts")})
+                elif kind == "pong":
+                    continue
+                elif kind == "message":
+                    # uma resposta por vez; o cliente espera o "done" antes de enviar a próxima
+                    if self.busy:
+                        await self.send({"type": "error", "detail": "Aguarde a resposta anterior terminar"})
+                        continue
+                    self.busy = True
+                    turn = asyncio.create_task(self._run_turn(handler, data))
+                else:
+                    await self.send({"type": "error", "detail": f"Tipo de mensagem desconhecido: {kind}"})
+        finally:
+            if turn is not None and not turn.done():
+                turn.cancel()
+                await asyncio.gather(turn, return_exceptions=True)
+
+    async def _run_turn(self, handler: Callable[[Dict[str, Any]], Awaitable[None]], data: Dict[str, Any]):
+        try:
+            await handler(data)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.busy = False
+
+    async def serve(self, handler: Callable[[Dict[str, Any]], Awaitable[None]], greeting: Optional[Dict[str, Any]] = None):
+        websocket_connections.inc()
+        if greeting is not None:
+            self._outgoing.put_nowait(greeting)
+
+        tasks = [
+            asyncio.create_task(self._writer()),
+            asyncio.create_task(self._heartbeat()),
+            asyncio.create_task(self._reader(handler)),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._closed.set()
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            websocket_connections.dec()
+
+        for result in results:
+            if isinstance(result, Exception) and not isinstance(result, (WebSocketDisconnect, RuntimeError)):
+                logger.error("Erro na conexão WebSocket: %s", result)
@@ -0,0 +1,68 @@
+"""
+Benchmark da moderação por termos banidos
+
+Mede o tempo de busca do autômato Aho-Corasick variando o tamanho da mensagem
+e o número de termos. O custo por caractere deve ficar estável nas duas
+dimensões (busca linear no tamanho do texto, independente da lista).
+
+Uso: python benchmarks/bench_moderation.py [--repeat 200]
+"""
+import os
+import sys
+import time
+import random
+import string
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from moderation import TermAutomaton, fold
+
+TERM_COUNTS = (10, 1000, 10000, 100000)
+MESSAGE_LENGTHS = (250, 500, 1000, 2000, 4000)
+
+def random_word(rng, min_length=4, max_length=12):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(min_length, max_length)))
+
+def random_message(rng, length):
+    words = []
+    size = 0
+    while size < length:
+        word = random_word(rng, 2, 9)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+def measure(automaton, message, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        automaton.find(message)
+    return (time.perf_counter() - started) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da moderação por termos banidos")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    messages = {length: fold(random_message(rng, length)) for length in MESSAGE_LENGTHS}
+
+    print(f"{'termos':>8} {'montagem':>10} " + " ".join(f"{f'{length} car.':>18}" for length in MESSAGE_LENGTHS))
+
+    for count in TERM_COUNTS:
+        terms = {random_word(rng, 10, 16) for _ in range(count)}
+
+        started = time.perf_counter()
+        automaton = TermAutomaton(terms)
+        build_seconds = time.perf_counter() - started
+
+        cells = []
+        for length in MESSAGE_LENGTHS:
+            seconds = measure(automaton, messages[length], args.repeat)
+            cells.append(f"{seconds * 1e6:.0f}µs ({seconds * 1e9 / length:.0f}ns/car)")
+
+        print(f"{count:>8} {build_seconds * 1e3:8.0f}ms " + " ".join(f"{cell:>18}" for cell in cells))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark de memória do armazenamento de sessões
+
+Mede com tracemalloc quanto o InMemorySessionStore cresce por sessão e por
+mensagem, em três fases: sessões novas até o limite, turnos extras em sessões
+existentes (a janela de MAX_HISTORY_MESSAGES deve segurar o crescimento) e
+sessões além de MAX_SESSIONS (o LRU deve manter o total estável). Por fim mede
+o tempo de gravar e restaurar o snapshot binário do store e o pico de memória
+da restauração. O resultado é gravado em JSON em benchmarks/results/.
+
+Uso: python benchmarks/bench_session_store.py --sessions 10000 --turns 5
+"""
+import os
+import time
+import uuid
+import random
+import argparse
+import tempfile
+import tracemalloc
+from typing import Dict, List
+
+from common import add_backend_to_path, write_results
+
+add_backend_to_path()
+
+from session_store import InMemorySessionStore
+from snapshot import SessionSnapshotter
+
+USER_MESSAGE_CHARS = 80
+ASSISTANT_MESSAGE_CHARS = 400
+
+def text(rng: random.Random, length: int) -> str:
+    words = []
+    size = 0
+    while size < length:
+        word = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9)))
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+def turn(rng: random.Random) -> List[Dict[str, str]]:
+    return [
+        {"role": "user", "content": text(rng, USER_MESSAGE_CHARS)},
+        {"role": "assistant", "content": text(rng, ASSISTANT_MESSAGE_CHARS)}
+    ]
+
+def add_turns(store: InMemorySessionStore, session_id: str, rng: random.Random, turns: int):
+    store.get_or_create(session_id)
+    for _ in range(turns):
+        messages = turn(rng)
+        store.append(session_id, messages, [len(message["content"]) // 4 + 4 for message in messages])
+
+def checkpoint(store: InMemorySessionStore, phase: str, baseline: int, started: float) -> Dict[str, object]:
+    current, peak = tracemalloc.get_traced_memory()
+    sessions = len(store)
+    messages = sum(len(session.messages) for session in store._sessions.values())
+    used = current - baseline
+    return {
+        "phase": phase,
+        "sessions": sessions,
+        "messages": messages,
+        "bytes": used,
+        "peak_bytes": peak - baseline,
+        "bytes_per_session": round(used / sessions) if sessions else 0,
+        "bytes_per_message": round(used / messages) if messages else 0,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+def print_checkpoint(point: Dict[str, object]):
+    print(
+        f"{point['phase']:>10} {point['sessions']:>8} sessões {point['messages']:>9} mensagens "
+        f"{point['bytes'] / 2**20:>9.1f} MiB {point['bytes_per_session']:>8} B/sessão "
+        f"{point['bytes_per_message']:>6} B/mensagem"
+    )
+
+def measure_snapshot(store: InMemorySessionStore, path: str) -> Dict[str, object]:
+    started = time.perf_counter()
+    SessionSnapshotter(store, path).save()
+    save_seconds = time.perf_counter() - started
+
+    restored = InMemorySessionStore(store.max_sessions, store.ttl_seconds, store.max_messages)
+    started = time.perf_counter()
+    SessionSnapshotter(restored, path).load()
+    load_seconds = time.perf_counter() - started
+
+    # segunda restauração só para medir memória; o tracemalloc distorce o tempo
+    del restored
+    restored = InMemorySessionStore(store.max_sessions, store.ttl_seconds, store.max_messages)
+    tracemalloc.start()
+    SessionSnapshotter(restored, path).load()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "sessions": len(restored),
+        "file_bytes": os.path.getsize(path),
+        "save_seconds": round(save_seconds, 3),
+        "load_seconds": round(load_seconds, 3),
+        "restored_bytes": current,
+        "peak_bytes": peak,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memória do armazenamento de sessões")
+    parser.add_argument("--sessions", type=int, default=10000, help="MAX_SESSIONS do store")
+    parser.add_argument("--turns", type=int, default=5, help="turnos por sessão na primeira fase")
+    parser.add_argument("--max-messages", type=int, default=20, help="MAX_HISTORY_MESSAGES do store")
+    parser.add_argument("--checkpoints", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    store = InMemorySessionStore(max_sessions=args.sessions, ttl_seconds=0, max_messages=args.max_messages)
+    session_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(args.sessions)]
+    step = max(1, args.sessions // args.checkpoints)
+    points = []
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+
+    for index, session_id in enumerate(session_ids, 1):
+        add_turns(store, session_id, rng, args.turns)
+        if index % step == 0 or index == len(session_ids):
+            points.append(checkpoint(store, "crescimento", baseline, started))
+            print_checkpoint(points[-1])
+
+    extra_turns = args.max_messages // 2 + 1
+    for session_id in session_ids:
+        add_turns(store, session_id, rng, extra_turns)
+    points.append(checkpoint(store, "janela", baseline, started))
+    print_checkpoint(points[-1])
+
+    for _ in range(args.sessions):
+        add_turns(store, str(uuid.UUID(int=rng.getrandbits(128))), rng, args.turns)
+    points.append(checkpoint(store, "lru", baseline, started))
+    print_checkpoint(points[-1])
+
+    tracemalloc.stop()
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = measure_snapshot(store, os.path.join(directory, "sessions.snap"))
+    print(
+        f"  snapshot {snapshot['sessions']:>8} sessões {snapshot['file_bytes'] / 2**20:>9.1f} MiB "
+        f"gravado em {snapshot['save_seconds']:.2f}s, restaurado em {snapshot['load_seconds']:.2f}s "
+        f"(pico {snapshot['peak_bytes'] / max(snapshot['restored_bytes'], 1):.2f}x o store)"
+    )
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    output = write_results("session-store", {"config": config, "checkpoints": points, "snapshot": snapshot}, args.output)
+    print(f"Resultados gravados em {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Servidor falso compatível com a API de chat da OpenAI
+
+Responde a POST /v1/chat/completions com latência sorteada de uma distribuição
+configurável, suporta streaming (SSE com um chunk por palavra) e injeta erros
+com uma taxa definida. Serve de upstream para os benchmarks de carga sem gastar
+tokens nem depender da rede.
+
+Uso: python benchmarks/fake_openai.py --port 9100 --latency lognormal --latency-ms 400
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+from dataclasses import dataclass
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+WORDS = (
+    "Morty", "escuta", "isso", "é", "ciência", "pura", "*burp*", "portal", "dimensão",
+    "C-137", "não", "tenho", "tempo", "para", "explicar", "física", "quântica", "de", "novo"
+)
+
+@dataclass
+class FakeConfig:
+    latency: str = "lognormal"
+    latency_ms: float = 300.0
+    jitter: float = 0.5
+    reply_words: int = 40
+    chunk_delay_ms: float = 5.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    seed: int = 42
+
+class LatencyModel:
+    def __init__(self, config: FakeConfig, rng: random.Random):
+        if config.latency not in DISTRIBUTIONS:
+            raise ValueError(f"Distribuição desconhecida: {config.latency}")
+        self.config = config
+        self.rng = rng
+
+    def sample(self) -> float:
+        config = self.config
+        mean = config.latency_ms / 1000
+
+        if config.latency == "constant":
+            return mean
+        if config.latency == "uniform":
+            spread = mean * config.jitter
+            return max(0.0, self.rng.uniform(mean - spread, mean + spread))
+        if config.latency == "exponential":
+            return self.rng.expovariate(1 / mean) if mean > 0 else 0.0
+        # lognormal: latency_ms é a mediana e jitter o desvio padrão do log
+        return self.rng.lognormvariate(0, config.jitter) * mean
+
+def create_app(config: FakeConfig) -> Starlette:
+    rng = random.Random(config.seed)
+    latency = LatencyModel(config, rng)
+    counter = itertools.count(1)
+    stats = {"requests": 0, "streams": 0, "errors": 0}
+
+    def reply_text() -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(config.reply_words))
+
+    def chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    async def completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "gpt-4o-mini")
+        completion_id = f"chatcmpl-fake-{next(counter)}"
+        stats["requests"] += 1
+
+        await asyncio.sleep(latency.sample())
+
+        if rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                {"error": {"message": "erro injetado", "type": "server_error"}},
+                status_code=config.error_status,
+                headers={"Retry-After": "1"} if config.error_status == 429 else None
+            )
+
+        text = reply_text()
+        prompt_tokens = sum(len(message.get("content") or "") for message in body.get("messages", [])) // 4
+
+        if body.get("stream"):
+            stats["streams"] += 1
+
+            async def events():
+                yield chunk(completion_id, model, {"role": "assistant", "content": ""})
+                for index, word in enumerate(text.split(" ")):
+                    if config.chunk_delay_ms:
+                        await asyncio.sleep(config.chunk_delay_ms / 1000)
+                    yield chunk(completion_id, model, {"content": word if index == 0 else " " + word})
+                yield chunk(completion_id, model, {}, "stop")
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": config.reply_words,
+                "total_tokens": prompt_tokens + config.reply_words
+            }
+        })
+
+    async def get_stats(request: Request):
+        return JSONResponse(stats)
+
+    return Starlette(routes=[
+        Route("/v1/chat/completions", completions, methods=["POST"]),
+        Route("/stats", get_stats, methods=["GET"])
+    ])
+
+def add_arguments(parser: argparse.ArgumentParser):
+    defaults = FakeConfig()
+    parser.add_argument("--latency", choices=DISTRIBUTIONS, default=defaults.latency)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms,
+                        help="média (ou mediana, para lognormal) da latência até a resposta")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter,
+                        help="variação relativa (uniform) ou desvio padrão do log (lognormal)")
+    parser.add_argument("--reply-words", type=int, default=defaults.reply_words)
+    parser.add_argument("--chunk-delay-ms", type=float, default=defaults.chunk_delay_ms,
+                        help="intervalo entre chunks no streaming")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        jitter=args.jitter,
+        reply_words=args.reply_words,
+        chunk_delay_ms=args.chunk_delay_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed
+    )
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor falso compatível com a API da OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Teste de carga da API do chatbot
+
+Sobe o servidor falso da OpenAI e o backend em processos separados (ou usa um
+backend já rodando com --url), dispara requisições em /api/chat,
+/api/chat/stream e /api/chat/batch com concorrência fixa e mede vazão (RPS),
+latência p50/p95/p99, tempo até o primeiro token no streaming e o crescimento
+de memória e de sessões do backend (via /metrics). O resultado é gravado em
+JSON em benchmarks/results/.
+
+Uso: python benchmarks/load_test.py --endpoints chat,stream,batch --concurrency 16 --requests 400
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from common import ROOT, summarize, write_results
+from fake_openai import add_arguments as add_fake_arguments
+
+ENDPOINTS = ("chat", "stream", "batch")
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout_seconds: float = 30):
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Processo encerrou antes de ficar pronto: {' '.join(process.args)}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Tempo esgotado esperando {url}")
+
+def fake_server_args(args: argparse.Namespace) -> List[str]:
+    return [
+        "--latency", args.latency,
+        "--latency-ms", str(args.latency_ms),
+        "--jitter", str(args.jitter),
+        "--reply-words", str(args.reply_words),
+        "--chunk-delay-ms", str(args.chunk_delay_ms),
+        "--error-rate", str(args.error_rate),
+        "--error-status", str(args.error_status),
+        "--seed", str(args.seed),
+    ]
+
+def start_stack(args: argparse.Namespace) -> Tuple[str, List[subprocess.Popen]]:
+    output = None if args.show_logs else subprocess.DEVNULL
+    fake_port = free_port()
+    fake = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "fake_openai.py"), "--port", str(fake_port), *fake_server_args(args)],
+        stdout=output,
+        stderr=output
+    )
+    wait_until_ready(f"http://127.0.0.1:{fake_port}/stats", fake)
+
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+    })
+    for assignment in args.app_env:
+        key, _, value = assignment.partition("=")
+        env[key] = value
+
+    app_port = free_port()
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=os.path.join(ROOT, "backend"),
+        env=env,
+        stdout=output,
+        stderr=output
+    )
+    url = f"http://127.0.0.1:{app_port}"
+    wait_until_ready(f"{url}/health", app)
+
+    return url, [app, fake]
+
+async def scrape_metrics(client: httpx.AsyncClient) -> Dict[str, float]:
+    wanted = ("process_resident_memory_bytes", "chatbot_active_sessions")
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return {}
+    if response.status_code != 200:
+        return {}
+
+    values = {}
+    for line in response.text.splitlines():
+        name, _, value = line.partition(" ")
+        if name in wanted:
+            values[name] = float(value)
+    return values
+
+class Worker:
+    def __init__(self, worker_id: int, turns_per_session: int):
+        self.worker_id = worker_id
+        self.turns_per_session = turns_per_session
+        self.session_id: Optional[str] = None
+        self.turns = 0
+
+    def next_session(self) -> Optional[str]:
+        if self.turns_per_session and self.turns >= self.turns_per_session:
+            self.session_id = None
+            self.turns = 0
+        self.turns += 1
+        return self.session_id
+
+async def run_chat(client: httpx.AsyncClient, worker: Worker, index: int, use_cache: bool) -> Dict[str, object]:
+    payload = {"message": f"Rick, pergunta {index}: como funciona a arma de portais?", "use_cache": use_cache}
+    session_id = worker.next_session()
+    if session_id:
+        payload["session_id"] = session_id
+
+    started = time.perf_counter()
+    response = await client.post("/api/chat", json=payload)
+    elapsed = time.perf_counter() - started
+
+    if response.status_code == 200:
+        worker.session_id = response.json()["session_id"]
+    return {"status": response.status_code, "latency": elapsed, "ttfb": elapsed, "items": 1}
+
+async def run_stream(client: httpx.AsyncClient, worker: Worker, index: int, use_cache: bool) -> Dict[str, object]:
+    payload = {"message": f"Rick, pergunta {index}: o que tem na garagem?", "use_cache": use_cache}
+    session_id = worker.next_session()
+    if session_id:
+        payload["session_id"] = session_id
+
+    started = time.perf_counter()
+    ttfb = None
+    status = None
+    event = None
+    async with client.stream("POST", "/api/chat/stream", json=payload) as response:
+        status = response.status_code
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+                if event == "delta" and ttfb is None:
+                    ttfb = time.perf_counter() - started
+                elif event == "error":
+                    status = "stream_error"
+            elif line.startswith("data: ") and event == "session":
+                worker.session_id = json.loads(line[6:])["session_id"]
+    elapsed = time.perf_counter() - started
+
+    return {"status": status, "latency": elapsed, "ttfb": ttfb, "items": 1}
+
+async def run_batch(client: httpx.AsyncClient, worker: Worker, index: int, use_cache: bool, batch_size: int) -> Dict[str, object]:
+    payload = {
+        "items": [
+            {"message": f"Rick, pergunta {index}.{item}: qual a melhor dimensão?", "use_cache": use_cache}
+            for item in range(batch_size)
+        ]
+    }
+
+    started = time.perf_counter()
+    response = await client.post("/api/chat/batch", json=payload)
+    elapsed = time.perf_counter() - started
+
+    status = response.status_code
+    if status == 200 and any(result["error"] for result in response.json()["results"]):
+        status = "item_error"
+    return {"status": status, "latency": elapsed, "ttfb": elapsed, "items": batch_size}
+
+async def run_scenario(client: httpx.AsyncClient, endpoint: str, args: argparse.Namespace) -> Dict[str, object]:
+    total = args.requests if endpoint != "batch" else max(1, args.requests // args.batch_size)
+    results: List[Dict[str, object]] = []
+
+    async def call(worker: Worker, index: int) -> Dict[str, object]:
+        try:
+            if endpoint == "chat":
+                return await run_chat(client, worker, index, args.cache)
+            if endpoint == "stream":
+                return await run_stream(client, worker, index, args.cache)
+            return await run_batch(client, worker, index, args.cache, args.batch_size)
+        except httpx.HTTPError as e:
+            return {"status": type(e).__name__, "latency": 0.0, "ttfb": None, "items": 0}
+
+    async def worker_loop(worker: Worker, indexes, collect: bool):
+        for index in indexes:
+            result = await call(worker, index)
+            if collect:
+                results.append(result)
+
+    workers = [Worker(worker_id, args.turns_per_session) for worker_id in range(args.concurrency)]
+
+    # o aquecimento roda antes do relógio começar
+    warmup = iter(range(args.warmup))
+    await asyncio.gather(*(worker_loop(worker, warmup, False) for worker in workers))
+
+    before = await scrape_metrics(client)
+    measured = iter(range(args.warmup, args.warmup + total))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker_loop(worker, measured, True) for worker in workers))
+    duration = time.perf_counter() - started
+    after = await scrape_metrics(client)
+
+    ok = [result for result in results if result["status"] == 200]
+    statuses = Counter(str(result["status"]) for result in results)
+    items = sum(result["items"] for result in ok)
+
+    scenario = {
+        "endpoint": endpoint,
+        "concurrency": args.concurrency,
+        "requests": len(results),
+        "duration_seconds": round(duration, 3),
+        "rps": round(len(ok) / duration, 2) if duration else 0.0,
+        "statuses": dict(statuses),
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0.0,
+        "latency_ms": summarize([result["latency"] for result in ok]),
+    }
+    if endpoint == "stream":
+        scenario["ttfb_ms"] = summarize([result["ttfb"] for result in ok if result["ttfb"] is not None])
+    if endpoint == "batch":
+        scenario["items_per_second"] = round(items / duration, 2) if duration else 0.0
+
+    if before and after:
+        rss_delta = after.get("process_resident_memory_bytes", 0) - before.get("process_resident_memory_bytes", 0)
+        sessions_delta = after.get("chatbot_active_sessions", 0) - before.get("chatbot_active_sessions", 0)
+        scenario["memory"] = {
+            "rss_before_bytes": before.get("process_resident_memory_bytes"),
+            "rss_after_bytes": after.get("process_resident_memory_bytes"),
+            "rss_delta_bytes": rss_delta,
+            "sessions_before": before.get("chatbot_active_sessions"),
+            "sessions_after": after.get("chatbot_active_sessions"),
+            "rss_per_new_session_bytes": round(rss_delta / sessions_delta) if sessions_delta > 0 else None,
+        }
+
+    return scenario
+
+def print_scenario(scenario: Dict[str, object]):
+    latency = scenario["latency_ms"]
+    line = (
+        f"{scenario['endpoint']:>7} c={scenario['concurrency']:<4} n={scenario['requests']:<6} "
+        f"{scenario['rps']:>9.1f} req/s  p50={latency.get('p50', 0):>8.1f}ms "
+        f"p95={latency.get('p95', 0):>8.1f}ms p99={latency.get('p99', 0):>8.1f}ms  "
+        f"erros={scenario['error_rate']:.1%}"
+    )
+    if "ttfb_ms" in scenario:
+        line += f"  ttfb p50={scenario['ttfb_ms'].get('p50', 0):.1f}ms"
+    if "items_per_second" in scenario:
+        line += f"  itens/s={scenario['items_per_second']:.1f}"
+    print(line)
+
+async def run(args: argparse.Namespace, url: str) -> List[Dict[str, object]]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    scenarios = []
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        for endpoint in args.endpoints:
+            scenario = await run_scenario(client, endpoint, args)
+            print_scenario(scenario)
+            scenarios.append(scenario)
+
+    return scenarios
+
+def parse_endpoints(value: str) -> List[str]:
+    endpoints = [endpoint.strip() for endpoint in value.split(",") if endpoint.strip()]
+    for endpoint in endpoints:
+        if endpoint not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Endpoint desconhecido: {endpoint}")
+    return endpoints
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API do chatbot")
+    parser.add_argument("--url", default=None, help="backend já rodando; sem isso sobe o servidor falso e o backend")
+    parser.add_argument("--endpoints", type=parse_endpoints, default=["chat", "stream"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400, help="requisições medidas por endpoint")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--turns-per-session", type=int, default=5,
+                        help="turnos por sessão antes de abrir outra (0 = sessão única por worker)")
+    parser.add_argument("--cache", action="store_true", help="permite respostas do cache")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--app-env", action="append", default=[], metavar="CHAVE=VALOR",
+                        help="variável de ambiente extra para o backend")
+    parser.add_argument("--show-logs", action="store_true", help="mostra os logs do backend e do servidor falso")
+    parser.add_argument("--output", default=None)
+    add_fake_arguments(parser)
+    args = parser.parse_args()
+
+    processes = []
+    url = args.url
+    try:
+        if url is None:
+            url, processes = start_stack(args)
+        scenarios = asyncio.run(run(args, url))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    output = write_results("load", {"config": config, "scenarios": scenarios}, args.output)
+    print(f"Resultados gravados em {output}")
+
+if __name__ == "__main__":
+    main()
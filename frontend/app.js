@@ -1,4 +1,7 @@
-const API_BASE_URL = "http://localhost:8000";
+// servido pelo backend em /app/, a API está na mesma origem
+const API_BASE_URL = window.location.pathname.startsWith("/app/") ? window.location.origin : "http://localhost:8000";
+const WS_URL = API_BASE_URL.replace(/^http/, "ws") + "/ws/chat";
+const WS_CONNECT_TIMEOUT_MS = 3000;
 
 const chatWindow = document.getElementById("chat-window");
 const sendBtn = document.getElementById("send-btn");
@@ -7,6 +10,10 @@ const typingIndicator = document.getElementById("typing-indicator");
 
 let sessionId = localStorage.getItem("rb_session_id") || null;
 let isWaiting = false;
+let socket = null;
+let socketReady = null;
+let socketUnavailable = !("WebSocket" in window);
+let currentTurn = null;
 
 function appendMessage(role, text) {
   const wrapper = document.createElement("div");
@@ -25,6 +32,12 @@ function appendMessage(role, text) {
 
   chatWindow.appendChild(wrapper);
   chatWindow.scrollTop = chatWindow.scrollHeight;
+  return bubble;
+}
+
+function updateBubble(bubble, text) {
+  bubble.innerHTML = text.replace(/\n/g, "<br>");
+  chatWindow.scrollTop = chatWindow.scrollHeight;
 }
 
 function showTyping() {
@@ -44,6 +57,140 @@ function appendError(text) {
   chatWindow.scrollTop = chatWindow.scrollHeight;
 }
 
+function saveSession(id) {
+  if (id) {
+    sessionId = id;
+    localStorage.setItem("rb_session_id", sessionId);
+  }
+}
+
+function parseSseEvent(raw) {
+  let event = "message";
+  const dataLines = [];
+  for (const line of raw.split("\n")) {
+    if (line.startsWith("event:")) event = line.slice(6).trim();
+    else if (line.startsWith("data:")) dataLines.push(line.slice(5).trim());
+  }
+  if (dataLines.length === 0) return null;
+  return { event, data: JSON.parse(dataLines.join("\n")) };
+}
+
+async function streamReply(res) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  const turn = { bubble: null, text: "" };
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const parsed = parseSseEvent(buffer.slice(0, sep));
+      buffer = buffer.slice(sep + 2);
+      if (!parsed) continue;
+
+      if (parsed.event === "session") saveSession(parsed.data.session_id);
+      else handleTurnEvent(turn, parsed.event, parsed.data);
+    }
+  }
+}
+
+function handleTurnEvent(turn, type, data) {
+  if (type === "delta") {
+    turn.text += data.content;
+    if (!turn.bubble) {
+      hideTyping();
+      turn.bubble = appendMessage("rick", turn.text);
+    } else {
+      updateBubble(turn.bubble, turn.text);
+    }
+  } else if (type === "replace") {
+    turn.text = data.content;
+    if (turn.bubble) updateBubble(turn.bubble, turn.text);
+  } else if (type === "done") {
+    hideTyping();
+    const reply = data.reply || "Hmm... nada por aqui.";
+    if (!turn.bubble) turn.bubble = appendMessage("rick", reply);
+    else updateBubble(turn.bubble, reply);
+  } else if (type === "error") {
+    hideTyping();
+    appendError("Erro na requisição: " + (data.detail || "Erro desconhecido"));
+  }
+}
+
+function connectSocket() {
+  if (socketReady) return socketReady;
+
+  socketReady = new Promise((resolve) => {
+    const params = sessionId ? `?session_id=${encodeURIComponent(sessionId)}` : "";
+    const ws = new WebSocket(WS_URL + params);
+    const timer = setTimeout(() => ws.close(), WS_CONNECT_TIMEOUT_MS);
+    let opened = false;
+
+    ws.onmessage = (ev) => {
+      const data = JSON.parse(ev.data);
+      if (data.type === "session") {
+        saveSession(data.session_id);
+        clearTimeout(timer);
+        opened = true;
+        socket = ws;
+        resolve(ws);
+      } else if (data.type === "ping") {
+        ws.send(JSON.stringify({ type: "pong", ts: data.ts }));
+      } else if (currentTurn && data.type !== "pong") {
+        handleTurnEvent(currentTurn, data.type, data);
+        if (data.type === "done" || data.type === "error") {
+          currentTurn.resolve();
+          currentTurn = null;
+        }
+      }
+    };
+
+    ws.onclose = () => {
+      clearTimeout(timer);
+      socket = null;
+      socketReady = null;
+      // sem WebSocket no servidor (ou bloqueado no caminho): volta para o fetch
+      if (!opened) socketUnavailable = true;
+      if (currentTurn) {
+        currentTurn.reject(new Error("conexão encerrada"));
+        currentTurn = null;
+      }
+      resolve(null);
+    };
+  });
+
+  return socketReady;
+}
+
+async function sendOverSocket(ws, text) {
+  await new Promise((resolve, reject) => {
+    currentTurn = { bubble: null, text: "", resolve, reject };
+    ws.send(JSON.stringify({ type: "message", message: text }));
+  });
+}
+
+async function sendOverFetch(text) {
+  const payload = { message: text, session_id: sessionId };
+  const res = await fetch(`${API_BASE_URL}/api/chat/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", "Accept": "text/event-stream" },
+    body: JSON.stringify(payload),
+  });
+
+  if (!res.ok) {
+    const err = await res.json().catch(()=>({detail:'Erro desconhecido'}));
+    hideTyping();
+    appendError("Erro na requisição: " + (err.detail || res.statusText));
+    return;
+  }
+
+  await streamReply(res);
+}
+
 async function sendMessage() {
   const text = userInput.value.trim();
   if (!text || isWaiting) return;
@@ -53,32 +200,14 @@ async function sendMessage() {
   showTyping();
 
   try {
-    const payload = { message: text, session_id: sessionId };
-    const res = await fetch(`${API_BASE_URL}/api/chat`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(payload),
-    });
-
-    if (!res.ok) {
-      const err = await res.json().catch(()=>({detail:'Erro desconhecido'}));
-      hideTyping();
-      appendError("Erro na requisição: " + (err.detail || res.statusText));
-      isWaiting = false;
-      return;
-    }
-
-    const data = await res.json();
-    if (data.session_id) {
-      sessionId = data.session_id;
-      localStorage.setItem("rb_session_id", sessionId);
-    }
-    hideTyping();
-    appendMessage("rick", data.reply || "Hmm... nada por aqui.");
+    const ws = socketUnavailable ? null : await connectSocket();
+    if (ws) await sendOverSocket(ws, text);
+    else await sendOverFetch(text);
   } catch (e) {
     hideTyping();
     appendError("Erro ao conectar com o servidor: " + e.message);
   } finally {
+    hideTyping();
     isWaiting = false;
   }
 }
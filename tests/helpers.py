@@ -0,0 +1,14 @@
+"""
+Utilitários compartilhados pelos testes: respostas simuladas da API da OpenAI
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+def mock_completion(text="Resposta do Rick", total_tokens=100, **usage):
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = text
+    mock_response.usage = MagicMock(total_tokens=total_tokens, **usage)
+    return mock_response
+
+def mock_reply(mock_async_client, text="Resposta do Rick", **usage):
+    mock_async_client.chat.completions.create = AsyncMock(return_value=mock_completion(text, **usage))
@@ -0,0 +1,167 @@
+"""
+Testes dos endpoints da API FastAPI
+Mockando chamadas à OpenAI API
+"""
+import json
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import app
+from tests.helpers import mock_completion
+
+client = TestClient(app)
+
+def mock_stream(deltas):
+    async def stream():
+        for delta in deltas:
+            chunk = MagicMock()
+            chunk.choices = [MagicMock()]
+            chunk.choices[0].delta.content = delta
+            yield chunk
+    return stream()
+
+def parse_sse(body):
+    events = []
+    for raw in body.strip().split("\n\n"):
+        lines = raw.split("\n")
+        event = lines[0][len("event: "):]
+        data = json.loads(lines[1][len("data: "):])
+        events.append((event, data))
+    return events
+
+class TestChatEndpoint:
+    """Testes do endpoint /api/chat"""
+    
+    @patch('chat_engine.async_client')
+    def test_chat_returns_reply(self, mock_async_client):
+        """Testa que /api/chat retorna resposta e session_id"""
+        mock_async_client.chat.completions.create = AsyncMock(
+            return_value=mock_completion("Resposta do Rick")
+        )
+        
+        response = client.post("/api/chat", json={"message": "Olá Rick"})
+        
+        assert response.status_code == 200
+        assert response.json()["reply"] == "Resposta do Rick"
+        assert len(response.json()["session_id"]) == 36
+
+class TestChatStreamEndpoint:
+    """Testes do endpoint /api/chat/stream (SSE)"""
+    
+    @patch('chat_engine.async_client')
+    def test_stream_emits_session_deltas_and_done(self, mock_async_client):
+        """Testa a sequência de eventos SSE do streaming"""
+        mock_async_client.chat.completions.create = AsyncMock(
+            return_value=mock_stream(["Olá, ", "Morty"])
+        )
+        
+        response = client.post("/api/chat/stream", json={"message": "Olá Rick"})
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        assert events[0][0] == "session"
+        assert [e for e, _ in events[1:]] == ["delta", "delta", "done"]
+        assert events[-1][1]["reply"] == "Olá, Morty"
+        assert events[-1][1]["session_id"] == events[0][1]["session_id"]
+    
+    @patch('chat_engine.async_client')
+    def test_stream_reports_upstream_error_as_event(self, mock_async_client):
+        """Testa que falha no upstream vira evento de erro"""
+        mock_async_client.chat.completions.create = AsyncMock(side_effect=RuntimeError("falhou"))
+        
+        response = client.post("/api/chat/stream", json={"message": "Olá Rick"})
+        
+        events = parse_sse(response.text)
+        assert events[-1][0] == "error"
+
+class TestChatBatchEndpoint:
+    """Testes do endpoint /api/chat/batch"""
+    
+    @patch('chat_engine.async_client')
+    def test_batch_returns_results_in_order(self, mock_async_client):
+        """Testa que o lote retorna um resultado por item, na ordem enviada"""
+        mock_async_client.chat.completions.create = AsyncMock(
+            return_value=mock_completion("Resposta do Rick")
+        )
+        
+        payload = {"items": [{"message": f"Pergunta {i}"} for i in range(4)], "concurrency": 2}
+        response = client.post("/api/chat/batch", json=payload)
+        
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["index"] for r in results] == [0, 1, 2, 3]
+        assert all(r["reply"] == "Resposta do Rick" and r["error"] is None for r in results)
+    
+    @patch('chat_engine.async_client')
+    def test_batch_streams_ndjson(self, mock_async_client):
+        """Testa o modo de streaming NDJSON do lote"""
+        mock_async_client.chat.completions.create = AsyncMock(
+            return_value=mock_completion("Resposta do Rick")
+        )
+        
+        payload = {"items": [{"message": "Pergunta 1"}, {"message": "Pergunta 2"}], "stream": True}
+        response = client.post("/api/chat/batch", json=payload)
+        
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.strip().split("\n")]
+        assert sorted(line["index"] for line in lines) == [0, 1]
+    
+    def test_batch_rejects_empty_items(self):
+        """Testa que lote vazio falha validação"""
+        response = client.post("/api/chat/batch", json={"items": []})
+        assert response.status_code == 422
+
+class TestAdmissionControl:
+    """Testes da rejeição por sobrecarga nos endpoints"""
+    
+    def test_overload_returns_503_with_retry_after(self):
+        """Testa que o agendador saturado responde 503 com Retry-After"""
+        from app import scheduler
+        
+        with patch.object(scheduler, "max_in_flight", 0), patch.object(scheduler, "max_queue", 0):
+            response = client.post("/api/chat", json={"message": "Olá Rick"})
+        
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+    
+    def test_stream_setup_failure_releases_slot(self):
+        """Testa que um erro inesperado antes do streaming devolve o slot e libera a sessão"""
+        from app import scheduler
+        
+        with patch('app.ask_bot_stream', AsyncMock(side_effect=RuntimeError("banco travado"))):
+            with pytest.raises(RuntimeError):
+                client.post("/api/chat/stream", json={"message": "Olá Rick", "session_id": "sessao-presa"})
+        
+        assert scheduler.stats()["in_flight"] == 0
+        with patch.object(scheduler, "max_pending_per_session", 1), patch.object(scheduler, "queue_timeout_seconds", 0.5):
+            with patch('app.ask_bot_stream', AsyncMock(side_effect=ValueError("Mensagem rejeitada"))):
+                response = client.post("/api/chat/stream", json={"message": "Olá Rick", "session_id": "sessao-presa"})
+        
+        assert response.status_code == 400
+
+class TestUpstreamErrorMapping:
+    """Testes do mapeamento de erros do serviço de IA para status HTTP"""
+    
+    @patch('chat_engine.async_client')
+    def test_upstream_timeout_returns_504(self, mock_async_client):
+        """Testa que timeout no serviço de IA vira 504"""
+        import httpx
+        import openai
+        
+        timeout = openai.APITimeoutError(request=httpx.Request("POST", "http://upstream/v1/chat/completions"))
+        mock_async_client.chat.completions.create = AsyncMock(side_effect=timeout)
+        
+        with patch('chat_engine.upstream.retry_policy.max_retries', 0):
+            response = client.post("/api/chat", json={"message": "Olá Rick"})
+        
+        assert response.status_code == 504
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,71 @@
+"""
+Testes unitários para o processamento em lote
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from batch import run_batch
+from schemas import ChatRequest
+
+class TestRunBatch:
+    """Testes do run_batch"""
+    
+    @pytest.mark.asyncio
+    async def test_respects_concurrency_limit(self):
+        """Testa que nunca há mais itens em execução que o limite"""
+        running = 0
+        peak = 0
+        
+        async def ask(item):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.005)
+            running -= 1
+            return item.message.upper(), "sessao"
+        
+        items = [ChatRequest(message=f"msg{i}") for i in range(10)]
+        results = [result async for result in run_batch(items, ask, concurrency=3)]
+        
+        assert peak == 3
+        assert sorted(r["index"] for r in results) == list(range(10))
+    
+    @pytest.mark.asyncio
+    async def test_same_session_items_run_in_order(self):
+        """Testa que itens da mesma sessão são executados sequencialmente e em ordem"""
+        order = []
+        
+        async def ask(item):
+            order.append(item.message)
+            await asyncio.sleep(0.001)
+            return "ok", item.session_id
+        
+        items = [ChatRequest(message=f"msg{i}", session_id="s1") for i in range(5)]
+        [result async for result in run_batch(items, ask, concurrency=5)]
+        
+        assert order == [f"msg{i}" for i in range(5)]
+    
+    @pytest.mark.asyncio
+    async def test_item_errors_do_not_fail_batch(self):
+        """Testa que erros por item são reportados sem derrubar o lote"""
+        async def ask(item):
+            if item.message == "ruim":
+                raise ValueError("Mensagem rejeitada")
+            if item.message == "quebra":
+                raise RuntimeError("falha inesperada")
+            return "ok", "sessao"
+        
+        items = [ChatRequest(message=m) for m in ("bom", "ruim", "quebra")]
+        results = sorted([r async for r in run_batch(items, ask, concurrency=2)], key=lambda r: r["index"])
+        
+        assert results[0]["reply"] == "ok"
+        assert results[1]["error"] == "Mensagem rejeitada"
+        assert results[2]["error"] == "Erro interno do servidor"
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -3,7 +3,7 @@ Testes unitários para o chat_engine
 Mockando chamadas à OpenAI API
 """
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import sys
 import os
 
@@ -15,8 +15,10 @@ from chat_engine import (
     moderate_message,
     generate_session_id,
     truncate_history,
+    window_history_by_tokens,
     postprocess_response
 )
+from tests.helpers import mock_completion
 
 class TestPreprocessing:
     """Testes de pré-processamento de mensagens"""
@@ -100,6 +102,43 @@ class TestHistoryManagement:
         # Deve manter as últimas mensagens
         assert result[0]["content"] == "msg20"
         assert result[-1]["content"] == "msg29"
+    
+    def test_window_by_tokens_keeps_recent_messages_within_budget(self):
+        """Testa que a janela por tokens mantém as mensagens mais recentes que cabem no orçamento"""
+        entries = [
+            ({"role": "user", "content": "msg0"}, 500),
+            ({"role": "assistant", "content": "reply0"}, 500),
+            ({"role": "user", "content": "msg1"}, 10),
+            ({"role": "assistant", "content": "reply1"}, 10),
+        ]
+        result = window_history_by_tokens(entries, max_tokens=100)
+        assert [m["content"] for m in result] == ["msg1", "reply1"]
+    
+    def test_window_by_tokens_starts_with_user_message(self):
+        """Testa que a janela não começa com uma resposta órfã do assistente"""
+        entries = [
+            ({"role": "user", "content": "msg0"}, 50),
+            ({"role": "assistant", "content": "reply0"}, 10),
+            ({"role": "user", "content": "msg1"}, 10),
+            ({"role": "assistant", "content": "reply1"}, 10),
+        ]
+        result = window_history_by_tokens(entries, max_tokens=35)
+        assert [m["content"] for m in result] == ["msg1", "reply1"]
+    
+    def test_token_mode_keeps_more_than_max_history_messages(self):
+        """Testa que no modo tokens conversas curtas não são cortadas em MAX_HISTORY_MESSAGES"""
+        from chat_engine import create_session_store, get_prompt_history, MAX_HISTORY_MESSAGES
+        
+        with patch('chat_engine.HISTORY_WINDOW_MODE', 'tokens'), patch('chat_engine.MAX_STORED_MESSAGES', 100):
+            store = create_session_store("memory")
+            with patch('chat_engine.session_store', store):
+                store.get_or_create("curta")
+                for i in range(MAX_HISTORY_MESSAGES):
+                    store.append("curta", [{"role": "user", "content": f"oi {i}"}, {"role": "assistant", "content": "oi"}], [3, 2])
+                history = get_prompt_history("curta", "e agora?")
+        
+        assert store.max_messages == 100
+        assert len(history) == 2 * MAX_HISTORY_MESSAGES
 
 class TestPostprocessing:
     """Testes de pós-processamento de respostas"""
@@ -204,6 +243,178 @@ class TestIntegration:
             assert reply == expected_response
             assert session_id is not None
 
+class TestAsyncChatEngine:
+    """Testes do caminho assíncrono do chat engine"""
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.async_client')
+    async def test_ask_bot_async_returns_response_and_session_id(self, mock_async_client):
+        """Testa que ask_bot_async retorna resposta e session_id"""
+        mock_async_client.chat.completions.create = AsyncMock(
+            return_value=mock_completion("Olá, eu sou Rick Sanchez.")
+        )
+        
+        from chat_engine import ask_bot_async
+        
+        reply, session_id = await ask_bot_async("Olá Rick")
+        
+        assert reply == "Olá, eu sou Rick Sanchez."
+        assert len(session_id) == 36
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.async_client')
+    async def test_sqlite_store_runs_outside_event_loop(self, mock_async_client, tmp_path):
+        """Testa que as chamadas ao SQLite não rodam na thread do event loop"""
+        import threading
+        from session_store import SQLiteSessionStore
+        
+        mock_async_client.chat.completions.create = AsyncMock(return_value=mock_completion("Oi."))
+        store = SQLiteSessionStore(path=str(tmp_path / "sessions.db"), max_sessions=10, ttl_seconds=60, max_messages=4)
+        threads = set()
+        original_append = store.append
+        
+        def append(*args):
+            threads.add(threading.get_ident())
+            original_append(*args)
+        
+        from chat_engine import ask_bot_async, run_store_call
+        
+        with patch('chat_engine.session_store', store), patch.object(store, 'append', side_effect=append):
+            reply, session_id = await ask_bot_async("Olá Rick")
+            history = await run_store_call(store.get_history, session_id)
+        store.close()
+        
+        assert reply == "Oi."
+        assert threads and threading.get_ident() not in threads
+        assert [message["role"] for message in history] == ["user", "assistant"]
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.async_client')
+    async def test_ask_bot_async_maintains_history(self, mock_async_client):
+        """Testa que ask_bot_async grava o turno no histórico da sessão"""
+        mock_async_client.chat.completions.create = AsyncMock(
+            return_value=mock_completion("Resposta do Rick")
+        )
+        
+        from chat_engine import ask_bot_async, get_conversation_history
+        
+        _, session_id = await ask_bot_async("Mensagem 1")
+        await ask_bot_async("Mensagem 2", session_id=session_id)
+        
+        history = get_conversation_history(session_id)
+        assert [m["content"] for m in history] == [
+            "Mensagem 1", "Resposta do Rick", "Mensagem 2", "Resposta do Rick"
+        ]
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.async_client')
+    async def test_ask_bot_async_refinement_makes_two_calls(self, mock_async_client):
+        """Testa que o modo de refinamento faz rascunho e refinamento"""
+        mock_async_client.chat.completions.create = AsyncMock(side_effect=[
+            mock_completion("Rascunho"),
+            mock_completion("Resposta refinada")
+        ])
+        
+        from chat_engine import ask_bot_async
+        
+        reply, _ = await ask_bot_async("Olá Rick", use_refinement=True)
+        
+        assert reply == "Resposta refinada"
+        assert mock_async_client.chat.completions.create.await_count == 2
+
+class TestStreamingChatEngine:
+    """Testes do caminho de streaming do chat engine"""
+    
+    @staticmethod
+    def _mock_stream(deltas):
+        async def stream():
+            for delta in deltas:
+                chunk = MagicMock()
+                chunk.choices = [MagicMock()]
+                chunk.choices[0].delta.content = delta
+                yield chunk
+        return stream()
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.async_client')
+    async def test_ask_bot_stream_yields_deltas_and_final_reply(self, mock_async_client):
+        """Testa que o streaming emite deltas e a resposta final pós-processada"""
+        mock_async_client.chat.completions.create = AsyncMock(
+            return_value=self._mock_stream(["Olá,  ", "eu sou ", "Rick. "])
+        )
+        
+        from chat_engine import ask_bot_stream, get_conversation_history
+        
+        session_id, events = await ask_bot_stream("Olá Rick")
+        collected = [event async for event in events]
+        
+        assert collected[:-1] == [("delta", "Olá,  "), ("delta", "eu sou "), ("delta", "Rick. ")]
+        assert collected[-1] == ("done", "Olá, eu sou Rick.")
+        assert get_conversation_history(session_id)[-1]["content"] == "Olá, eu sou Rick."
+    
+    @pytest.mark.asyncio
+    async def test_ask_bot_stream_validates_before_streaming(self):
+        """Testa que mensagem inválida falha antes de abrir o stream"""
+        from chat_engine import ask_bot_stream
+        
+        with pytest.raises(ValueError):
+            await ask_bot_stream("   ")
+
+class TestResponseCacheIntegration:
+    """Testes do cache de respostas no chat engine"""
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.RESPONSE_CACHE_ENABLED', True)
+    @patch('chat_engine.async_client')
+    async def test_first_turn_is_served_from_cache(self, mock_async_client):
+        """Testa que a mesma pergunta de abertura não chama a API de novo"""
+        mock_async_client.chat.completions.create = AsyncMock(
+            return_value=mock_completion("É 4. Quatro.")
+        )
+        
+        from chat_engine import ask_bot_async, response_cache
+        response_cache.clear()
+        
+        reply1, _ = await ask_bot_async("Quanto é 2+2?")
+        reply2, session_id = await ask_bot_async("quanto é   2+2?")
+        
+        assert reply1 == reply2 == "É 4. Quatro."
+        assert mock_async_client.chat.completions.create.await_count == 1
+        assert response_cache.stats()["hits"] == 1
+        response_cache.clear()
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.RESPONSE_CACHE_ENABLED', True)
+    @patch('chat_engine.async_client')
+    async def test_cache_can_be_bypassed_per_request(self, mock_async_client):
+        """Testa que use_cache=False força nova chamada à API"""
+        mock_async_client.chat.completions.create = AsyncMock(
+            return_value=mock_completion("É 4. Quatro.")
+        )
+        
+        from chat_engine import ask_bot_async, response_cache
+        response_cache.clear()
+        
+        await ask_bot_async("Quanto é 2+2?")
+        await ask_bot_async("Quanto é 2+2?", use_cache=False)
+        
+        assert mock_async_client.chat.completions.create.await_count == 2
+        response_cache.clear()
+    
+    @patch('chat_engine.RESPONSE_CACHE_ENABLED', True)
+    def test_explicit_backend_is_part_of_cache_key(self):
+        """Testa que a resposta de um backend escolhido não é servida ao backend padrão"""
+        from chat_engine import build_messages, get_cached_response, store_cached_response, personas, response_cache
+        response_cache.clear()
+        
+        persona = personas.get()
+        messages = build_messages([], "Quanto é 2+2?")
+        store_cached_response(messages, "Resposta do modelo barato", persona, "reserva")
+        
+        assert get_cached_response(messages, persona) is None
+        assert get_cached_response(messages, persona, "reserva") == "Resposta do modelo barato"
+        response_cache.clear()
+
 if __name__ == "__main__":
     # Rodar testes
     pytest.main([__file__, "-v"])
@@ -0,0 +1,194 @@
+"""
+Testes unitários para requisições duplicadas (hedging) e orçamento de refinamento
+"""
+import asyncio
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from hedging import LatencyTracker, HedgePolicy, hedged_call
+from tests.helpers import mock_completion
+
+def make_policy(delay):
+    return HedgePolicy(tracker=LatencyTracker(), quantile=0.95, min_samples=5, default_delay_seconds=delay)
+
+class TestLatencyTracker:
+    """Testes do LatencyTracker"""
+    
+    def test_percentile_of_recorded_samples(self):
+        """Testa o cálculo do percentil sobre a janela de amostras"""
+        tracker = LatencyTracker(window=100)
+        for i in range(1, 101):
+            tracker.record(i / 100)
+        
+        assert tracker.percentile(0.5) == pytest.approx(0.51)
+        assert tracker.percentile(0.95) == pytest.approx(0.96)
+    
+    def test_window_keeps_only_recent_samples(self):
+        """Testa que amostras antigas saem da janela"""
+        tracker = LatencyTracker(window=3)
+        for value in (10.0, 0.1, 0.2, 0.3):
+            tracker.record(value)
+        
+        assert len(tracker) == 3
+        assert tracker.percentile(1.0) == 0.3
+    
+    def test_policy_uses_default_until_enough_samples(self):
+        """Testa que o atraso padrão é usado até haver amostras suficientes"""
+        policy = make_policy(2.0)
+        for _ in range(4):
+            policy.tracker.record(0.1)
+        assert policy.delay() == 2.0
+        
+        policy.tracker.record(0.1)
+        assert policy.delay() == pytest.approx(0.1)
+
+class TestHedgedCall:
+    """Testes do hedged_call"""
+    
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        """Testa que uma resposta rápida não dispara a requisição duplicada"""
+        policy = make_policy(0.5)
+        calls = 0
+        
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            return "resposta"
+        
+        result, winner = await hedged_call(fetch, policy)
+        
+        assert (result, winner) == ("resposta", "primary")
+        assert calls == 1
+        assert policy.hedged == 0
+    
+    @pytest.mark.asyncio
+    async def test_slow_primary_loses_to_hedge_and_is_cancelled(self):
+        """Testa que a duplicada vence uma primária lenta e a perdedora é cancelada"""
+        policy = make_policy(0.01)
+        cancelled = asyncio.Event()
+        calls = 0
+        
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+                return "lenta"
+            return "rápida"
+        
+        result, winner = await hedged_call(fetch, policy)
+        await asyncio.sleep(0)
+        
+        assert (result, winner) == ("rápida", "hedge")
+        assert cancelled.is_set()
+        assert policy.stats()["wins"] == {"primary": 0, "hedge": 1}
+    
+    @pytest.mark.asyncio
+    async def test_failed_primary_falls_back_to_hedge(self):
+        """Testa que uma falha da primária após o atraso é coberta pela duplicada"""
+        policy = make_policy(0.01)
+        calls = 0
+        
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                await asyncio.sleep(0.02)
+                raise RuntimeError("falhou")
+            await asyncio.sleep(0.05)
+            return "ok"
+        
+        result, winner = await hedged_call(fetch, policy)
+        
+        assert (result, winner) == ("ok", "hedge")
+    
+    @pytest.mark.asyncio
+    async def test_error_raised_when_both_fail(self):
+        """Testa que o erro é propagado quando as duas requisições falham"""
+        policy = make_policy(0.01)
+        
+        async def fetch():
+            await asyncio.sleep(0.02)
+            raise RuntimeError("falhou")
+        
+        with pytest.raises(RuntimeError):
+            await hedged_call(fetch, policy)
+
+class TestRefinementBudget:
+    """Testes do orçamento de latência do refinamento"""
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.REFINEMENT_BUDGET_SECONDS', 0.05)
+    @patch('chat_engine.async_client')
+    async def test_slow_refinement_returns_draft(self, mock_async_client):
+        """Testa que o rascunho é usado quando o refinamento estoura o orçamento"""
+        draft = mock_completion("Rascunho do Rick")
+        
+        async def create(**kwargs):
+            if kwargs["temperature"] == 0.7:
+                await asyncio.sleep(1)
+                return mock_completion("Resposta refinada")
+            return draft
+        
+        mock_async_client.chat.completions.create = AsyncMock(side_effect=create)
+        
+        from chat_engine import ask_bot_async
+        
+        reply, _ = await ask_bot_async("Olá Rick", use_refinement=True)
+        
+        assert reply == "Rascunho do Rick"
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.async_client')
+    async def test_refinement_within_budget_is_used(self, mock_async_client):
+        """Testa que o refinamento é usado quando termina dentro do orçamento"""
+        mock_async_client.chat.completions.create = AsyncMock(side_effect=[
+            mock_completion("Rascunho do Rick"),
+            mock_completion("Resposta refinada"),
+        ])
+        
+        from chat_engine import ask_bot_async
+        
+        reply, _ = await ask_bot_async("Olá Rick", use_refinement=True)
+        
+        assert reply == "Resposta refinada"
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.async_client')
+    async def test_stream_replaces_draft_with_refinement(self, mock_async_client):
+        """Testa que o streaming emite o rascunho e depois a versão refinada"""
+        async def chunks():
+            for text in ("Rascunho ", "do Rick"):
+                chunk = MagicMock()
+                chunk.choices = [MagicMock()]
+                chunk.choices[0].delta.content = text
+                yield chunk
+        
+        async def create(**kwargs):
+            if kwargs.get("stream"):
+                return chunks()
+            return mock_completion("Resposta refinada")
+        
+        mock_async_client.chat.completions.create = AsyncMock(side_effect=create)
+        
+        from chat_engine import ask_bot_stream
+        
+        _, events = await ask_bot_stream("Olá Rick", use_refinement=True)
+        collected = [event async for event in events]
+        
+        assert collected[:2] == [("delta", "Rascunho "), ("delta", "do Rick")]
+        assert collected[2] == ("replace", "Resposta refinada")
+        assert collected[-1] == ("done", "Resposta refinada")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,143 @@
+"""
+Testes unitários para o logging estruturado, em segundo plano e com amostragem
+"""
+import json
+import queue
+import logging
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from logging_setup import BackgroundQueueHandler, configure_logging, stop_logging
+from request_context import bind_context, bind_session, add_timing, add_tokens
+
+logger = logging.getLogger("teste.logging")
+
+class CountingStr:
+    def __init__(self):
+        self.calls = 0
+    
+    def __str__(self):
+        self.calls += 1
+        return "formatado"
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    yield
+    configure_logging()
+
+def json_lines(text):
+    return [json.loads(line) for line in text.strip().splitlines() if line.startswith("{")]
+
+class TestJsonLogging:
+    """Testes do formato JSON com o contexto da requisição"""
+    
+    def test_json_includes_request_context(self, capsys):
+        """Testa que request_id, sessão, tempos e tokens vão para o log"""
+        configure_logging(log_format="json", background=True)
+        
+        def handle_request():
+            context = bind_context("req-123")
+            bind_session("sessao-1")
+            add_timing("upstream", 0.25)
+            add_tokens(42)
+            logger.info("Resposta gerada para sessão: %s", "sessao-1")
+            return context
+        
+        import contextvars
+        contextvars.copy_context().run(handle_request)
+        logger.warning("Fora de uma requisição")
+        stop_logging()
+        
+        entries = json_lines(capsys.readouterr().err)
+        request_entry = next(entry for entry in entries if entry["logger"] == "teste.logging" and entry["level"] == "INFO")
+        outside = next(entry for entry in entries if entry["level"] == "WARNING")
+        
+        assert request_entry["message"] == "Resposta gerada para sessão: sessao-1"
+        assert request_entry["request_id"] == "req-123"
+        assert request_entry["session_id"] == "sessao-1"
+        assert request_entry["timings_ms"] == {"upstream": 250.0}
+        assert request_entry["tokens"] == 42
+        assert "request_id" not in outside
+    
+    def test_exception_is_serialized(self, capsys):
+        """Testa que o traceback vai em um campo do JSON"""
+        configure_logging(log_format="json")
+        
+        try:
+            raise RuntimeError("falhou")
+        except RuntimeError:
+            logger.error("Erro interno: %s", "falhou", exc_info=True)
+        
+        entry = json_lines(capsys.readouterr().err)[-1]
+        assert entry["level"] == "ERROR"
+        assert "RuntimeError: falhou" in entry["exc"]
+
+class TestSamplingAndQueue:
+    """Testes da amostragem e da fila em segundo plano"""
+    
+    def test_sampling_drops_request_info_but_keeps_warnings(self, capsys):
+        """Testa que a amostragem descarta infos de requisição e mantém avisos e logs sem requisição"""
+        state = configure_logging(log_format="json", sample_rate=0.0)
+        
+        def handle_request():
+            bind_context()
+            logger.info("info amostrada")
+            logger.warning("aviso mantido")
+        
+        import contextvars
+        contextvars.copy_context().run(handle_request)
+        logger.info("info de inicialização")
+        
+        messages = [entry["message"] for entry in json_lines(capsys.readouterr().err)]
+        assert messages == ["aviso mantido", "info de inicialização"]
+        assert state.stats()["dropped_sampling"] == 1
+    
+    def test_queue_handler_defers_formatting(self):
+        """Testa que a mensagem não é formatada na thread de quem loga"""
+        handler = BackgroundQueueHandler(queue.Queue(maxsize=1))
+        value = CountingStr()
+        
+        handler.handle(logger.makeRecord("teste.logging", logging.INFO, __file__, 1, "valor %s", (value,), None))
+        handler.handle(logger.makeRecord("teste.logging", logging.INFO, __file__, 1, "cheia", (), None))
+        
+        record = handler.queue.get_nowait()
+        assert value.calls == 0
+        assert record.args == (value,)
+        assert record.getMessage() == "valor formatado"
+        assert handler.dropped == 1
+    
+    def test_full_queue_does_not_block_on_warnings(self):
+        """Testa que um aviso com a fila cheia espera pouco e é descartado em vez de travar quem loga"""
+        import time
+        
+        handler = BackgroundQueueHandler(queue.Queue(maxsize=1), full_timeout_seconds=0.05)
+        handler.handle(logger.makeRecord("teste.logging", logging.INFO, __file__, 1, "ocupa a fila", (), None))
+        
+        started = time.monotonic()
+        handler.handle(logger.makeRecord("teste.logging", logging.ERROR, __file__, 1, "erro", (), None))
+        
+        assert time.monotonic() - started < 1
+        assert handler.dropped == 1
+
+class TestRequestId:
+    """Testes do cabeçalho X-Request-ID"""
+    
+    def test_request_id_is_echoed_or_generated(self):
+        """Testa que um ID válido é repassado e um inválido é substituído"""
+        from app import app
+        
+        client = TestClient(app)
+        
+        echoed = client.get("/health", headers={"X-Request-ID": "abc-123"})
+        replaced = client.get("/health", headers={"X-Request-ID": "id com espacos"})
+        
+        assert echoed.headers["x-request-id"] == "abc-123"
+        assert len(replaced.headers["x-request-id"]) == 32
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,105 @@
+"""
+Testes das métricas Prometheus e do endpoint /metrics
+"""
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from metrics import registry, record_stage, record_usage, record_error
+
+def sample(name, labels=None):
+    return registry.get_sample_value(name, labels or {}) or 0
+
+class TestMetricHelpers:
+    """Testes das funções de instrumentação"""
+    
+    def test_record_stage_observes_and_returns_now(self):
+        """Testa que a etapa é observada e o instante atual é devolvido para encadear"""
+        before = sample("chatbot_stage_seconds_count", {"stage": "moderate"})
+        
+        now = record_stage("moderate", 0.0)
+        
+        assert now > 0
+        assert sample("chatbot_stage_seconds_count", {"stage": "moderate"}) == before + 1
+    
+    def test_record_usage_counts_prompt_and_completion(self):
+        """Testa a contagem de tokens de prompt e de resposta por modelo"""
+        usage = MagicMock(prompt_tokens=12, completion_tokens=30)
+        
+        record_usage("modelo-teste", usage)
+        
+        assert sample("chatbot_tokens_total", {"model": "modelo-teste", "kind": "prompt"}) == 12
+        assert sample("chatbot_tokens_total", {"model": "modelo-teste", "kind": "completion"}) == 30
+    
+    def test_record_usage_ignores_missing_usage(self):
+        """Testa que respostas sem uso informado (servidores compatíveis) são ignoradas"""
+        record_usage("modelo-sem-uso", None)
+        record_usage("modelo-sem-uso", MagicMock())
+        
+        assert sample("chatbot_tokens_total", {"model": "modelo-sem-uso", "kind": "prompt"}) == 0
+    
+    def test_record_error_by_type(self):
+        """Testa o contador de erros por tipo"""
+        before = sample("chatbot_errors_total", {"type": "upstream"})
+        
+        record_error("upstream")
+        
+        assert sample("chatbot_errors_total", {"type": "upstream"}) == before + 1
+
+class TestMetricsEndpoint:
+    """Testes do endpoint /metrics"""
+    
+    @patch('chat_engine.async_client')
+    def test_chat_request_is_exported(self, mock_async_client):
+        """Testa que uma conversa aparece nas métricas de etapas, tokens e sessões"""
+        from app import app
+        
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "Resposta do Rick"
+        mock_response.usage = MagicMock(prompt_tokens=50, completion_tokens=10, total_tokens=60)
+        mock_async_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        client = TestClient(app)
+        
+        assert client.post("/api/chat", json={"message": "Olá Rick"}).status_code == 200
+        response = client.get("/metrics")
+        body = response.text
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        for stage in ("preprocess", "moderate", "history", "upstream", "postprocess"):
+            assert f'chatbot_stage_seconds_count{{stage="{stage}"}}' in body
+        assert 'chatbot_tokens_total{kind="prompt",model="gpt-4o-mini"}' in body
+        assert "chatbot_active_sessions" in body
+        assert "chatbot_in_flight_requests 0.0" in body
+        assert 'chatbot_cache_hits_total{cache="exact"}' in body
+        assert 'chatbot_sessions_evicted_total{reason="lru"}' in body
+        assert 'chatbot_sessions_evicted_total{reason="ttl"}' in body
+    
+    def test_session_stats_endpoint(self):
+        """Testa que os contadores de remoção de sessões ficam visíveis na API"""
+        from app import app
+        
+        stats = TestClient(app).get("/api/sessions/stats").json()
+        
+        assert {"active_sessions", "max_sessions", "evicted_lru", "evicted_ttl"} <= set(stats)
+    
+    def test_validation_errors_are_counted(self):
+        """Testa que mensagens rejeitadas contam como erro de validação"""
+        from app import app
+        
+        client = TestClient(app)
+        before = sample("chatbot_errors_total", {"type": "validation"})
+        
+        response = client.post("/api/chat", json={"message": "palavra_banida_exemplo"})
+        
+        assert response.status_code == 400
+        assert sample("chatbot_errors_total", {"type": "validation"}) == before + 1
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
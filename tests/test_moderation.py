@@ -0,0 +1,141 @@
+"""
+Testes unitários para a moderação por lista de termos banidos
+"""
+import os
+import sys
+import threading
+import pytest
+from unittest.mock import patch
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import moderation
+from moderation import TermAutomaton, BannedTermsFilter, fold
+
+class TestFold:
+    """Testes da normalização de acentos e caixa"""
+
+    def test_fold_removes_accents_and_case(self):
+        """Testa que variações com acento e maiúsculas viram a mesma forma"""
+        assert fold("CORAÇÃO") == fold("coracao") == "coracao"
+        assert fold("Pão de Açúcar") == "pao de acucar"
+
+    def test_fold_ascii_fast_path(self):
+        """Testa o caminho rápido para texto ASCII"""
+        assert fold("Rick SANCHEZ") == "rick sanchez"
+
+class TestTermAutomaton:
+    """Testes do autômato Aho-Corasick"""
+
+    def test_finds_term_anywhere_in_text(self):
+        """Testa que o termo é encontrado em qualquer posição"""
+        automaton = TermAutomaton(["palavra_banida_exemplo"])
+
+        assert automaton.find("isso tem palavra_banida_exemplo no meio") == "palavra_banida_exemplo"
+        assert automaton.find("palavra_banida_exemplo") == "palavra_banida_exemplo"
+
+    def test_respects_word_boundaries(self):
+        """Testa que termos dentro de outras palavras não são bloqueados"""
+        automaton = TermAutomaton(["ana"])
+
+        assert automaton.find("banana") is None
+        assert automaton.find("a ana chegou") == "ana"
+        assert automaton.find("ana, tudo bem?") == "ana"
+
+    def test_overlapping_terms(self):
+        """Testa termos sobrepostos que dependem dos links de falha"""
+        automaton = TermAutomaton(["he", "she", "hers", "his"])
+
+        assert automaton.find("ushers") is None
+        assert automaton.find("a frase dela: she") == "she"
+        assert automaton.find("isso é hers") == "hers"
+
+    def test_multi_word_terms_are_folded(self):
+        """Testa termos com várias palavras, acentos e espaços extras"""
+        automaton = TermAutomaton(["  Coração   Partido "])
+
+        assert automaton.find(fold("Meu CORACAO partido")) == "coracao partido"
+
+    def test_large_term_list(self):
+        """Testa o autômato com milhares de termos"""
+        terms = [f"termo{i}" for i in range(5000)]
+        automaton = TermAutomaton(terms)
+
+        assert len(automaton) == 5000
+        assert automaton.find("texto com termo4321 aqui") == "termo4321"
+        assert automaton.find("texto com termo50000 aqui") is None
+
+class TestBannedTermsFilter:
+    """Testes do filtro com recarga do arquivo"""
+
+    def test_loads_terms_and_ignores_comments(self, tmp_path):
+        """Testa o carregamento do arquivo ignorando comentários e linhas vazias"""
+        path = tmp_path / "banned.txt"
+        path.write_text("# comentário\n\nproibido\n", encoding="utf-8")
+
+        terms = BannedTermsFilter(str(path))
+
+        assert len(terms) == 1
+        assert terms.find("isso é PROIBIDO") == "proibido"
+        assert terms.find("comentário") is None
+
+    def test_hot_reload_on_file_change(self, tmp_path):
+        """Testa que alterações no arquivo valem sem reiniciar, recarregadas em segundo plano"""
+        path = tmp_path / "banned.txt"
+        path.write_text("proibido\n", encoding="utf-8")
+        terms = BannedTermsFilter(str(path), reload_interval_seconds=0)
+
+        path.write_text("proibido\nvetado\n", encoding="utf-8")
+        terms.find("isso foi vetado")
+        terms.join(timeout=5)
+
+        assert terms.find("isso foi vetado") == "vetado"
+        assert terms.reloads == 2
+
+    def test_find_does_not_wait_for_reload(self, tmp_path):
+        """Testa que a busca usa o autômato antigo enquanto o novo é montado"""
+        path = tmp_path / "banned.txt"
+        path.write_text("proibido\n", encoding="utf-8")
+        terms = BannedTermsFilter(str(path), reload_interval_seconds=0)
+        release = threading.Event()
+        original = moderation.TermAutomaton
+
+        def slow_automaton(new_terms):
+            release.wait(5)
+            return original(new_terms)
+
+        path.write_text("vetado\n", encoding="utf-8")
+        with patch('moderation.TermAutomaton', side_effect=slow_automaton):
+            assert terms.find("proibido e vetado") == "proibido"
+            release.set()
+            terms.join(timeout=5)
+
+        assert terms.find("proibido e vetado") == "vetado"
+
+    def test_missing_file_allows_everything(self, tmp_path):
+        """Testa que a ausência do arquivo não bloqueia mensagens"""
+        terms = BannedTermsFilter(str(tmp_path / "inexistente.txt"))
+
+        assert terms.find("qualquer coisa") is None
+
+class TestModerationIntegration:
+    """Testes da moderação no chat engine"""
+
+    def test_default_banned_term_is_rejected(self):
+        """Testa que o termo de exemplo do arquivo padrão é bloqueado com variações"""
+        from chat_engine import moderate_message
+
+        is_safe, reason = moderate_message("Isso é PALAVRA_BANIDA_EXEMPLO!")
+
+        assert is_safe is False
+        assert reason == "Mensagem contém conteúdo inapropriado"
+
+    def test_preprocess_removes_control_characters(self):
+        """Testa a remoção de caracteres de controle no pré-processamento"""
+        from chat_engine import preprocess_message
+
+        assert preprocess_message("Olá\x00 Rick\x07\tcomo\x0bvai?") == "Olá Rick como vai?"
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
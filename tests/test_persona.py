@@ -0,0 +1,159 @@
+"""
+Testes unitários para o registro de personas
+"""
+import json
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from persona import Persona, PersonaRegistry, SystemMessage, SYSTEM_PROMPT
+from tests.helpers import mock_reply
+
+DEFAULTS = {"model": "gpt-4o-mini", "temperature": 0.8, "max_tokens": 500}
+
+def write_persona(directory, filename, **entry):
+    path = directory / filename
+    path.write_text(json.dumps(entry), encoding="utf-8")
+    return path
+
+class TestPersona:
+    """Testes do prefixo pré-montado da persona"""
+    
+    def test_prefix_is_immutable_system_message(self):
+        """Testa que a mensagem de sistema é imutável e serializa como um dict comum"""
+        persona = Persona("rick", "Rick Sanchez", SYSTEM_PROMPT)
+        message = persona.prefix[0]
+        
+        assert message == {"role": "system", "content": SYSTEM_PROMPT}
+        assert json.loads(json.dumps(message)) == {"role": "system", "content": SYSTEM_PROMPT}
+        with pytest.raises(TypeError):
+            message["content"] = "outra coisa"
+        with pytest.raises(TypeError):
+            message.update(content="outra coisa")
+    
+    def test_prefix_tokens_are_precomputed(self):
+        """Testa que os tokens do prefixo são contados na criação"""
+        persona = Persona("rick", "Rick Sanchez", SYSTEM_PROMPT)
+        
+        assert persona.prefix_tokens > 0
+        assert isinstance(persona.prefix[0], SystemMessage)
+
+class TestPersonaRegistry:
+    """Testes do carregamento de personas a partir de arquivos"""
+    
+    def test_loads_personas_from_directory(self, tmp_path):
+        """Testa o carregamento de arquivos JSON com configurações próprias"""
+        write_persona(tmp_path, "morty.json", id="morty", name="Morty", system_prompt="Você é o Morty.", model="modelo-morty", temperature=0.5, max_tokens=100)
+        (tmp_path / "morty.txt").write_text("Você é a Summer.\n", encoding="utf-8")
+        write_persona(tmp_path, "summer.json", id="summer", system_prompt_file="morty.txt")
+        registry = PersonaRegistry(Persona("rick", "Rick", SYSTEM_PROMPT))
+        
+        assert registry.load_directory(str(tmp_path), DEFAULTS) == 2
+        
+        morty = registry.get("morty")
+        summer = registry.get("summer")
+        assert (morty.model, morty.temperature, morty.max_tokens) == ("modelo-morty", 0.5, 100)
+        assert summer.system_prompt == "Você é a Summer."
+        assert (summer.model, summer.temperature, summer.max_tokens) == (None, 0.8, 500)
+        assert registry.get().id == "rick"
+    
+    def test_unknown_and_duplicate_personas(self, tmp_path):
+        """Testa os erros de persona desconhecida, duplicada ou sem prompt"""
+        registry = PersonaRegistry(Persona("rick", "Rick", SYSTEM_PROMPT))
+        
+        with pytest.raises(ValueError, match="Persona desconhecida"):
+            registry.get("jerry")
+        
+        write_persona(tmp_path, "rick.json", id="rick", system_prompt="Outro Rick")
+        with pytest.raises(ValueError, match="Persona duplicada"):
+            registry.load_directory(str(tmp_path), DEFAULTS)
+        
+        empty = tmp_path / "vazia"
+        empty.mkdir()
+        write_persona(empty, "jerry.json", id="jerry")
+        with pytest.raises(ValueError, match="system_prompt"):
+            registry.load_directory(str(empty), DEFAULTS)
+    
+    def test_missing_directory_loads_nothing(self, tmp_path):
+        """Testa que a ausência do diretório mantém apenas a persona padrão"""
+        registry = PersonaRegistry(Persona("rick", "Rick", SYSTEM_PROMPT))
+        
+        assert registry.load_directory(str(tmp_path / "inexistente"), DEFAULTS) == 0
+        assert len(registry) == 1
+
+class TestPersonaIntegration:
+    """Testes das personas no chat engine e na API"""
+    
+    def test_build_messages_reuses_shared_prefix(self):
+        """Testa que o prefixo é o mesmo objeto em todas as requisições"""
+        from chat_engine import build_messages, personas
+        
+        first = build_messages([], "oi")
+        second = build_messages([], "tchau", persona=personas.get("morty"))
+        third = build_messages([], "oi de novo", persona=personas.get("morty"))
+        
+        assert first[0] is personas.get().prefix[0]
+        assert second[0] is third[0] is personas.get("morty").prefix[0]
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.async_client')
+    async def test_request_uses_persona_settings(self, mock_async_client):
+        """Testa que a persona escolhida define prompt, temperatura e max_tokens"""
+        from chat_engine import ask_bot_async, personas
+        
+        mock_reply(mock_async_client, "E-eu não sei, Rick!")
+        morty = personas.get("morty")
+        
+        reply, _ = await ask_bot_async("Quem é você?", use_cache=False, persona_id="morty")
+        kwargs = mock_async_client.chat.completions.create.call_args.kwargs
+        
+        assert reply == "E-eu não sei, Rick!"
+        assert kwargs["messages"][0]["content"] == morty.system_prompt
+        assert kwargs["temperature"] == morty.temperature
+        assert kwargs["max_tokens"] == morty.max_tokens
+    
+    def test_refinement_and_summary_use_persona_name(self):
+        """Testa que refinamento e resumo falam da persona da conversa, não sempre do Rick"""
+        from chat_engine import build_refinement_messages, build_summary_messages, personas
+        
+        morty = personas.get("morty")
+        refinement = build_refinement_messages([], "rascunho", morty)
+        summary = build_summary_messages(None, [{"role": "assistant", "content": "E-eu acho que sim"}], morty.name)
+        
+        assert "Morty Smith" in refinement[-1]["content"] and "Rick" not in refinement[-1]["content"]
+        assert "Morty Smith: E-eu acho que sim" in summary[-1]["content"]
+    
+    def test_history_tokens_use_persona_model(self):
+        """Testa que a contagem de tokens do histórico usa o modelo da persona"""
+        from chat_engine import add_to_history, generate_session_id, session_store
+        
+        persona = Persona("outro", "Outro", "Prompt", model="modelo-da-persona")
+        session_id = generate_session_id()
+        session_store.get_or_create(session_id)
+        
+        with patch('chat_engine.count_tokens', return_value=3) as count_tokens:
+            add_to_history(session_id, "oi", "olá", persona)
+        
+        assert {call.args[1] for call in count_tokens.call_args_list} == {"modelo-da-persona"}
+    
+    def test_api_lists_personas_and_rejects_unknown(self):
+        """Testa a listagem de personas e o erro para persona desconhecida"""
+        from app import app
+        
+        client = TestClient(app)
+        
+        listing = client.get("/api/personas").json()["personas"]
+        response = client.post("/api/chat", json={"message": "Olá", "persona_id": "jerry"})
+        
+        assert {persona["id"] for persona in listing} >= {"rick", "morty"}
+        assert [persona["id"] for persona in listing if persona["default"]] == ["rick"]
+        assert response.status_code == 400
+        assert "Persona desconhecida" in response.json()["detail"]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
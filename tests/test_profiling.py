@@ -0,0 +1,159 @@
+"""
+Testes do cabeçalho Server-Timing e do modo de profiling
+"""
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from profiling import RequestProfiler
+from request_context import format_server_timing
+from tests.helpers import mock_reply
+
+def parse_server_timing(header):
+    timings = {}
+    for part in header.split(","):
+        name, duration = part.strip().split(";dur=")
+        timings[name] = float(duration)
+    return timings
+
+class TestServerTiming:
+    """Testes do cabeçalho Server-Timing"""
+    
+    def test_format_in_milliseconds(self):
+        """Testa a formatação das etapas em milissegundos"""
+        header = format_server_timing({"moderate": 0.0012, "upstream": 0.5}, 0.6)
+        
+        assert header == "moderate;dur=1.20, upstream;dur=500.00, total;dur=600.00"
+    
+    @patch('chat_engine.async_client')
+    def test_chat_response_has_stage_breakdown(self, mock_async_client):
+        """Testa que a resposta do chat traz a duração de cada etapa"""
+        from app import app
+        
+        mock_reply(mock_async_client)
+        client = TestClient(app)
+        
+        response = client.post("/api/chat", json={"message": "Olá Rick", "use_cache": False})
+        timings = parse_server_timing(response.headers["Server-Timing"])
+        
+        assert response.status_code == 200
+        for stage in ("queue", "preprocess", "moderate", "history", "upstream", "postprocess", "total"):
+            assert stage in timings
+        assert timings["total"] >= timings["upstream"]
+    
+    def test_requests_without_stages_only_have_total(self):
+        """Testa que rotas sem etapas do chat informam apenas o total"""
+        from app import app
+        
+        client = TestClient(app)
+        response = client.get("/health")
+        
+        assert list(parse_server_timing(response.headers["Server-Timing"])) == ["total"]
+
+class TestRequestProfiler:
+    """Testes do RequestProfiler"""
+    
+    @staticmethod
+    def _scope(headers=None):
+        return {"type": "http", "method": "POST", "path": "/api/chat", "headers": headers or []}
+    
+    def test_disabled_by_default(self, tmp_path):
+        """Testa que sem amostragem nem cabeçalho nada é perfilado"""
+        profiler = RequestProfiler(str(tmp_path))
+        
+        assert profiler.start(self._scope()) is None
+    
+    def test_header_requires_matching_token(self, tmp_path):
+        """Testa que o cabeçalho de debug só funciona com o token correto"""
+        profiler = RequestProfiler(str(tmp_path), token="segredo")
+        
+        assert profiler.start(self._scope([(b"x-profile-token", b"errado")])) is None
+        
+        run = profiler.start(self._scope([(b"x-profile-token", b"segredo")]))
+        assert run is not None
+        assert run.name.endswith("-POST-api-chat.prof")
+        run.profile.disable()
+    
+    @pytest.mark.asyncio
+    async def test_only_one_profile_at_a_time(self, tmp_path):
+        """Testa que um segundo perfil simultâneo é ignorado"""
+        profiler = RequestProfiler(str(tmp_path), sample_rate=1.0)
+        
+        first = profiler.start(self._scope())
+        second = profiler.start(self._scope())
+        await profiler.finish(first)
+        
+        assert second is None
+        assert profiler.stats()["skipped"] == 1
+        assert profiler.stats()["captured"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_keeps_only_recent_profiles(self, tmp_path):
+        """Testa que apenas os perfis mais recentes são mantidos no diretório"""
+        profiler = RequestProfiler(str(tmp_path), sample_rate=1.0, keep=2)
+        
+        for _ in range(3):
+            await profiler.finish(profiler.start(self._scope()))
+        
+        names = [profile["name"] for profile in profiler.list()]
+        assert len(names) == 2
+        assert profiler.report(names[0]) is not None
+    
+    def test_rejects_path_traversal(self, tmp_path):
+        """Testa que nomes fora do diretório de perfis são recusados"""
+        profiler = RequestProfiler(str(tmp_path))
+        
+        assert profiler.path("../app.py") is None
+        assert profiler.path("inexistente.prof") is None
+
+class TestProfileEndpoints:
+    """Testes do profiling de ponta a ponta"""
+    
+    @patch('chat_engine.async_client')
+    def test_profile_by_header_is_served_to_admin(self, mock_async_client, tmp_path):
+        """Testa que uma requisição com o cabeçalho de debug gera um perfil disponível no admin"""
+        from app import app, profiler
+        
+        mock_reply(mock_async_client)
+        client = TestClient(app)
+        
+        with patch('app.ADMIN_TOKEN', "segredo"), \
+             patch.object(profiler, 'token', "segredo"), \
+             patch.object(profiler, 'directory', str(tmp_path)):
+            response = client.post(
+                "/api/chat",
+                json={"message": "Olá Rick"},
+                headers={"X-Profile-Token": "segredo"}
+            )
+            name = response.headers["X-Profile-Id"]
+            
+            denied = client.get("/admin/profiles")
+            listing = client.get("/admin/profiles", headers={"X-Admin-Token": "segredo"})
+            raw = client.get(f"/admin/profiles/{name}", headers={"X-Admin-Token": "segredo"})
+            text = client.get(f"/admin/profiles/{name}?format=text", headers={"X-Admin-Token": "segredo"})
+        
+        assert response.status_code == 200
+        assert denied.status_code == 403
+        assert name in [profile["name"] for profile in listing.json()["profiles"]]
+        assert raw.status_code == 200
+        assert len(raw.content) > 0
+        assert "function calls" in text.text
+    
+    def test_admin_disabled_without_token(self):
+        """Testa que os endpoints de administração ficam desligados sem ADMIN_TOKEN"""
+        from app import app
+        
+        client = TestClient(app)
+        
+        with patch('app.ADMIN_TOKEN', ""):
+            response = client.get("/admin/profiles")
+        
+        assert response.status_code == 404
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
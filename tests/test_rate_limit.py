@@ -0,0 +1,180 @@
+"""
+Testes unitários para a limitação de taxa por sessão e IP
+"""
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from rate_limit import RateLimiter, RateLimited
+from tests.helpers import mock_reply
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch('rate_limit.time.monotonic', fake):
+        yield fake
+
+class TestRequestBuckets:
+    """Testes dos baldes de requisições"""
+    
+    def test_burst_then_reject_with_retry_after(self, clock):
+        """Testa que o burst é liberado e a próxima requisição recebe Retry-After"""
+        limiter = RateLimiter(requests_per_minute=60, request_burst=3)
+        keys = RateLimiter.keys(None, "10.0.0.1")
+        
+        for _ in range(3):
+            limiter.acquire(keys)
+        
+        with pytest.raises(RateLimited) as exc_info:
+            limiter.acquire(keys)
+        
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.retry_after == 1
+        assert limiter.stats()["rejected"] == 1
+    
+    def test_cost_larger_than_burst_is_an_error(self, clock):
+        """Testa que um custo acima do burst não vira 429 e não consome o balde"""
+        limiter = RateLimiter(requests_per_minute=60, request_burst=10)
+        keys = RateLimiter.keys(None, "10.0.0.1")
+        
+        assert limiter.max_cost == 10
+        with pytest.raises(ValueError):
+            limiter.acquire(keys, cost=1000)
+        limiter.acquire(keys, cost=10)
+        
+        assert limiter.stats()["rejected"] == 0
+    
+    def test_refill_over_time(self, clock):
+        """Testa que o balde é reabastecido conforme o tempo passa"""
+        limiter = RateLimiter(requests_per_minute=60, request_burst=1)
+        keys = RateLimiter.keys(None, "10.0.0.1")
+        
+        limiter.acquire(keys)
+        clock.now += 1.0
+        limiter.acquire(keys)
+        
+        assert limiter.stats()["allowed"] == 2
+    
+    def test_session_and_ip_are_both_enforced(self, clock):
+        """Testa que trocar de sessão não contorna o limite por IP"""
+        limiter = RateLimiter(requests_per_minute=60, request_burst=2)
+        
+        limiter.acquire(RateLimiter.keys("s1", "10.0.0.1"))
+        limiter.acquire(RateLimiter.keys("s2", "10.0.0.1"))
+        
+        with pytest.raises(RateLimited):
+            limiter.acquire(RateLimiter.keys("s3", "10.0.0.1"))
+        limiter.acquire(RateLimiter.keys("s3", "10.0.0.2"))
+    
+    def test_rejection_does_not_consume_other_buckets(self, clock):
+        """Testa que uma rejeição não desconta dos outros baldes"""
+        limiter = RateLimiter(requests_per_minute=60, request_burst=1)
+        
+        limiter.acquire(RateLimiter.keys("s1", "10.0.0.1"))
+        with pytest.raises(RateLimited):
+            limiter.acquire(RateLimiter.keys("s2", "10.0.0.1"))
+        
+        limiter.acquire(RateLimiter.keys("s2", "10.0.0.2"))
+    
+    def test_idle_buckets_are_evicted(self, clock):
+        """Testa a remoção dos baldes ociosos e o limite de chaves"""
+        limiter = RateLimiter(requests_per_minute=60, request_burst=5, idle_seconds=30, max_keys=3)
+        
+        for index in range(3):
+            limiter.acquire(RateLimiter.keys(None, f"10.0.0.{index}"))
+        limiter.acquire(RateLimiter.keys(None, "10.0.0.9"))
+        assert limiter.stats()["request_buckets"] == 3
+        
+        clock.now += 31
+        limiter.acquire(RateLimiter.keys(None, "10.0.1.1"))
+        
+        assert limiter.stats()["request_buckets"] == 1
+        assert limiter.stats()["evicted"] == 4
+
+class TestTokenBuckets:
+    """Testes dos baldes de tokens"""
+    
+    def test_usage_debt_blocks_until_repaid(self, clock):
+        """Testa que o consumo de tokens acima do burst bloqueia até ser reposto"""
+        limiter = RateLimiter(requests_per_minute=0, request_burst=0, tokens_per_minute=600, token_burst=100)
+        keys = RateLimiter.keys("s1", "10.0.0.1")
+        
+        limiter.acquire(keys)
+        limiter.charge(keys, 150)
+        
+        with pytest.raises(RateLimited) as exc_info:
+            limiter.acquire(keys)
+        assert exc_info.value.retry_after == 5
+        
+        clock.now += 5
+        limiter.acquire(keys)
+
+class TestRateLimitEndpoints:
+    """Testes da limitação de taxa na API"""
+    
+    @patch('chat_engine.async_client')
+    def test_chat_returns_429_with_retry_after(self, mock_async_client):
+        """Testa que o excesso de requisições recebe 429 com Retry-After"""
+        from app import app
+        
+        mock_reply(mock_async_client, prompt_tokens=900, completion_tokens=100, total_tokens=1000)
+        client = TestClient(app)
+        
+        with patch('app.rate_limiter', RateLimiter(requests_per_minute=6, request_burst=2)):
+            statuses = [
+                client.post("/api/chat", json={"message": f"Pergunta {index}", "use_cache": False}).status_code
+                for index in range(3)
+            ]
+            response = client.post("/api/chat", json={"message": "Mais uma", "use_cache": False})
+        
+        assert statuses == [200, 200, 429]
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+    
+    @patch('chat_engine.async_client')
+    def test_batch_larger_than_burst_gets_413(self, mock_async_client):
+        """Testa que um lote que nunca caberia na rajada recebe 413 sem Retry-After"""
+        from app import app
+        
+        mock_reply(mock_async_client)
+        client = TestClient(app)
+        items = [{"message": f"Pergunta {index}", "use_cache": False} for index in range(3)]
+        
+        with patch('app.rate_limiter', RateLimiter(requests_per_minute=60, request_burst=2)):
+            too_large = client.post("/api/chat/batch", json={"items": items})
+            fits = client.post("/api/chat/batch", json={"items": items[:2]})
+        
+        assert too_large.status_code == 413
+        assert "Retry-After" not in too_large.headers
+        assert fits.status_code == 200
+    
+    @patch('chat_engine.async_client')
+    def test_upstream_usage_is_charged(self, mock_async_client):
+        """Testa que os tokens informados pelo upstream são descontados do balde do cliente"""
+        from app import app
+        
+        mock_reply(mock_async_client, prompt_tokens=900, completion_tokens=100, total_tokens=1000)
+        client = TestClient(app)
+        limiter = RateLimiter(requests_per_minute=0, request_burst=0, tokens_per_minute=1000, token_burst=500)
+        
+        with patch('app.rate_limiter', limiter):
+            first = client.post("/api/chat", json={"message": "Pergunta longa", "use_cache": False})
+            second = client.post("/api/chat", json={"message": "Outra pergunta", "use_cache": False})
+        
+        assert first.status_code == 200
+        assert second.status_code == 429
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,82 @@
+"""
+Testes unitários para o cache de respostas
+"""
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from response_cache import ResponseCache, make_cache_key
+
+def first_turn(text):
+    return [
+        {"role": "system", "content": "Você é Rick Sanchez."},
+        {"role": "user", "content": text}
+    ]
+
+class TestCacheKey:
+    """Testes da chave do cache"""
+    
+    def test_key_ignores_case_and_whitespace(self):
+        """Testa que variações de caixa e espaços geram a mesma chave"""
+        key1 = make_cache_key("gpt-4o-mini", 0.8, first_turn("Quanto é 2+2?"))
+        key2 = make_cache_key("gpt-4o-mini", 0.8, first_turn("  quanto   é 2+2? "))
+        assert key1 == key2
+    
+    def test_key_depends_on_model_and_temperature(self):
+        """Testa que modelo e temperatura fazem parte da chave"""
+        messages = first_turn("Quanto é 2+2?")
+        key = make_cache_key("gpt-4o-mini", 0.8, messages)
+        assert key != make_cache_key("gpt-4o", 0.8, messages)
+        assert key != make_cache_key("gpt-4o-mini", 0.2, messages)
+
+class TestResponseCache:
+    """Testes do cache LRU com TTL"""
+    
+    def test_hit_and_miss_stats(self):
+        """Testa contagem de acertos e falhas"""
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        assert cache.get("a") is None
+        cache.set("a", "resposta")
+        assert cache.get("a") == "resposta"
+        
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+    
+    def test_lru_eviction(self):
+        """Testa que a entrada menos usada é removida ao exceder a capacidade"""
+        cache = ResponseCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+    
+    def test_ttl_expiration(self):
+        """Testa que entradas expiram após o TTL"""
+        cache = ResponseCache(max_entries=10, ttl_seconds=10)
+        with patch("response_cache.time.time", return_value=1000.0):
+            cache.set("a", "1")
+        with patch("response_cache.time.time", return_value=1011.0):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+    
+    def test_persistence_round_trip(self, tmp_path):
+        """Testa que o cache é salvo e recarregado do disco"""
+        path = str(tmp_path / "cache.json")
+        cache = ResponseCache(max_entries=10, ttl_seconds=60, path=path)
+        cache.set("a", "resposta")
+        cache.save()
+        
+        restored = ResponseCache(max_entries=10, ttl_seconds=60, path=path)
+        assert restored.load() == 1
+        assert restored.get("a") == "resposta"
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
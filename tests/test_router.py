@@ -0,0 +1,217 @@
+"""
+Testes do roteador entre múltiplos backends compatíveis com a OpenAI
+Usando servidores locais no lugar dos provedores reais
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from router import Backend, Router, parse_backends_config
+from upstream import UpstreamError
+from tests.test_upstream import FakeOpenAIServer, completion_body, make_clients, make_upstream, SERVER_ERROR
+
+@pytest.fixture
+def servers():
+    started = [FakeOpenAIServer(), FakeOpenAIServer()]
+    yield started
+    for server in started:
+        server.close()
+
+def make_backend(name, server, model="gpt-4o-mini", max_retries=0, failure_threshold=5):
+    client, async_client = make_clients(server.base_url)
+    return Backend(
+        name,
+        model,
+        make_upstream(max_retries=max_retries, failure_threshold=failure_threshold),
+        client=client,
+        async_client=async_client
+    )
+
+def create(target):
+    return target.client.chat.completions.create(
+        model=target.model,
+        messages=[{"role": "user", "content": "Olá"}]
+    )
+
+def create_async(target):
+    return target.async_client.chat.completions.create(
+        model=target.model,
+        messages=[{"role": "user", "content": "Olá"}]
+    )
+
+class TestRouterSelection:
+    """Testes da escolha de backend"""
+    
+    def test_prefers_lower_latency_backend(self, servers):
+        """Testa que o backend com menor latência observada passa a ser o primeiro"""
+        primary, secondary = make_backend("primario", servers[0]), make_backend("reserva", servers[1])
+        router = Router([primary, secondary])
+        primary.latency_ewma = 0.8
+        secondary.latency_ewma = 0.1
+        
+        used, _ = router.call(create)
+        
+        assert used is secondary
+        assert servers[1].requests == 1
+    
+    def test_error_rate_penalizes_backend(self, servers):
+        """Testa que a taxa de erro piora a pontuação do backend"""
+        primary, secondary = make_backend("primario", servers[0]), make_backend("reserva", servers[1])
+        router = Router([primary, secondary], error_penalty=10)
+        primary.latency_ewma = secondary.latency_ewma = 0.2
+        primary.error_rate = 0.5
+        
+        assert [backend.name for backend in router.order()] == ["reserva", "primario"]
+    
+    def test_preferred_backend_goes_first(self, servers):
+        """Testa que a escolha explícita (por persona ou requisição) vem antes da pontuação"""
+        primary, secondary = make_backend("primario", servers[0]), make_backend("reserva", servers[1])
+        router = Router([primary, secondary])
+        primary.latency_ewma = 0.1
+        secondary.latency_ewma = 0.8
+        
+        assert [backend.name for backend in router.order("reserva")] == ["reserva", "primario"]
+    
+    def test_unknown_backend_is_rejected(self, servers):
+        """Testa que um backend inexistente gera ValueError"""
+        router = Router([make_backend("primario", servers[0])])
+        
+        with pytest.raises(ValueError, match="Backend desconhecido"):
+            router.order("inexistente")
+    
+    def test_open_circuit_backend_goes_last(self, servers):
+        """Testa que um backend com circuito aberto só é usado como último recurso"""
+        primary, secondary = make_backend("primario", servers[0]), make_backend("reserva", servers[1])
+        router = Router([primary, secondary])
+        primary.latency_ewma = 0.1
+        secondary.latency_ewma = 0.8
+        primary.upstream.breaker.failure_threshold = 1
+        primary.upstream.breaker.record_failure()
+        
+        assert [backend.name for backend in router.order()] == ["reserva", "primario"]
+
+class TestRouterFallback:
+    """Testes da troca de backend em caso de falha"""
+    
+    def test_falls_back_when_primary_fails(self, servers):
+        """Testa que uma falha no primeiro backend é coberta pelo seguinte"""
+        router = Router([make_backend("primario", servers[0]), make_backend("reserva", servers[1])])
+        servers[0].script = [SERVER_ERROR]
+        servers[1].script = [(200, completion_body("Olá do reserva"), 0)]
+        
+        used, response = router.call(create)
+        
+        assert used.name == "reserva"
+        assert response.choices[0].message.content == "Olá do reserva"
+        assert router.stats()["fallbacks"] == 1
+        assert router.stats()["backends"]["primario"]["failures"] == 1
+        assert router.stats()["backends"]["primario"]["error_rate"] > 0
+    
+    @pytest.mark.asyncio
+    async def test_async_falls_back_and_records_latency(self, servers):
+        """Testa a troca de backend no caminho assíncrono e o registro da latência"""
+        router = Router([make_backend("primario", servers[0]), make_backend("reserva", servers[1])])
+        servers[0].script = [SERVER_ERROR]
+        
+        used, _ = await router.call_async(create_async)
+        
+        assert used.name == "reserva"
+        assert router.stats()["backends"]["reserva"]["latency_ewma_seconds"] > 0
+        assert router.stats()["backends"]["reserva"]["in_flight"] == 0
+    
+    def test_raises_last_error_when_all_fail(self, servers):
+        """Testa que o erro é propagado quando todos os backends falham"""
+        router = Router([make_backend("primario", servers[0]), make_backend("reserva", servers[1])])
+        servers[0].script = [SERVER_ERROR]
+        servers[1].script = [SERVER_ERROR]
+        
+        with pytest.raises(UpstreamError) as exc_info:
+            router.call(create)
+        
+        assert exc_info.value.status_code == 502
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_call_is_not_counted_as_error(self, servers):
+        """Testa que uma chamada cancelada (ex.: hedge perdedor) não conta como falha"""
+        backend = make_backend("primario", servers[0])
+        router = Router([backend])
+        servers[0].script = [(200, completion_body("lenta"), 0.2)]
+        
+        task = asyncio.ensure_future(router.call_async(create_async))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        
+        assert backend.in_flight == 0
+        assert backend.failures == 0
+
+class TestRouterConfig:
+    """Testes da configuração ROUTER_BACKENDS"""
+    
+    def test_parse_valid_config(self):
+        """Testa a leitura de uma lista de backends"""
+        entries = parse_backends_config(
+            '[{"name": "primario", "model": "gpt-4o-mini"},'
+            ' {"name": "local", "model": "llama3", "base_url": "http://localhost:8001/v1"}]'
+        )
+        
+        assert [entry["name"] for entry in entries] == ["primario", "local"]
+    
+    def test_parse_rejects_invalid_config(self):
+        """Testa que configurações inválidas são rejeitadas"""
+        for raw in ("não é json", "[]", '[{"name": "x"}]', '[{"name": "x", "model": "a"}, {"name": "x", "model": "b"}]'):
+            with pytest.raises(ValueError):
+                parse_backends_config(raw)
+
+class TestRouterIntegration:
+    """Testes do roteador no chat engine"""
+    
+    @pytest.mark.asyncio
+    async def test_request_override_selects_backend(self, servers):
+        """Testa que o backend escolhido na requisição atende a chamada"""
+        servers[1].script = [(200, completion_body("Resposta local"), 0)]
+        router = Router([make_backend("primario", servers[0]), make_backend("local", servers[1], model="llama3")])
+        
+        with patch('chat_engine.router', router):
+            from chat_engine import ask_bot_async
+            
+            reply, _ = await ask_bot_async("Olá Rick", backend="local")
+        
+        assert reply == "Resposta local"
+        assert servers[0].requests == 0
+        assert servers[1].requests == 1
+    
+    @pytest.mark.asyncio
+    async def test_persona_model_only_goes_to_its_backend(self, servers):
+        """Testa que o modelo da persona vai só para o backend dela; a reserva recebe o próprio modelo"""
+        servers[0].script = [SERVER_ERROR]
+        servers[1].script = [(200, completion_body("Resposta local"), 0)]
+        router = Router([make_backend("primario", servers[0]), make_backend("local", servers[1], model="llama3")])
+        
+        with patch('chat_engine.router', router):
+            from chat_engine import request_openai_api_async
+            
+            reply = await request_openai_api_async([{"role": "user", "content": "Olá"}], backend="primario", model="gpt-4o")
+        
+        assert reply == "Resposta local"
+        assert servers[0].models == ["gpt-4o"]
+        assert servers[1].models == ["llama3"]
+    
+    def test_unknown_backend_is_rejected_before_session_is_created(self):
+        """Testa que um backend inexistente falha antes de criar a sessão"""
+        from chat_engine import ask_bot, get_active_sessions_count
+        
+        before = get_active_sessions_count()
+        with pytest.raises(ValueError):
+            ask_bot("Olá Rick", backend="inexistente")
+        
+        assert get_active_sessions_count() == before
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,132 @@
+"""
+Testes unitários para o agendador (controle de admissão e fila justa)
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from scheduler import Scheduler, SchedulerRejected
+
+def make_scheduler(max_in_flight=1, max_queue=10, queue_timeout_seconds=1.0, max_pending_per_session=10):
+    return Scheduler(
+        max_in_flight=max_in_flight,
+        max_queue=max_queue,
+        queue_timeout_seconds=queue_timeout_seconds,
+        max_pending_per_session=max_pending_per_session
+    )
+
+class TestAdmissionControl:
+    """Testes do limite global e da fila de espera"""
+    
+    @pytest.mark.asyncio
+    async def test_in_flight_never_exceeds_limit(self):
+        """Testa que o número de execuções simultâneas respeita o limite"""
+        scheduler = make_scheduler(max_in_flight=2)
+        running = 0
+        peak = 0
+        
+        async def job(i):
+            nonlocal running, peak
+            async with scheduler.slot(None, f"cliente{i}"):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.005)
+                running -= 1
+        
+        await asyncio.gather(*(job(i) for i in range(6)))
+        
+        assert peak == 2
+        assert scheduler.stats()["in_flight"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_fast_with_503(self):
+        """Testa que a fila cheia rejeita imediatamente com 503"""
+        scheduler = make_scheduler(max_in_flight=1, max_queue=1)
+        
+        await scheduler.acquire(None, "a")
+        waiting = asyncio.ensure_future(scheduler.acquire(None, "b"))
+        await asyncio.sleep(0)
+        
+        with pytest.raises(SchedulerRejected) as exc_info:
+            await scheduler.acquire(None, "c")
+        assert exc_info.value.status_code == 503
+        
+        scheduler.release(None, None)
+        await waiting
+        scheduler.release(None, None)
+        assert scheduler.stats()["in_flight"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_queue_timeout_rejects_with_503(self):
+        """Testa que esperar demais na fila resulta em 503"""
+        scheduler = make_scheduler(max_in_flight=1, queue_timeout_seconds=0.01)
+        await scheduler.acquire(None, "a")
+        
+        with pytest.raises(SchedulerRejected) as exc_info:
+            await scheduler.acquire(None, "b")
+        
+        assert exc_info.value.status_code == 503
+        assert scheduler.stats()["waiting"] == 0
+        assert scheduler.stats()["timed_out"] == 1
+
+class TestSessionSerialization:
+    """Testes da serialização por sessão"""
+    
+    @pytest.mark.asyncio
+    async def test_same_session_runs_one_at_a_time_in_order(self):
+        """Testa que turnos da mesma sessão não se intercalam"""
+        scheduler = make_scheduler(max_in_flight=10)
+        events = []
+        
+        async def turn(i):
+            async with scheduler.slot("s1", "s1"):
+                events.append(f"inicio{i}")
+                await asyncio.sleep(0.002)
+                events.append(f"fim{i}")
+        
+        await asyncio.gather(*(turn(i) for i in range(3)))
+        
+        assert events == ["inicio0", "fim0", "inicio1", "fim1", "inicio2", "fim2"]
+    
+    @pytest.mark.asyncio
+    async def test_too_many_pending_for_session_rejects_with_429(self):
+        """Testa que excesso de requisições pendentes na mesma sessão gera 429"""
+        scheduler = make_scheduler(max_in_flight=10, max_pending_per_session=1)
+        entry = await scheduler.acquire("s1", "s1")
+        
+        with pytest.raises(SchedulerRejected) as exc_info:
+            await scheduler.acquire("s1", "s1")
+        
+        assert exc_info.value.status_code == 429
+        scheduler.release("s1", entry)
+
+class TestFairness:
+    """Testes da justiça round-robin entre clientes"""
+    
+    @pytest.mark.asyncio
+    async def test_waiting_clients_are_served_round_robin(self):
+        """Testa que um cliente com muitas requisições não bloqueia os demais"""
+        scheduler = make_scheduler(max_in_flight=1)
+        order = []
+        
+        await scheduler.acquire(None, "bloqueio")
+        
+        async def job(key, i):
+            async with scheduler.slot(None, key):
+                order.append(f"{key}{i}")
+        
+        tasks = [asyncio.ensure_future(job("a", i)) for i in range(3)]
+        tasks += [asyncio.ensure_future(job("b", i)) for i in range(2)]
+        await asyncio.sleep(0)
+        
+        scheduler.release(None, None)
+        await asyncio.gather(*tasks)
+        
+        assert order == ["a0", "b0", "a1", "b1", "a2"]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
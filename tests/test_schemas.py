@@ -44,6 +44,11 @@ class TestChatRequest:
         long_message = "A" * 2001
         with pytest.raises(ValidationError):
             ChatRequest(message=long_message)
+    
+    def test_chat_request_too_long_session_id_fails(self):
+        """Testa que session_id acima do limite falha validação"""
+        with pytest.raises(ValidationError):
+            ChatRequest(message="Olá", session_id="s" * 129)
 
 class TestChatResponse:
     """Testes para schema ChatResponse"""
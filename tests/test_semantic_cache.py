@@ -0,0 +1,116 @@
+"""
+Testes unitários para o cache semântico
+"""
+import pytest
+import numpy as np
+from unittest.mock import patch, MagicMock, AsyncMock
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from semantic_cache import HashingVectorizer, SemanticCache, negation_key
+
+class TestHashingVectorizer:
+    """Testes do vetorizador de n-gramas de caracteres"""
+    
+    def test_vectors_are_normalized(self):
+        """Testa que os vetores têm norma unitária"""
+        vector = HashingVectorizer(dim=128).transform("Como funciona um buraco negro?")
+        assert vector.shape == (128,)
+        assert np.isclose(np.linalg.norm(vector), 1.0)
+    
+    def test_similar_texts_are_closer_than_unrelated(self):
+        """Testa que textos parecidos têm similaridade maior que textos distintos"""
+        vectorizer = HashingVectorizer()
+        base = vectorizer.transform("Como funciona um buraco negro?")
+        similar = vectorizer.transform("como funciona o buraco negro")
+        unrelated = vectorizer.transform("Qual a cotação do Bitcoin hoje?")
+        assert base @ similar > base @ unrelated
+
+class TestSemanticCache:
+    """Testes do cache semântico"""
+    
+    def test_near_duplicate_question_hits(self):
+        """Testa que pergunta com redação levemente diferente é servida do cache"""
+        cache = SemanticCache(capacity=10, threshold=0.8)
+        cache.add("Como funciona um buraco negro?", "Gravidade, Morty.")
+        
+        assert cache.lookup("como funciona um buraco negro") == "Gravidade, Morty."
+        assert cache.lookup("Qual a cotação do Bitcoin hoje?") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_search_returns_top_k_sorted_by_similarity(self):
+        """Testa que a busca top-k retorna resultados ordenados por similaridade"""
+        cache = SemanticCache(capacity=10, threshold=0.8)
+        cache.add("Como funciona um buraco negro?", "buraco negro")
+        cache.add("Como funciona a viagem no tempo?", "viagem no tempo")
+        cache.add("Qual a cotação do Bitcoin hoje?", "bitcoin")
+        
+        results = cache.search("como funciona um buraco negro", k=2)
+        assert len(results) == 2
+        assert results[0][1] == "buraco negro"
+        assert results[0][0] >= results[1][0]
+    
+    def test_least_recently_used_entry_is_evicted(self):
+        """Testa que a entrada menos usada é substituída ao atingir a capacidade"""
+        cache = SemanticCache(capacity=2, threshold=0.95)
+        with patch("semantic_cache.time.time", return_value=1000.0):
+            cache.add("Como funciona um buraco negro?", "buraco negro")
+        with patch("semantic_cache.time.time", return_value=1001.0):
+            cache.add("Como funciona a viagem no tempo?", "viagem no tempo")
+        with patch("semantic_cache.time.time", return_value=1002.0):
+            cache.add("Qual a cotação do Bitcoin hoje?", "bitcoin")
+        
+        assert len(cache) == 2
+        assert cache.lookup("Como funciona um buraco negro?") is None
+        assert cache.lookup("Qual a cotação do Bitcoin hoje?") == "bitcoin"
+    
+    def test_lsh_index_finds_near_duplicates(self):
+        """Testa a busca aproximada (LSH) usada em caches grandes"""
+        cache = SemanticCache(capacity=100, threshold=0.8, exact_search_limit=0)
+        for i in range(50):
+            cache.add(f"pergunta número {i} sobre física", f"resposta {i}")
+        cache.add("Como funciona um buraco negro?", "Gravidade, Morty.")
+        
+        assert cache.lookup("como funciona um buraco negro") == "Gravidade, Morty."
+    
+    def test_negated_question_does_not_hit(self):
+        """Testa que a mesma pergunta com negação diferente não é servida do cache"""
+        cache = SemanticCache(capacity=10, threshold=0.8)
+        cache.add("posso cancelar?", "Pode, Morty.")
+        
+        assert cache.lookup("não posso cancelar?") is None
+        assert cache.lookup("Posso cancelar") == "Pode, Morty."
+        
+        cache.add("não posso cancelar?", "Não pode.")
+        assert cache.lookup("Não posso cancelar") == "Não pode."
+        assert cache.lookup("posso cancelar?") == "Pode, Morty."
+        assert negation_key("Nao posso cancelar") == negation_key("não posso cancelar?") == ("nao",)
+
+class TestSemanticCacheIntegration:
+    """Testes do cache semântico no chat engine"""
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.semantic_cache', SemanticCache(capacity=100, threshold=0.9))
+    @patch('chat_engine.async_client')
+    async def test_near_duplicate_opener_skips_upstream(self, mock_async_client):
+        """Testa que pergunta de abertura quase idêntica não chama a API"""
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "Gravidade, Morty."
+        mock_response.usage.total_tokens = 100
+        mock_async_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        
+        from chat_engine import ask_bot_async
+        
+        await ask_bot_async("Como funciona um buraco negro?")
+        reply, _ = await ask_bot_async("Como funciona um buraco negro")
+        
+        assert reply == "Gravidade, Morty."
+        assert mock_async_client.chat.completions.create.await_count == 1
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
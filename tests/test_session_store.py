@@ -0,0 +1,240 @@
+"""
+Testes unitários para o armazenamento de sessões
+"""
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from session_store import SessionStore, InMemorySessionStore, SQLiteSessionStore
+
+def make_store(max_sessions=10, ttl_seconds=60, max_messages=4):
+    return InMemorySessionStore(
+        max_sessions=max_sessions,
+        ttl_seconds=ttl_seconds,
+        max_messages=max_messages
+    )
+
+def turn(i):
+    return [
+        {"role": "user", "content": f"msg{i}"},
+        {"role": "assistant", "content": f"reply{i}"}
+    ]
+
+class TestSessionStoreInterface:
+    """Testes da interface comum dos armazenamentos"""
+    
+    def test_incomplete_store_cannot_be_instantiated(self):
+        """Testa que um armazenamento sem todos os métodos abstratos falha na criação"""
+        class PartialStore(SessionStore):
+            def __len__(self):
+                return 0
+        
+        with pytest.raises(TypeError):
+            SessionStore()
+        with pytest.raises(TypeError):
+            PartialStore()
+
+class TestInMemorySessionStore:
+    """Testes do armazenamento de sessões em memória"""
+    
+    def test_get_or_create_reports_new_session(self):
+        """Testa que get_or_create indica se a sessão foi criada"""
+        store = make_store()
+        assert store.get_or_create("a") is True
+        assert store.get_or_create("a") is False
+        assert len(store) == 1
+    
+    def test_history_is_bounded_by_max_messages(self):
+        """Testa que o histórico mantém apenas as últimas mensagens"""
+        store = make_store(max_messages=4)
+        for i in range(5):
+            store.append("a", turn(i))
+        
+        history = store.get_history("a")
+        assert [m["content"] for m in history] == ["msg3", "reply3", "msg4", "reply4"]
+    
+    def test_token_counts_are_stored_with_messages(self):
+        """Testa que a contagem de tokens é guardada junto com cada mensagem"""
+        store = make_store()
+        store.append("a", turn(0), [7, 11])
+        
+        assert [tokens for _, tokens in store.get_history_with_tokens("a")] == [7, 11]
+        assert store.get_history("a") == turn(0)
+    
+    def test_drop_summarized_tolerates_evicted_prefix(self):
+        """Testa que só o início já resumido sai do histórico, mesmo se parte dele foi descartada"""
+        store = make_store(max_messages=6)
+        for i in range(3):
+            store.append("a", turn(i))
+        summarized = turn(0) + turn(1)
+        store.append("a", turn(3))
+        
+        assert store.drop_summarized("a", summarized) == 2
+        assert [m["content"] for m in store.get_history("a")] == ["msg2", "reply2", "msg3", "reply3"]
+        assert store.drop_summarized("a", summarized) == 0
+    
+    def test_lru_eviction_when_capacity_exceeded(self):
+        """Testa que a sessão menos usada é removida ao exceder a capacidade"""
+        store = make_store(max_sessions=2)
+        store.get_or_create("a")
+        store.get_or_create("b")
+        store.get_history("a")
+        store.get_or_create("c")
+        
+        assert store.get_history("b") == []
+        assert store.get_or_create("a") is False
+        assert store.stats()["evicted_lru"] == 1
+    
+    def test_idle_sessions_expire(self):
+        """Testa que sessões ociosas além do TTL são removidas"""
+        store = make_store(ttl_seconds=10)
+        with patch("session_store.time.time", return_value=1000.0):
+            store.append("a", turn(0))
+        
+        with patch("session_store.time.time", return_value=1011.0):
+            assert store.get_history("a") == []
+        
+        assert store.stats()["evicted_ttl"] == 1
+    
+    def test_sweep_removes_expired_sessions(self):
+        """Testa que a varredura remove todas as sessões expiradas"""
+        store = make_store(ttl_seconds=10)
+        with patch("session_store.time.time", return_value=1000.0):
+            store.get_or_create("a")
+            store.get_or_create("b")
+        with patch("session_store.time.time", return_value=1005.0):
+            store.get_or_create("c")
+        
+        with patch("session_store.time.time", return_value=1012.0):
+            assert store.sweep() == 2
+        
+        assert len(store) == 1
+    
+    def test_delete_session(self):
+        """Testa remoção explícita de sessão"""
+        store = make_store()
+        store.get_or_create("a")
+        assert store.delete("a") is True
+        assert store.delete("a") is False
+
+class TestSQLiteSessionStore:
+    """Testes do armazenamento de sessões em SQLite (WAL)"""
+    
+    @staticmethod
+    def make_sqlite_store(path, **kwargs):
+        options = {"max_sessions": 10, "ttl_seconds": 60, "max_messages": 4}
+        options.update(kwargs)
+        return SQLiteSessionStore(path=str(path), **options)
+    
+    def test_history_round_trip_keeps_last_messages(self, tmp_path):
+        """Testa gravação e leitura da janela de histórico"""
+        store = self.make_sqlite_store(tmp_path / "sessions.db")
+        assert store.get_or_create("a") is True
+        for i in range(3):
+            store.append("a", turn(i))
+        
+        history = store.get_history("a")
+        assert [m["content"] for m in history] == ["msg1", "reply1", "msg2", "reply2"]
+        store.close()
+    
+    def test_token_counts_round_trip(self, tmp_path):
+        """Testa que a contagem de tokens é persistida no SQLite"""
+        store = self.make_sqlite_store(tmp_path / "sessions.db")
+        store.append("a", turn(0), [7, 11])
+        
+        assert [tokens for _, tokens in store.get_history_with_tokens("a")] == [7, 11]
+        store.close()
+    
+    def test_drop_summarized_deletes_rows(self, tmp_path):
+        """Testa que os turnos resumidos são apagados e não voltam para a janela"""
+        store = self.make_sqlite_store(tmp_path / "sessions.db")
+        for i in range(3):
+            store.append("a", turn(i))
+        
+        assert store.drop_summarized("a", turn(0) + turn(1)) == 2
+        assert [m["content"] for m in store.get_history("a")] == ["msg2", "reply2"]
+        store.close()
+    
+    def test_append_is_committed_before_returning(self, tmp_path):
+        """Testa que outro worker lê o turno assim que append retorna, sem esperar o flush"""
+        path = tmp_path / "sessions.db"
+        worker_a = self.make_sqlite_store(path)
+        worker_b = self.make_sqlite_store(path)
+        
+        worker_a.get_or_create("a")
+        worker_a.append("a", turn(0))
+        
+        assert [m["content"] for m in worker_b.get_history("a")] == ["msg0", "reply0"]
+        worker_a.close()
+        worker_b.close()
+    
+    def test_concurrent_appends_are_all_committed(self, tmp_path):
+        """Testa que appends simultâneos (commit em grupo) gravam todos os turnos"""
+        import threading
+        
+        store = self.make_sqlite_store(tmp_path / "sessions.db", max_messages=1000)
+        threads = [threading.Thread(target=store.append, args=("a", turn(i))) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        other = self.make_sqlite_store(tmp_path / "sessions.db", max_messages=1000)
+        assert len(other.get_history("a")) == 40
+        assert store.stats()["pending_writes"] == 0
+        store.close()
+        other.close()
+    
+    def test_failed_get_or_create_rolls_back(self, tmp_path):
+        """Testa que um erro dentro da transação não deixa a conexão presa em BEGIN"""
+        store = self.make_sqlite_store(tmp_path / "sessions.db")
+        store.get_or_create("a")
+        
+        # sessão expirada: get_or_create apaga e recria dentro da transação
+        store._conn.execute("UPDATE sessions SET last_seen = 0 WHERE session_id = 'a'")
+        with patch.object(store, "_delete", side_effect=RuntimeError("falhou")):
+            with pytest.raises(RuntimeError):
+                store.get_or_create("a")
+        
+        assert store._conn.in_transaction is False
+        assert store.get_or_create("b") is True
+        store.close()
+    
+    def test_state_is_shared_between_store_instances(self, tmp_path):
+        """Testa que dois processos (instâncias) compartilham o histórico"""
+        path = tmp_path / "sessions.db"
+        worker_a = self.make_sqlite_store(path)
+        worker_b = self.make_sqlite_store(path)
+        
+        worker_a.get_or_create("a")
+        worker_a.append("a", turn(0))
+        worker_a.flush()
+        
+        assert worker_b.get_or_create("a") is False
+        assert [m["content"] for m in worker_b.get_history("a")] == ["msg0", "reply0"]
+        worker_a.close()
+        worker_b.close()
+    
+    def test_delete_and_sweep(self, tmp_path):
+        """Testa remoção explícita e varredura por TTL e capacidade"""
+        store = self.make_sqlite_store(tmp_path / "sessions.db", ttl_seconds=10, max_sessions=1)
+        with patch("session_store.time.time", return_value=1000.0):
+            store.get_or_create("old")
+        with patch("session_store.time.time", return_value=1008.0):
+            store.get_or_create("a")
+            store.get_or_create("b")
+        
+        assert store.delete("b") is True
+        assert store.delete("b") is False
+        
+        with patch("session_store.time.time", return_value=1012.0):
+            assert store.sweep() == 1
+        assert len(store) == 1
+        store.close()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,111 @@
+"""
+Testes unitários para o agrupamento de requisições idênticas (single-flight)
+"""
+import asyncio
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from single_flight import SingleFlight
+
+class TestSingleFlight:
+    """Testes do SingleFlight"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """Testa que chamadas concorrentes com a mesma chave executam uma vez"""
+        group = SingleFlight()
+        calls = 0
+        
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "resposta"
+        
+        results = await asyncio.gather(*(group.do("k", fetch) for _ in range(5)))
+        
+        assert results == ["resposta"] * 5
+        assert calls == 1
+        assert group.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+    
+    @pytest.mark.asyncio
+    async def test_errors_fan_out_to_all_waiters(self):
+        """Testa que o erro da chamada compartilhada chega a todos que aguardam"""
+        group = SingleFlight()
+        
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream caiu")
+        
+        results = await asyncio.gather(*(group.do("k", fail) for _ in range(3)), return_exceptions=True)
+        
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert len(group) == 0
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        """Testa que cancelar um cliente não cancela a chamada dos demais"""
+        group = SingleFlight()
+        
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "resposta"
+        
+        first = asyncio.ensure_future(group.do("k", fetch))
+        second = asyncio.ensure_future(group.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        
+        assert await second == "resposta"
+    
+    @pytest.mark.asyncio
+    async def test_last_cancelled_waiter_cancels_shared_call(self):
+        """Testa que a chamada compartilhada é cancelada quando ninguém mais aguarda"""
+        group = SingleFlight()
+        
+        async def fetch():
+            await asyncio.sleep(5)
+            return "resposta"
+        
+        waiter = asyncio.ensure_future(group.do("k", fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+        
+        assert len(group) == 0
+
+class TestSingleFlightIntegration:
+    """Testes do single-flight no chat engine"""
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.async_client')
+    async def test_identical_concurrent_requests_share_upstream_call(self, mock_async_client):
+        """Testa que requisições idênticas simultâneas fazem uma só chamada e gravam cada histórico"""
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "É 4."
+        mock_response.usage.total_tokens = 100
+        
+        async def slow_create(**kwargs):
+            await asyncio.sleep(0.01)
+            return mock_response
+        
+        mock_async_client.chat.completions.create = AsyncMock(side_effect=slow_create)
+        
+        from chat_engine import ask_bot_async, get_conversation_history
+        
+        results = await asyncio.gather(*(ask_bot_async("Quanto é 2+2?") for _ in range(3)))
+        
+        assert mock_async_client.chat.completions.create.await_count == 1
+        session_ids = {session_id for _, session_id in results}
+        assert len(session_ids) == 3
+        for session_id in session_ids:
+            assert get_conversation_history(session_id)[-1]["content"] == "É 4."
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,182 @@
+"""
+Testes unitários para o snapshot binário das sessões em memória
+"""
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from session_store import InMemorySessionStore
+from snapshot import SessionSnapshotter, SnapshotError, read_snapshot, write_snapshot
+
+def make_store(max_sessions=100, ttl_seconds=3600):
+    return InMemorySessionStore(max_sessions=max_sessions, ttl_seconds=ttl_seconds, max_messages=10)
+
+def fill(store):
+    store.append("s1", [{"role": "user", "content": "Olá, Rick"}, {"role": "assistant", "content": "*burp* Oi, Morty 🧪"}], [4, 7])
+    store.append("s2", [{"role": "user", "content": "Wubba lubba dub dub"}], [6])
+    store.set_summary("s2", "Resumo da conversa")
+
+class TestSnapshotFormat:
+    """Testes de escrita e leitura do arquivo de snapshot"""
+    
+    def test_round_trip_preserves_sessions(self, tmp_path):
+        """Testa que histórico, tokens, resumo e ordem LRU sobrevivem ao snapshot"""
+        path = str(tmp_path / "sessions.snap")
+        store = make_store()
+        fill(store)
+        
+        assert write_snapshot(path, store.snapshot()) == 2
+        
+        restored = make_store()
+        assert restored.restore(read_snapshot(path)) == 2
+        
+        assert restored.get_history_with_tokens("s1") == store.get_history_with_tokens("s1")
+        assert restored.get_summary("s2") == "Resumo da conversa"
+        assert restored.get_summary("s1") is None
+        assert list(restored._sessions) == ["s2", "s1"]
+    
+    def test_write_is_atomic(self, tmp_path):
+        """Testa que uma falha na escrita mantém o snapshot anterior intacto"""
+        path = str(tmp_path / "sessions.snap")
+        store = make_store()
+        fill(store)
+        write_snapshot(path, store.snapshot())
+        
+        def broken():
+            yield "s3", time.time(), time.time(), None, []
+            raise OSError("disco cheio")
+        
+        with pytest.raises(OSError):
+            write_snapshot(path, broken())
+        
+        assert [record[0] for record in read_snapshot(path)] == ["s1", "s2"]
+        assert not os.path.exists(path + ".tmp")
+    
+    def test_bad_session_is_skipped(self, tmp_path):
+        """Testa que uma sessão que não cabe no formato é ignorada e as demais são gravadas"""
+        path = str(tmp_path / "sessions.snap")
+        store = make_store()
+        fill(store)
+        records = list(store.snapshot()) + [
+            ("s" * 70000, time.time(), time.time(), None, []),
+            ("s3", time.time(), time.time(), None, [({"role": "desconhecido", "content": "x"}, 1)])
+        ]
+        
+        assert write_snapshot(path, iter(records)) == 2
+        assert [record[0] for record in read_snapshot(path)] == ["s1", "s2"]
+    
+    def test_corrupted_file_is_rejected(self, tmp_path):
+        """Testa que um arquivo truncado ou alterado é recusado antes de restaurar"""
+        path = tmp_path / "sessions.snap"
+        store = make_store()
+        fill(store)
+        write_snapshot(str(path), store.snapshot())
+        
+        data = bytearray(path.read_bytes())
+        data[30] ^= 0xFF
+        path.write_bytes(bytes(data))
+        with pytest.raises(SnapshotError):
+            list(read_snapshot(str(path)))
+        
+        path.write_bytes(bytes(data[:10]))
+        with pytest.raises(SnapshotError):
+            list(read_snapshot(str(path)))
+
+class TestSessionSnapshotter:
+    """Testes do snapshot periódico e da restauração na inicialização"""
+    
+    def test_load_skips_expired_and_respects_capacity(self, tmp_path):
+        """Testa que sessões expiradas são ignoradas e a capacidade mantém as mais recentes"""
+        path = str(tmp_path / "sessions.snap")
+        store = make_store()
+        for index in range(5):
+            store.append(f"s{index}", [{"role": "user", "content": f"mensagem {index}"}], [2])
+        with store._lock:
+            store._sessions["s0"].last_seen -= 7200
+        SessionSnapshotter(store, path).save()
+        
+        restored = make_store(max_sessions=3)
+        
+        assert SessionSnapshotter(restored, path).load() == 4
+        assert list(restored._sessions) == ["s2", "s3", "s4"]
+    
+    def test_live_sessions_win_over_snapshot(self, tmp_path):
+        """Testa que uma sessão já ativa não é sobrescrita pelo snapshot"""
+        path = str(tmp_path / "sessions.snap")
+        store = make_store()
+        fill(store)
+        SessionSnapshotter(store, path).save()
+        
+        restored = make_store()
+        restored.append("s1", [{"role": "user", "content": "Nova conversa"}], [3])
+        
+        assert SessionSnapshotter(restored, path).load() == 1
+        assert restored.get_history("s1") == [{"role": "user", "content": "Nova conversa"}]
+    
+    def test_missing_or_corrupted_snapshot_starts_empty(self, tmp_path):
+        """Testa que a ausência ou corrupção do arquivo não impede a inicialização"""
+        path = tmp_path / "sessions.snap"
+        store = make_store()
+        
+        assert SessionSnapshotter(store, str(path)).load() == 0
+        
+        path.write_bytes(b"lixo" * 10)
+        assert SessionSnapshotter(store, str(path)).load() == 0
+        assert len(store) == 0
+    
+    def test_periodic_snapshot(self, tmp_path):
+        """Testa que a thread periódica grava o snapshot"""
+        path = str(tmp_path / "sessions.snap")
+        store = make_store()
+        fill(store)
+        snapshotter = SessionSnapshotter(store, path, interval_seconds=0.01)
+        
+        snapshotter.start()
+        deadline = time.time() + 2
+        while snapshotter.saved == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        snapshotter.stop()
+        
+        assert snapshotter.saved >= 1
+        assert os.path.exists(path)
+        assert not os.path.exists(path + ".tmp")
+
+class TestSnapshotLifecycle:
+    """Testes do snapshot nos eventos de inicialização e encerramento da API"""
+    
+    @pytest.mark.asyncio
+    async def test_shutdown_saves_and_startup_restores(self, tmp_path):
+        """Testa que o encerramento grava o snapshot e a inicialização o restaura"""
+        import app
+        from app import startup_event, shutdown_event
+        
+        path = str(tmp_path / "sessions.snap")
+        store = make_store()
+        fill(store)
+        
+        with patch('app.summarizer'), patch('app.response_cache'), \
+             patch('app.session_store', store), \
+             patch('app.session_snapshots', SessionSnapshotter(store, path, interval_seconds=0)):
+            await shutdown_event()
+        
+        restored = make_store()
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test"}), \
+             patch('app.summarizer'), patch('app.response_cache'), patch('app.warm_up_upstream', AsyncMock(return_value={})), \
+             patch('app.session_store', restored), \
+             patch('app.session_snapshots', SessionSnapshotter(restored, path, interval_seconds=0)), \
+             patch('app.warmup_task', None):
+            await startup_event()
+            # o aquecimento precisa terminar com os patches ainda ativos
+            await app.warmup_task
+            restored.stop_sweeper()
+        
+        assert len(restored) == 2
+        assert restored.get_summary("s2") == "Resumo da conversa"
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
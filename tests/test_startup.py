@@ -0,0 +1,138 @@
+"""
+Testes unitários para a inicialização: tempo de import, clientes preguiçosos e prontidão
+"""
+import subprocess
+import httpx
+import openai
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Adicionar diretório backend ao path
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from router import Backend
+from upstream import warm_up_client
+
+# orçamentos generosos de propósito: pegam regressões (import pesado, rede no import), não variação de máquina
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "5"))
+BACKEND_IMPORT_BUDGET_SECONDS = float(os.getenv("BACKEND_IMPORT_BUDGET_SECONDS", "0.75"))
+
+IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import app
+import chat_engine
+print(time.perf_counter() - started)
+print(chat_engine.client is None and chat_engine.async_client is None)
+"""
+
+def import_app_in_subprocess():
+    env = dict(os.environ, OPENAI_API_KEY="test", SESSION_SNAPSHOT_PATH="", STATIC_ENABLED="false")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout.split(), result.stderr
+
+def backend_self_time(importtime_output: str) -> float:
+    modules = {name[:-3] for name in os.listdir(BACKEND_DIR) if name.endswith(".py")}
+    total = 0
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.split(":", 1)[1].split("|")
+        if name.strip() in modules:
+            total += int(self_us)
+    return total / 1e6
+
+class TestImportTime:
+    """Testes do orçamento de tempo de import do backend"""
+    
+    def test_import_stays_within_budget(self):
+        """Testa que importar o app cabe no orçamento e não cria clientes da OpenAI"""
+        (elapsed, clients_deferred), importtime_output = import_app_in_subprocess()
+        
+        assert float(elapsed) < IMPORT_BUDGET_SECONDS
+        assert backend_self_time(importtime_output) < BACKEND_IMPORT_BUDGET_SECONDS
+        assert clients_deferred == "True"
+
+class TestLazyClients:
+    """Testes da criação dos clientes no primeiro uso"""
+    
+    def test_clients_created_once_on_first_use(self):
+        """Testa que o cliente padrão só é criado quando usado, e uma única vez"""
+        import chat_engine
+        
+        created = (MagicMock(), MagicMock())
+        with patch('chat_engine.client', None), patch('chat_engine.async_client', None), \
+             patch('chat_engine.create_clients', return_value=created) as create_clients:
+            target = Backend("default", "gpt-4o-mini", MagicMock())
+            
+            assert chat_engine.async_client_for(target) is created[1]
+            assert chat_engine.client_for(target) is created[0]
+            assert create_clients.call_count == 1
+    
+    def test_routed_backend_gets_its_own_clients(self):
+        """Testa que um backend do ROUTER_BACKENDS recebe os próprios clientes, não o padrão"""
+        import chat_engine
+        
+        backend = Backend("reserva", "gpt-4o", MagicMock())
+        router = MagicMock(backends={"reserva": backend})
+        own = (MagicMock(), MagicMock())
+        with patch('chat_engine.router', router), \
+             patch('chat_engine.backend_credentials', {"reserva": ("chave", "http://reserva")}), \
+             patch('chat_engine.create_clients', return_value=own) as create_clients, \
+             patch('chat_engine.async_client', MagicMock()), patch('chat_engine.client', MagicMock()):
+            assert chat_engine.async_client_for(backend) is own[1]
+            create_clients.assert_called_once_with("chave", "http://reserva")
+
+class TestReadiness:
+    """Testes do aquecimento e dos endpoints de liveness e readiness"""
+    
+    @pytest.mark.asyncio
+    async def test_warm_up_accepts_any_http_response(self):
+        """Testa que um 404 conta como conexão aquecida e uma falha de conexão não"""
+        request = httpx.Request("GET", "http://upstream/v1/models")
+        not_found = openai.NotFoundError("não encontrado", response=httpx.Response(404, request=request), body=None)
+        
+        answering = MagicMock()
+        answering.models.list = AsyncMock(side_effect=not_found)
+        offline = MagicMock()
+        offline.models.list = AsyncMock(side_effect=openai.APIConnectionError(request=request))
+        
+        assert await warm_up_client(answering, 1) is True
+        assert await warm_up_client(offline, 1) is False
+    
+    @pytest.mark.asyncio
+    async def test_ready_only_after_warm_up(self):
+        """Testa que /health/ready responde 503 até o aquecimento e /health/live sempre responde"""
+        from app import app, warm_up, shutdown_event
+        
+        client = TestClient(app)
+        readiness = {"status": "starting", "upstream": {}}
+        with patch('app.readiness', readiness), \
+             patch('app.warm_up_upstream', AsyncMock(return_value={"default": True})):
+            assert client.get("/health/live").status_code == 200
+            assert client.get("/health/ready").status_code == 503
+            
+            await warm_up()
+            ready = client.get("/health/ready")
+            assert ready.status_code == 200
+            assert ready.json() == {"status": "ready", "upstream": {"default": True}}
+            
+            with patch('app.summarizer'), patch('app.response_cache'), \
+                 patch('app.session_store'), patch('app.session_snapshots', None), patch('app.warmup_task', None):
+                await shutdown_event()
+            assert client.get("/health/ready").json()["status"] == "stopping"
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,118 @@
+"""
+Testes unitários para o frontend servido pelo backend com arquivos pré-comprimidos
+"""
+import gzip
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from static_assets import StaticBundle, choose_encoding, parse_range
+
+FRONTEND_DIR = os.path.join(os.path.dirname(__file__), '..', 'frontend')
+
+@pytest.fixture(scope="module")
+def bundle():
+    static = StaticBundle(FRONTEND_DIR)
+    static.build()
+    return static
+
+@pytest.fixture
+def client(bundle):
+    from app import app
+    
+    with patch('app.static_bundle', bundle):
+        yield TestClient(app)
+
+class TestStaticBundle:
+    """Testes da montagem dos arquivos com hash e compressão"""
+    
+    def test_assets_get_hashed_names_and_index_is_rewritten(self, bundle):
+        """Testa que os arquivos ganham hash no nome e o index.html aponta para eles"""
+        manifest = bundle.manifest()
+        index, _ = bundle.find("")
+        html = index.body.decode("utf-8")
+        
+        assert manifest["index.html"] == "index.html"
+        assert manifest["styles.css"].startswith("styles.") and manifest["styles.css"] != "styles.css"
+        assert f'href="{manifest["styles.css"]}"' in html
+        assert f'src="{manifest["app.js"]}"' in html
+        assert f'src="{manifest["rick-avatar.jpg"]}"' in html
+    
+    def test_only_compressible_types_are_compressed(self, bundle):
+        """Testa que texto é pré-comprimido e a imagem JPEG não"""
+        css, _ = bundle.find("styles.css")
+        avatar, _ = bundle.find("rick-avatar.jpg")
+        
+        assert gzip.decompress(css.variants["gzip"]) == css.body
+        assert avatar.variants == {}
+    
+    def test_choose_encoding_respects_quality(self, bundle):
+        """Testa a escolha da codificação pelo Accept-Encoding"""
+        css, _ = bundle.find("styles.css")
+        
+        assert choose_encoding(css, "gzip, deflate") == "gzip"
+        assert choose_encoding(css, "gzip;q=0, deflate") == "identity"
+        assert choose_encoding(css, "") == "identity"
+    
+    def test_parse_range(self):
+        """Testa os formatos de Range aceitos"""
+        assert parse_range("bytes=0-9", 100) == (0, 9)
+        assert parse_range("bytes=90-", 100) == (90, 99)
+        assert parse_range("bytes=-10", 100) == (90, 99)
+        assert parse_range("bytes=200-", 100) is None
+        with pytest.raises(ValueError):
+            parse_range("bytes=0-1,5-6", 100)
+
+class TestStaticEndpoints:
+    """Testes do frontend em /app/"""
+    
+    def test_index_revalidates_and_assets_are_immutable(self, client, bundle):
+        """Testa o cache do index.html e dos arquivos com hash"""
+        index = client.get("/app/")
+        css = client.get(f"/app/{bundle.manifest()['styles.css']}", headers={"Accept-Encoding": "gzip"})
+        
+        assert index.status_code == 200
+        assert index.headers["cache-control"] == "no-cache"
+        assert index.headers["content-type"].startswith("text/html")
+        assert css.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert css.headers["content-encoding"] == "gzip"
+        assert css.headers["vary"] == "Accept-Encoding"
+        assert css.text == bundle.find("styles.css")[0].body.decode("utf-8")
+    
+    def test_etag_returns_304(self, client):
+        """Testa a revalidação com If-None-Match"""
+        first = client.get("/app/", headers={"Accept-Encoding": "gzip"})
+        second = client.get("/app/", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+        
+        assert second.status_code == 304
+        assert second.content == b""
+    
+    def test_range_request(self, client, bundle):
+        """Testa o suporte a Range na imagem"""
+        name = bundle.manifest()["rick-avatar.jpg"]
+        body = bundle.find(name)[0].body
+        
+        partial = client.get(f"/app/{name}", headers={"Range": "bytes=0-99"})
+        invalid = client.get(f"/app/{name}", headers={"Range": f"bytes={len(body)}-"})
+        
+        assert partial.status_code == 206
+        assert partial.content == body[:100]
+        assert partial.headers["content-range"] == f"bytes 0-99/{len(body)}"
+        assert invalid.status_code == 416
+    
+    def test_missing_file_and_disabled_mode(self, client):
+        """Testa o 404 para arquivos desconhecidos e com o modo desligado"""
+        from app import app
+        
+        assert client.get("/app/../backend/app.py").status_code == 404
+        assert client.get("/app/nao-existe.js").status_code == 404
+        with patch('app.static_bundle', None):
+            assert TestClient(app).get("/app/").status_code == 404
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
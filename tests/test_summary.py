@@ -0,0 +1,183 @@
+"""
+Testes unitários para o resumo incremental do histórico
+"""
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from session_store import InMemorySessionStore, SQLiteSessionStore
+from summary import RollingSummarizer
+from tests.helpers import mock_completion
+
+def turn(index):
+    return [
+        {"role": "user", "content": f"pergunta {index}"},
+        {"role": "assistant", "content": f"resposta {index}"}
+    ]
+
+class TestSessionSummaries:
+    """Testes do armazenamento do resumo nas sessões"""
+    
+    def test_memory_store_keeps_summary(self):
+        """Testa que o store em memória guarda o resumo da sessão"""
+        store = InMemorySessionStore(max_sessions=10, ttl_seconds=0, max_messages=4)
+        store.get_or_create("s1")
+        
+        assert store.get_summary("s1") is None
+        store.set_summary("s1", "o usuário se chama Morty")
+        
+        assert store.get_summary("s1") == "o usuário se chama Morty"
+        assert store.get_summary("inexistente") is None
+    
+    def test_sqlite_store_keeps_summary(self, tmp_path):
+        """Testa que o store SQLite persiste o resumo da sessão"""
+        path = str(tmp_path / "sessions.db")
+        store = SQLiteSessionStore(path=path, max_sessions=10, ttl_seconds=0, max_messages=4)
+        store.get_or_create("s1")
+        store.set_summary("s1", "o usuário se chama Morty")
+        store.close()
+        
+        reopened = SQLiteSessionStore(path=path, max_sessions=10, ttl_seconds=0, max_messages=4)
+        assert reopened.get_summary("s1") == "o usuário se chama Morty"
+        reopened.close()
+
+class TestRollingSummarizer:
+    """Testes do RollingSummarizer"""
+    
+    @pytest.mark.asyncio
+    async def test_summaries_are_chained_per_session(self):
+        """Testa que cada resumo parte do anterior, na ordem de agendamento"""
+        store = InMemorySessionStore(max_sessions=10, ttl_seconds=0, max_messages=4)
+        store.get_or_create("s1")
+        seen = []
+        
+        async def summarize(previous, dropped, assistant_name):
+            seen.append(previous)
+            await asyncio.sleep(0.01)
+            return f"{previous or ''}|{dropped[0]['content']}"
+        
+        summarizer = RollingSummarizer(store, summarize, lambda previous, dropped, assistant_name: "")
+        summarizer.schedule("s1", turn(1))
+        summarizer.schedule("s1", turn(2))
+        await summarizer.drain()
+        
+        assert seen == [None, "|pergunta 1"]
+        assert store.get_summary("s1") == "|pergunta 1|pergunta 2"
+        assert summarizer.stats() == {"pending": 0, "completed": 2, "failed": 0}
+    
+    @pytest.mark.asyncio
+    async def test_failure_keeps_previous_summary(self):
+        """Testa que uma falha no resumo mantém o resumo anterior"""
+        store = InMemorySessionStore(max_sessions=10, ttl_seconds=0, max_messages=4)
+        store.get_or_create("s1")
+        store.set_summary("s1", "resumo antigo")
+        
+        async def summarize(previous, dropped, assistant_name):
+            raise RuntimeError("upstream caiu")
+        
+        summarizer = RollingSummarizer(store, summarize, lambda previous, dropped, assistant_name: "")
+        summarizer.schedule("s1", turn(1))
+        await summarizer.drain()
+        
+        assert store.get_summary("s1") == "resumo antigo"
+        assert summarizer.stats()["failed"] == 1
+    
+    def test_sync_path_uses_background_thread(self):
+        """Testa que fora de um event loop o resumo roda em uma thread"""
+        store = InMemorySessionStore(max_sessions=10, ttl_seconds=0, max_messages=4)
+        store.get_or_create("s1")
+        
+        summarizer = RollingSummarizer(store, None, lambda previous, dropped, assistant_name: "resumo síncrono")
+        summarizer.schedule("s1", turn(1))
+        summarizer.wait_sync()
+        summarizer.close()
+        
+        assert store.get_summary("s1") == "resumo síncrono"
+
+class TestSummaryIntegration:
+    """Testes do resumo no chat engine"""
+    
+    def test_build_messages_inserts_summary_after_system_prompt(self):
+        """Testa que o resumo entra logo após o SYSTEM_PROMPT"""
+        from chat_engine import build_messages, SUMMARY_PREFIX
+        
+        messages = build_messages([{"role": "user", "content": "oi"}], "tudo bem?", "falaram de portais")
+        
+        assert messages[1] == {"role": "system", "content": SUMMARY_PREFIX + "falaram de portais"}
+        assert messages[2]["content"] == "oi"
+        assert messages[-1]["content"] == "tudo bem?"
+    
+    def _run_chat(self, mock_async_client, questions, max_messages):
+        from chat_engine import ask_bot_async, summarizer, session_store, SUMMARY_INSTRUCTION
+        
+        async def create(**kwargs):
+            if kwargs["messages"][0]["content"] == SUMMARY_INSTRUCTION:
+                return mock_completion("o usuário perguntou sobre portais")
+            return mock_completion("Resposta do Rick")
+        
+        async def run():
+            mock_async_client.chat.completions.create = AsyncMock(side_effect=create)
+            original_max = session_store.max_messages
+            session_store.max_messages = max_messages
+            try:
+                session_id = None
+                for question in questions:
+                    _, session_id = await ask_bot_async(question, session_id)
+                    await summarizer.drain()
+                history = session_store.get_history_with_tokens(session_id)
+            finally:
+                session_store.max_messages = original_max
+            
+            prompts = [call.kwargs["messages"] for call in mock_async_client.chat.completions.create.await_args_list]
+            summary_prompts = [messages for messages in prompts if messages[0]["content"] == SUMMARY_INSTRUCTION]
+            chat_prompts = [messages for messages in prompts if messages[0]["content"] != SUMMARY_INSTRUCTION]
+            return summary_prompts, chat_prompts, history
+        
+        return run()
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.SUMMARY_ENABLED', True)
+    @patch('chat_engine.SUMMARY_BATCH_TURNS', 2)
+    @patch('chat_engine.MAX_HISTORY_MESSAGES', 4)
+    @patch('chat_engine.async_client')
+    async def test_dropped_turns_are_summarized_into_prompt(self, mock_async_client):
+        """Testa que turnos que saem da janela viram resumo usado nos próximos prompts"""
+        from chat_engine import SUMMARY_PREFIX
+        
+        questions = [f"pergunta {number}" for number in range(1, 6)]
+        summary_prompts, chat_prompts, history = await self._run_chat(mock_async_client, questions, 4 + 2 * 2)
+        
+        # um único resumo para os dois turnos descartados, não um por turno
+        assert len(summary_prompts) == 1
+        assert "pergunta 1" in summary_prompts[0][1]["content"]
+        assert "pergunta 2" in summary_prompts[0][1]["content"]
+        assert chat_prompts[-1][1] == {"role": "system", "content": SUMMARY_PREFIX + "o usuário perguntou sobre portais"}
+        assert len(chat_prompts[-1]) == 1 + 1 + 4 + 1
+        assert "pergunta 3" in history[0][0]["content"]
+    
+    @pytest.mark.asyncio
+    @patch('chat_engine.SUMMARY_ENABLED', True)
+    @patch('chat_engine.SUMMARY_BATCH_TURNS', 2)
+    @patch('chat_engine.HISTORY_WINDOW_MODE', 'tokens')
+    @patch('chat_engine.count_tokens', return_value=10)
+    @patch('chat_engine.history_token_budget', return_value=40)
+    @patch('chat_engine.async_client')
+    async def test_token_window_drops_are_summarized_in_batches(self, mock_async_client, *_):
+        """Testa que no modo tokens os turnos fora do orçamento são resumidos em lotes"""
+        questions = [f"pergunta {number}" for number in range(1, 6)]
+        summary_prompts, chat_prompts, history = await self._run_chat(mock_async_client, questions, 100)
+        
+        # o orçamento cabe dois turnos; o resumo só sai quando dois turnos ficaram de fora
+        assert len(summary_prompts) == 1
+        assert "pergunta 1" in summary_prompts[0][1]["content"]
+        assert "pergunta 3" not in summary_prompts[0][1]["content"]
+        assert len(chat_prompts[-1]) == 1 + 1 + 4 + 1
+        assert [message["role"] for message, _ in history] == ["user", "assistant"] * 3
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,241 @@
+"""
+Testes do cliente resiliente para o serviço de IA
+Usando um servidor local compatível com a API da OpenAI
+"""
+import json
+import time
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from upstream import (
+    UpstreamClient,
+    UpstreamError,
+    CircuitOpenError,
+    CircuitBreaker,
+    RetryPolicy,
+    create_openai_clients
+)
+from router import Backend, Router
+
+def completion_body(text):
+    return {
+        "id": "chatcmpl-teste",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+    }
+
+class FakeOpenAIServer:
+    """Servidor HTTP local que responde conforme um roteiro de (status, corpo, atraso)"""
+    
+    def __init__(self):
+        self.script = []
+        self.requests = 0
+        self.models = []
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+            
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                server.requests += 1
+                server.models.append(json.loads(body or b"{}").get("model"))
+                status, body, delay = server.script.pop(0) if server.script else (200, completion_body("ok"), 0)
+                time.sleep(delay)
+                payload = json.dumps(body).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+        
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+        threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def fake_server():
+    server = FakeOpenAIServer()
+    yield server
+    server.close()
+
+def make_clients(base_url, timeout_seconds=5):
+    return create_openai_clients(
+        api_key="test",
+        base_url=base_url,
+        max_connections=10,
+        max_keepalive_connections=5,
+        keepalive_expiry_seconds=30,
+        connect_timeout_seconds=1,
+        timeout_seconds=timeout_seconds
+    )
+
+def make_upstream(max_retries=2, failure_threshold=5, reset_timeout_seconds=30, deadline_seconds=0):
+    return UpstreamClient(
+        breaker=CircuitBreaker(failure_threshold=failure_threshold, reset_timeout_seconds=reset_timeout_seconds),
+        retry_policy=RetryPolicy(
+            max_retries=max_retries,
+            base_delay_seconds=0,
+            max_delay_seconds=0,
+            deadline_seconds=deadline_seconds
+        )
+    )
+
+def create(client):
+    return lambda: client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": "Olá"}]
+    )
+
+SERVER_ERROR = (500, {"error": {"message": "falha", "type": "server_error"}}, 0)
+BAD_REQUEST = (400, {"error": {"message": "inválido", "type": "invalid_request_error"}}, 0)
+
+class TestRetries:
+    """Testes das novas tentativas com backoff"""
+    
+    def test_retries_server_errors_then_succeeds(self, fake_server):
+        """Testa que erros 5xx são repetidos até a resposta com sucesso"""
+        client, _ = make_clients(fake_server.base_url)
+        fake_server.script = [SERVER_ERROR, SERVER_ERROR, (200, completion_body("Olá, Morty"), 0)]
+        
+        response = make_upstream(max_retries=2).call(create(client))
+        
+        assert response.choices[0].message.content == "Olá, Morty"
+        assert fake_server.requests == 3
+    
+    @pytest.mark.asyncio
+    async def test_async_retries_server_errors_then_succeeds(self, fake_server):
+        """Testa as novas tentativas no cliente assíncrono"""
+        _, async_client = make_clients(fake_server.base_url)
+        fake_server.script = [SERVER_ERROR, (200, completion_body("Olá, Morty"), 0)]
+        
+        response = await make_upstream(max_retries=2).call_async(create(async_client))
+        
+        assert response.choices[0].message.content == "Olá, Morty"
+        assert fake_server.requests == 2
+    
+    def test_client_errors_are_not_retried(self, fake_server):
+        """Testa que erros 4xx não são repetidos e viram 502"""
+        client, _ = make_clients(fake_server.base_url)
+        fake_server.script = [BAD_REQUEST]
+        
+        with pytest.raises(UpstreamError) as exc_info:
+            make_upstream(max_retries=2).call(create(client))
+        
+        assert exc_info.value.status_code == 502
+        assert fake_server.requests == 1
+    
+    def test_timeout_maps_to_504(self, fake_server):
+        """Testa que o tempo limite esgotado vira 504"""
+        client, _ = make_clients(fake_server.base_url, timeout_seconds=0.1)
+        fake_server.script = [(200, completion_body("tarde demais"), 0.5)]
+        
+        with pytest.raises(UpstreamError) as exc_info:
+            make_upstream(max_retries=0).call(create(client))
+        
+        assert exc_info.value.status_code == 504
+
+class TestDeadline:
+    """Testes do prazo total da chamada ao serviço de IA"""
+    
+    HANGING = (200, completion_body("tarde demais"), 1.0)
+    
+    def test_read_timeout_is_not_retried(self, fake_server):
+        """Testa que um timeout de leitura não é repetido e conta como falha no circuito"""
+        client, _ = make_clients(fake_server.base_url, timeout_seconds=0.2)
+        fake_server.script = [self.HANGING] * 3
+        upstream = make_upstream(max_retries=2)
+        
+        started = time.monotonic()
+        with pytest.raises(UpstreamError) as exc_info:
+            upstream.call(create(client))
+        
+        assert exc_info.value.status_code == 504
+        assert fake_server.requests == 1
+        assert time.monotonic() - started < 0.8
+        assert upstream.breaker.failures == 1
+    
+    @pytest.mark.asyncio
+    async def test_deadline_bounds_a_hanging_upstream(self, fake_server):
+        """Testa que o prazo total corta a chamada mesmo com tempo limite por leitura maior"""
+        _, async_client = make_clients(fake_server.base_url, timeout_seconds=5)
+        fake_server.script = [self.HANGING] * 3
+        
+        started = time.monotonic()
+        with pytest.raises(UpstreamError) as exc_info:
+            await make_upstream(max_retries=2, deadline_seconds=0.3).call_async(create(async_client))
+        
+        assert exc_info.value.status_code == 504
+        assert time.monotonic() - started < 0.8
+    
+    @pytest.mark.asyncio
+    async def test_deadline_is_shared_by_fallback_backends(self, fake_server):
+        """Testa que os backends de reserva usam o prazo restante, sem ganhar um prazo novo cada"""
+        _, async_client = make_clients(fake_server.base_url, timeout_seconds=5)
+        fake_server.script = [self.HANGING] * 3
+        router = Router(
+            [Backend(name, "gpt-4o-mini", make_upstream(max_retries=2)) for name in ("a", "b", "c")],
+            deadline_seconds=0.3
+        )
+        
+        started = time.monotonic()
+        with pytest.raises(UpstreamError) as exc_info:
+            await router.call_async(lambda backend: create(async_client)())
+        
+        assert exc_info.value.status_code == 504
+        assert fake_server.requests == 1
+        assert time.monotonic() - started < 0.8
+
+class TestCircuitBreaker:
+    """Testes do disjuntor (circuit breaker)"""
+    
+    def test_opens_after_failures_and_fails_fast(self, fake_server):
+        """Testa que o circuito abre após falhas seguidas e rejeita sem chamar o servidor"""
+        client, _ = make_clients(fake_server.base_url)
+        upstream = make_upstream(max_retries=0, failure_threshold=2)
+        fake_server.script = [SERVER_ERROR, SERVER_ERROR]
+        
+        for _ in range(2):
+            with pytest.raises(UpstreamError):
+                upstream.call(create(client))
+        
+        with pytest.raises(CircuitOpenError) as exc_info:
+            upstream.call(create(client))
+        
+        assert exc_info.value.status_code == 503
+        assert fake_server.requests == 2
+    
+    def test_half_open_trial_closes_circuit_on_success(self, fake_server):
+        """Testa que após o tempo de espera uma chamada de teste fecha o circuito"""
+        client, _ = make_clients(fake_server.base_url)
+        upstream = make_upstream(max_retries=0, failure_threshold=1, reset_timeout_seconds=0.05)
+        fake_server.script = [SERVER_ERROR]
+        
+        with pytest.raises(UpstreamError):
+            upstream.call(create(client))
+        assert upstream.breaker.state == "open"
+        
+        time.sleep(0.06)
+        upstream.call(create(client))
+        
+        assert upstream.breaker.state == "closed"
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
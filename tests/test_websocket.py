@@ -0,0 +1,198 @@
+"""
+Testes do endpoint WebSocket /ws/chat e do canal com heartbeat e backpressure
+"""
+import json
+import asyncio
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+import sys
+import os
+
+# Adicionar diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import app
+from websocket_channel import WebSocketChannel
+
+client = TestClient(app)
+
+def mock_stream(deltas, delay=0):
+    async def stream():
+        for delta in deltas:
+            if delay:
+                await asyncio.sleep(delay)
+            chunk = MagicMock()
+            chunk.choices = [MagicMock()]
+            chunk.choices[0].delta.content = delta
+            yield chunk
+    return stream()
+
+def receive_until_done(websocket):
+    events = []
+    while True:
+        event = websocket.receive_json()
+        events.append(event)
+        if event["type"] in ("done", "error") and not event.get("detail", "").startswith("Aguarde"):
+            return events
+
+class FakeWebSocket:
+    def __init__(self, block_send=False):
+        self.sent = []
+        self.closed_code = None
+        self.block_send = block_send
+        self._incoming = asyncio.Queue()
+    
+    async def send_text(self, text):
+        if self.block_send:
+            await asyncio.Event().wait()
+        self.sent.append(json.loads(text))
+    
+    async def receive_text(self):
+        return await self._incoming.get()
+    
+    async def close(self, code=1000):
+        self.closed_code = code
+
+class TestChatWebSocket:
+    """Testes do endpoint /ws/chat"""
+    
+    @patch('chat_engine.async_client')
+    def test_streams_replies_on_bound_session(self, mock_async_client):
+        """Testa que a sessão fica ligada à conexão e as respostas chegam em deltas"""
+        from chat_engine import session_store
+        
+        mock_async_client.chat.completions.create = AsyncMock(
+            side_effect=lambda **kwargs: mock_stream(["Olá, ", "Morty"])
+        )
+        
+        with client.websocket_connect("/ws/chat") as websocket:
+            session_id = websocket.receive_json()["session_id"]
+            
+            websocket.send_json({"type": "message", "message": "Olá Rick", "use_cache": False})
+            first = receive_until_done(websocket)
+            websocket.send_json({"type": "message", "message": "Tudo bem?", "use_cache": False})
+            second = receive_until_done(websocket)
+        
+        assert [event["type"] for event in first] == ["delta", "delta", "done"]
+        assert first[-1] == {"type": "done", "reply": "Olá, Morty", "session_id": session_id}
+        assert second[-1]["session_id"] == session_id
+        assert len(session_store.get_history(session_id)) == 4
+    
+    def test_ping_invalid_and_empty_messages(self):
+        """Testa o pong do heartbeat e os erros de mensagens inválidas"""
+        with client.websocket_connect("/ws/chat?session_id=ws-teste") as websocket:
+            assert websocket.receive_json() == {"type": "session", "session_id": "ws-teste"}
+            
+            websocket.send_json({"type": "ping", "ts": 1})
+            assert websocket.receive_json() == {"type": "pong", "ts": 1}
+            
+            websocket.send_text("isso não é json")
+            assert websocket.receive_json()["type"] == "error"
+            
+            websocket.send_json({"type": "message", "message": "   "})
+            error = websocket.receive_json()
+            assert (error["type"], error["status"]) == ("error", 422)
+    
+    @patch('chat_engine.async_client')
+    def test_one_reply_at_a_time(self, mock_async_client):
+        """Testa que uma segunda mensagem durante a resposta é recusada"""
+        mock_async_client.chat.completions.create = AsyncMock(
+            return_value=mock_stream(["Espera", " aí"], delay=0.2)
+        )
+        
+        with client.websocket_connect("/ws/chat") as websocket:
+            websocket.receive_json()
+            websocket.send_json({"type": "message", "message": "Primeira", "use_cache": False})
+            websocket.send_json({"type": "message", "message": "Segunda", "use_cache": False})
+            events = receive_until_done(websocket)
+        
+        assert any(event["type"] == "error" and "Aguarde" in event["detail"] for event in events)
+        assert events[-1]["reply"] == "Espera aí"
+    
+    @patch('chat_engine.async_client')
+    def test_upstream_error_keeps_connection_open(self, mock_async_client):
+        """Testa que a falha no upstream vira evento de erro sem derrubar a conexão"""
+        mock_async_client.chat.completions.create = AsyncMock(side_effect=RuntimeError("falhou"))
+        
+        with client.websocket_connect("/ws/chat") as websocket:
+            websocket.receive_json()
+            websocket.send_json({"type": "message", "message": "Olá Rick", "use_cache": False})
+            error = websocket.receive_json()
+            
+            websocket.send_json({"type": "ping"})
+            pong = websocket.receive_json()
+        
+        assert error["type"] == "error"
+        assert pong["type"] == "pong"
+    
+    def test_rejects_unknown_origin(self):
+        """Testa que origens fora de ALLOWED_ORIGINS são recusadas"""
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            with client.websocket_connect("/ws/chat", headers={"origin": "http://malicioso.example"}) as websocket:
+                websocket.receive_json()
+        
+        assert exc_info.value.code == 1008
+    
+    def test_rejects_too_long_session_id(self):
+        """Testa que um session_id acima do limite é recusado na conexão"""
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            with client.websocket_connect("/ws/chat?session_id=" + "s" * 129) as websocket:
+                websocket.receive_json()
+        
+        assert exc_info.value.code == 1008
+
+class TestWebSocketChannel:
+    """Testes do heartbeat e do backpressure do canal"""
+    
+    @pytest.mark.asyncio
+    async def test_send_waits_when_client_is_slow(self):
+        """Testa que o envio espera quando a fila de saída está cheia"""
+        channel = WebSocketChannel(FakeWebSocket(block_send=True), max_pending=2)
+        
+        await channel.send({"type": "delta", "content": "a"})
+        await channel.send({"type": "delta", "content": "b"})
+        
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(channel.send({"type": "delta", "content": "c"}), timeout=0.05)
+    
+    @pytest.mark.asyncio
+    async def test_idle_connection_is_closed(self):
+        """Testa que a conexão sem resposta aos pings é encerrada"""
+        websocket = FakeWebSocket()
+        channel = WebSocketChannel(websocket, heartbeat_seconds=0.02, idle_timeout_seconds=0.05)
+        
+        await asyncio.wait_for(channel.serve(AsyncMock()), timeout=2)
+        
+        assert websocket.closed_code == 1001
+        assert any(payload["type"] == "ping" for payload in websocket.sent)
+    
+    @pytest.mark.asyncio
+    async def test_idle_connection_is_closed_when_client_is_slow(self):
+        """Testa que a fila de saída cheia não trava o heartbeat"""
+        websocket = FakeWebSocket(block_send=True)
+        channel = WebSocketChannel(websocket, heartbeat_seconds=0.02, idle_timeout_seconds=0.05, max_pending=1)
+        
+        await asyncio.wait_for(channel.serve(AsyncMock(), greeting={"type": "session"}), timeout=2)
+        
+        assert websocket.closed_code == 1001
+    
+    @pytest.mark.asyncio
+    async def test_client_frames_keep_slow_connection_alive(self):
+        """Testa que frames recebidos mantêm a conexão viva mesmo sem conseguir enviar"""
+        websocket = FakeWebSocket(block_send=True)
+        channel = WebSocketChannel(websocket, heartbeat_seconds=0.02, idle_timeout_seconds=0.05, max_pending=1)
+        serving = asyncio.create_task(channel.serve(AsyncMock()))
+        
+        for _ in range(20):
+            websocket._incoming.put_nowait(json.dumps({"type": "ping", "ts": 1}))
+            await asyncio.sleep(0.01)
+        
+        assert websocket.closed_code is None
+        assert not serving.done()
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])